@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import catalog
+import reps
+import shared_cache
+
+# --- STRENGTH ANALYTICS ---
+# One pass over a lifter's whole log produces every table the dashboards and
+# the notebook need: e1RM under several formulas, session volume, the 7/28-day
+# acute:chronic workload ratio and RPE-weighted fatigue, per exercise,
+# category and arm. Takes the app's cached frame or the notebook's
+# training_log.csv as is.
+#
+#   import analytics
+#   tables = analytics.compute(pd.read_csv("training_log.csv"))
+#   tables["workload"]["arm"].tail()
+
+E1RM_FORMULAS = {
+    "Epley": reps.epley,  # the formula stored in workouts.best_e1rm
+    "Brzycki": lambda weight, reps: weight * 36 / (37 - reps),  # undefined from 37 reps up
+    "Lombardi": lambda weight, reps: weight * reps ** 0.10,
+}
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+LEVELS = {"exercise": "Exercise", "category": "Category", "arm": "Arm"}
+
+MAX_TABLES = 64  # cached result sets (one per user + data version)
+
+_tables = OrderedDict()
+_lock = threading.Lock()
+
+
+def e1rm(weight, best_reps):
+    weight = np.asarray(weight, dtype=float)
+    best_reps = np.asarray(best_reps, dtype=float)
+    out = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name, formula in E1RM_FORMULAS.items():
+            values = formula(weight, best_reps)
+            out[name] = np.where(np.isfinite(values) & (values > 0), values, np.nan)
+    return out
+
+
+def prepare_sets(df):
+    # Normalise either frame shape into one row per logged exercise with every metric
+    sets = pd.DataFrame({
+        "Date": pd.to_datetime(df["Date"]).dt.normalize(),
+        "Exercise": df["Exercise"].astype("string").str.strip(),
+        "Weight_kg": pd.to_numeric(df["Weight_kg"], errors="coerce").fillna(0.0),
+        "Sets": pd.to_numeric(df["Sets"], errors="coerce").fillna(0).astype(int),
+        "Reps": df["Reps"].astype("string").fillna(""),
+    })
+    # The app's frame carries the library's muscle group; CSV logs fall back to the defaults
+    if "Category" in df.columns:
+        sets["Category"] = df["Category"].astype("string")
+    else:
+        sets["Category"] = sets["Exercise"].map(catalog.DEFAULT_MUSCLE_GROUPS)
+    sets["Category"] = sets["Category"].fillna(catalog.OTHER)
+    sets["Arm"] = df["Arm"].astype("string").str.strip().str.upper() if "Arm" in df.columns else ""
+    sets["Arm"] = sets["Arm"].replace("", pd.NA).fillna("Both")
+    for column in ["RPE", "Soreness"]:
+        values = df[column] if column in df.columns else 0
+        sets[column] = pd.to_numeric(pd.Series(values, index=df.index), errors="coerce").fillna(0)
+
+    # Reps text -> per-set matrix, once for the whole log; the best set is
+    # picked by reps.set_metrics, the same one the app stores on every save
+    matrix = reps.parse_reps(sets["Reps"], sets["Sets"])
+    metrics = reps.set_metrics(sets["Weight_kg"].to_numpy(), matrix)
+    sets["Total_Reps"] = metrics["total_reps"]
+    sets["Volume"] = metrics["volume"]
+    for name, values in e1rm(sets["Weight_kg"].to_numpy(), metrics["best_reps"]).items():
+        sets[f"e1RM_{name}"] = values
+    # Hard sets count for more; sets logged without an RPE count at full volume
+    sets["Fatigue"] = sets["Volume"] * np.where(sets["RPE"] > 0, sets["RPE"] / 10, 1.0)
+    return sets.sort_values("Date", kind="stable", ignore_index=True)
+
+
+def sessions(sets, level="exercise"):
+    # One row per training day per exercise / category / arm
+    group = ["Date", LEVELS[level]]
+    aggregations = {
+        "Sets": ("Sets", "sum"),
+        "Total_Reps": ("Total_Reps", "sum"),
+        "Volume": ("Volume", "sum"),
+        "Fatigue": ("Fatigue", "sum"),
+        "RPE": ("RPE", "mean"),
+        "Soreness": ("Soreness", "max"),
+    }
+    for name in E1RM_FORMULAS:
+        aggregations[f"e1RM_{name}"] = (f"e1RM_{name}", "max")
+    return sets.groupby(group, sort=True, observed=True).agg(**aggregations).reset_index()
+
+
+def workload(sets, level=None, load="Volume"):
+    # Acute (7-day) vs chronic (28-day) average daily load, all groups at once.
+    # Until a full window exists the average is over the days logged so far.
+    key = LEVELS[level] if level else "Group"
+    if sets.empty:
+        return pd.DataFrame(columns=["Date", key, "Load", "Acute", "Chronic", "ACWR"])
+    if level is None:
+        sets = sets.assign(Group="All")
+    daily = sets.pivot_table(index="Date", columns=key, values=load, aggfunc="sum", fill_value=0.0, observed=True)
+    days = pd.date_range(daily.index.min(), daily.index.max(), freq="D")
+    daily = daily.reindex(days, fill_value=0.0)
+    acute = daily.rolling(ACUTE_DAYS, min_periods=1).mean()
+    chronic = daily.rolling(CHRONIC_DAYS, min_periods=1).mean()
+    ratio = acute / chronic.where(chronic > 0)
+    out = pd.concat(
+        {"Load": daily.stack(), "Acute": acute.stack(), "Chronic": chronic.stack(), "ACWR": ratio.stack()},
+        axis=1
+    )
+    out.index.names = ["Date", key]
+    return out.reset_index()
+
+
+def compute(df):
+    sets = prepare_sets(df)
+    return {
+        "sets": sets,
+        "sessions": {level: sessions(sets, level) for level in LEVELS},
+        "workload": {
+            "all": workload(sets),
+            **{level: workload(sets, level) for level in LEVELS},
+        },
+        "fatigue": workload(sets, load="Fatigue"),
+    }
+
+
+def latest(table, level, name):
+    # Most recent row for one exercise / category / arm (None if never trained)
+    rows = table[table[LEVELS[level]] == name]
+    return rows.iloc[-1] if not rows.empty else None
+
+
+def cached_tables(user, version, df):
+    # Same (user, data version) -> same tables; views never recompute per chart
+    key = (user, version)
+    with _lock:
+        tables = _tables.get(key)
+        if tables is not None:
+            _tables.move_to_end(key)
+            return tables
+    # Other app replicas may have computed the same rows already. Rows are only
+    # ever added or deleted, so (count, id sum) identifies the content; the
+    # catalog version covers muscle groups being renamed.
+    fingerprint = None
+    if shared_cache.enabled() and "id" in df.columns:
+        fingerprint = f"{len(df)}-{int(df['id'].sum())}-c{shared_cache.version('catalog', user)}"
+        tables = shared_cache.load("analytics", user, fingerprint)
+    if tables is None:
+        tables = compute(df)
+        if fingerprint is not None:
+            shared_cache.store("analytics", user, fingerprint, tables)
+    with _lock:
+        _tables[key] = tables
+        while len(_tables) > MAX_TABLES:
+            _tables.popitem(last=False)
+    return tables
@@ -0,0 +1,424 @@
+import argparse
+import base64
+import hmac
+import json
+import math
+import os
+import re
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import analytics
+import catalog
+import data_access
+import db
+import exercise_stats
+import replica
+import reps
+import shared_cache
+import workout_cache
+
+# --- HEADLESS LOGGING API ---
+# Logging a set from the form costs a whole Streamlit rerun. Wearables,
+# scripts and the notebook talk to this small JSON server instead: same data
+# layer, same [passwords] secrets, no Streamlit. A session's sets arrive in
+# one request, are validated together and written in one transaction.
+#
+#   python api.py --port 8502
+#
+#   POST /api/sets        {"date": "2024-05-01", "bodyweight": 82.5,
+#                          "sets": [{"exercise": "Heavy Riser", "weight": 40, "sets": 3, "reps": "8,7,6", "rpe": 8}]}
+#   GET  /api/last-log    ?day=Monday                 latest log per exercise
+#   GET  /api/history     ?limit=25&cursor=...&exercise=...&start=...&end=...
+#   GET  /api/analytics   ?exercise=...               latest sessions, e1RM trend, workload
+#   GET  /api/exercises                               the lifter's library by training day
+#
+# Auth: HTTP Basic with the app's username / password, or "Bearer <token>"
+# with a login session token when shared_cache is on.
+#
+#   [api]
+#   port = 8502
+#   max_batch = 200
+
+DEFAULT_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8502,
+    "max_batch": 200,       # sets per request
+    "max_body": 1_000_000,  # bytes
+    "max_page": 200,        # history rows per page
+}
+
+_settings = None
+_passwords = None
+
+
+def get_settings():
+    global _settings
+    if _settings is None:
+        settings = dict(DEFAULT_SETTINGS)
+        try:
+            import streamlit as st
+            overrides = st.secrets.get("api", {})
+        except Exception:
+            overrides = {}
+        for key in settings:
+            if key in overrides:
+                settings[key] = type(DEFAULT_SETTINGS[key])(overrides[key])
+        _settings = settings
+    return _settings
+
+
+def get_passwords():
+    # API_PASSWORDS="user:password,..." (scripts, CI), else the app's [passwords]
+    global _passwords
+    if _passwords is None:
+        env_passwords = os.environ.get("API_PASSWORDS")
+        if env_passwords:
+            _passwords = dict(item.split(":", 1) for item in env_passwords.split(",") if ":" in item)
+        else:
+            import streamlit as st
+            _passwords = dict(st.secrets["passwords"])
+    return _passwords
+
+
+def authenticate(header):
+    # -> username, or None
+    scheme, _, credentials = (header or "").partition(" ")
+    if scheme.lower() == "basic":
+        try:
+            user, _, password = base64.b64decode(credentials).decode("utf-8").partition(":")
+        except ValueError:
+            return None
+        expected = get_passwords().get(user)
+        if expected is not None and hmac.compare_digest(expected.encode("utf-8"), password.encode("utf-8")):
+            return user
+        return None
+    if scheme.lower() == "bearer" and shared_cache.enabled():
+        user = shared_cache.session_user(credentials.strip())
+        return user if user in get_passwords() else None
+    return None
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+# --- VALIDATION ---
+def _number(value, field, low=0.0, high=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{field} must be a number")
+    if value < low or (high is not None and value > high):
+        raise ValueError(f"{field} must be between {low:g} and {high:g}" if high is not None else f"{field} must be >= {low:g}")
+    return value
+
+
+def _integer(value, field, low, high):
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ValueError(f"{field} must be a whole number from {low} to {high}")
+    return value
+
+
+def _date(value, field):
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a YYYY-MM-DD string")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{field} must be a YYYY-MM-DD string") from None
+
+
+def _set_row(user, item, session, library):
+    # One set from the request -> the same dict the form hands to write_queue
+    if not isinstance(item, dict):
+        raise ValueError("each set must be an object")
+    exercise = item.get("exercise")
+    if not isinstance(exercise, str) or exercise not in library:
+        raise ValueError(f"exercise {exercise!r} is not in your exercise library")
+    reps_text = str(item.get("reps", "")) if not isinstance(item.get("reps"), bool) else ""
+    if not re.search(r"\d", reps_text):
+        raise ValueError('reps must be a number or a list like "5,4,3"')
+    notes = item.get("notes", "")
+    if not isinstance(notes, str):
+        raise ValueError("notes must be a string")
+    bodyweight = item.get("bodyweight", session["bodyweight"])
+    return {
+        "date": _date(item["date"], "date") if "date" in item else session["date"],
+        "exercise": exercise,
+        "weight": _number(item.get("weight"), "weight"),
+        "sets": _integer(item.get("sets", 1), "sets", 1, reps.MAX_SETS),
+        "reps": reps_text,
+        "rpe": _integer(item.get("rpe", 0), "rpe", 0, 10),  # 0 = not logged
+        "username": user,
+        "notes": notes,
+        "bodyweight": _number(bodyweight, "bodyweight") if bodyweight is not None else None,
+    }
+
+
+def _in_library(user, names):
+    # Checks just these names; a typo must not cost the cached catalog
+    placeholders = ", ".join(f":n{i}" for i in range(len(names)))
+    with db.connect() as conn:
+        return conn.execute(
+            text(f"SELECT name FROM exercise_library WHERE username = :u AND name IN ({placeholders})"),
+            {"u": user, **{f"n{i}": name for i, name in enumerate(names)}}
+        ).fetchall()
+
+
+def parse_sets(user, body):
+    # Every set is checked before anything is written; errors come back per index
+    if not isinstance(body, dict) or not isinstance(body.get("sets"), list) or not body["sets"]:
+        raise ApiError(400, 'expected {"sets": [...]} with at least one set')
+    if len(body["sets"]) > get_settings()["max_batch"]:
+        raise ApiError(413, f"at most {get_settings()['max_batch']} sets per request")
+    try:
+        session = {
+            "date": _date(body["date"], "date") if "date" in body else date.today(),
+            "bodyweight": body.get("bodyweight"),
+        }
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+
+    library = set(catalog.exercises(user))
+    unknown = {item.get("exercise") for item in body["sets"] if isinstance(item, dict)} - library
+    unknown = sorted(name for name in unknown if isinstance(name, str))
+    if unknown and _in_library(user, unknown):
+        # Added in the app since we cached the library: only then re-read it
+        catalog.invalidate(user)
+        library = set(catalog.exercises(user))
+
+    rows, errors = [], []
+    for index, item in enumerate(body["sets"]):
+        try:
+            rows.append(_set_row(user, item, session, library))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        raise ApiError(422, f"{len(errors)} invalid set(s), nothing was saved", errors)
+    return rows
+
+
+# --- WRITES ---
+def log_sets(user, rows):
+    # The whole session in one transaction: all sets are saved or none
+    with db.begin() as conn:
+        ids = data_access.insert_workouts(conn, rows)
+    # Our cached frame re-reads new rows, app replicas drop theirs; the local replica pushes now
+    workout_cache.note_write(user)
+    shared_cache.bump("workouts", user)
+    replica.request_sync()
+    return ids
+
+
+# --- READS ---
+def _records(df):
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%Y-%m-%d")
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _plain(value):
+    # JSON-safe scalar: numpy numbers -> Python, NaN -> null, dates -> ISO
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def last_logs(user, query):
+    day = query.get("day")
+    logs = data_access.get_last_logs(user, day)
+    fields = ["date", "weight", "sets", "reps", "notes", "rpe"]
+    return {
+        "day": day or catalog.ALL_EXERCISES,
+        "logs": {exercise: {name: _plain(value) for name, value in zip(fields, log)} for exercise, log in logs.items()},
+    }
+
+
+def _cursor(text_value):
+    # "2024-05-01_1234" -> (date, id), the keyset of the last row shown
+    day, _, workout_id = text_value.rpartition("_")
+    if not day or not workout_id.isdigit():
+        raise ApiError(400, "invalid cursor")
+    return day, int(workout_id)
+
+
+def history(user, query):
+    try:
+        limit = int(query.get("limit", 25))
+        start = _date(query["start"], "start") if "start" in query else None
+        end = _date(query["end"], "end") if "end" in query else None
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+    limit = max(1, min(limit, get_settings()["max_page"]))
+    cursor = _cursor(query["cursor"]) if query.get("cursor") else None
+    page, next_cursor = data_access.fetch_history_page(
+        user, cursor=cursor, limit=limit, exercise=query.get("exercise"), start_date=start, end_date=end
+    )
+    return {
+        "rows": _records(page),
+        "next_cursor": f"{_plain(next_cursor[0])}_{next_cursor[1]}" if next_cursor else None,
+    }
+
+
+def summary(user, query):
+    # From the same cached frame and analytics tables the Progress tab uses
+    df = workout_cache.get_workouts(user)
+    exercise = query.get("exercise")
+    if df.empty:
+        return {"exercises": [], "workload": None}
+    tables = analytics.cached_tables(user, workout_cache.data_version(user), df)
+    sessions = tables["sessions"]["exercise"]
+    if exercise:
+        sessions = sessions[sessions["Exercise"] == exercise]
+        if sessions.empty:
+            raise ApiError(404, f"no logs for {exercise!r}")
+    per_exercise = sessions.groupby("Exercise", observed=True).agg(
+        sessions=("Date", "size"),
+        last_date=("Date", "last"),
+        last_volume=("Volume", "last"),
+        last_rpe=("RPE", "last"),
+        last_e1rm=("e1RM_Epley", "last"),
+        best_e1rm=("e1RM_Epley", "max"),
+    ).reset_index().rename(columns={"Exercise": "exercise"})
+    workload = tables["workload"]["all"].iloc[-1]
+    result = {
+        "exercises": _records(per_exercise),
+        "workload": {
+            "date": _plain(workload["Date"]),
+            "acute": _plain(workload["Acute"]),
+            "chronic": _plain(workload["Chronic"]),
+            "acwr": _plain(workload["ACWR"]),
+        },
+    }
+    if exercise:
+        # Regression trend from the exercise_stats sums (O(1))
+        stats = exercise_stats.get_summary(user, exercise)
+        if stats is not None:
+            result["trend"] = {
+                "monthly_gain_kg": _plain(exercise_stats.monthly_gain(stats)),
+                "current_e1rm": _plain(stats["current_e1rm"]),
+                "best_e1rm": _plain(stats["best_e1rm"]),
+                "sessions": _plain(stats["sessions"]),
+            }
+    return result
+
+
+def exercises(user, query):
+    entry = catalog.get(user)
+    return {"days": entry["by_day"], "exercises": list(entry["names"])}
+
+
+# --- HTTP ---
+GET_ROUTES = {
+    "/api/last-log": last_logs,
+    "/api/history": history,
+    "/api/analytics": summary,
+    "/api/exercises": exercises,
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: a logger can reuse one connection
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't wait for the ACK
+    server_version = "WorkoutBuddyAPI/1.0"
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 401:
+            self.send_header("WWW-Authenticate", 'Basic realm="Workout Buddy"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > get_settings()["max_body"]:
+            self.close_connection = True  # the unread body would be taken for the next request
+            raise ApiError(413, "request body too large")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(400, "body is not valid JSON") from None
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        try:
+            if method == "POST":
+                body = self._read_json()  # always drained, so keep-alive stays in sync
+            if method == "GET" and url.path == "/api/health":
+                self._send(200, {"status": "ok"})
+                return
+            user = authenticate(self.headers.get("Authorization"))
+            if user is None:
+                raise ApiError(401, "login required")
+            if method == "POST" and url.path == "/api/sets":
+                ids = log_sets(user, parse_sets(user, body))
+                self._send(201, {"saved": len(ids), "ids": ids})
+            elif method == "GET" and url.path in GET_ROUTES:
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                self._send(200, GET_ROUTES[url.path](user, query))
+            else:
+                raise ApiError(404, f"no route for {method} {url.path}")
+        except ApiError as e:
+            payload = {"error": str(e)}
+            if e.details:
+                payload["details"] = e.details
+            self._send(e.status, payload)
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host=None, port=None, verbose=False):
+    # port=0 picks a free port (benchmarks); server.server_address has the real one
+    settings = get_settings()
+    server = ThreadingHTTPServer(
+        (host or settings["host"], settings["port"] if port is None else port), ApiHandler
+    )
+    server.daemon_threads = True
+    server.verbose = verbose
+    # Same background services as app.startup()
+    replica.start_services()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the JSON logging API.")
+    parser.add_argument("--host", help="interface to bind (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="port (default 8502)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"✅ Logging API on http://{host}:{port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,15 +1,20 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from sqlalchemy import create_engine, text
 from datetime import date, datetime, timedelta
 import extra_streamlit_components as stx
-import numpy as np
-import time
+import uuid
+import profiling
+import shared_cache
+# The data layer (pandas, SQLAlchemy, plotly...) is imported after the login
+# screen, see "DATA LAYER" below.
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Workout Buddy", page_icon="💪", layout="wide")
 
+# --- PROFILING (opt-in, see profiling.py) ---
+profile_session = st.session_state.setdefault("profile_session", uuid.uuid4().hex[:8])
+profiling.start_run(profile_session, st.session_state.get("username"))
+profiling.section("auth")
+
 # --- AUTHENTICATION & COOKIE SETUP ---
 def get_manager():
     return stx.CookieManager()
@@ -24,56 +29,75 @@ if "logout_clicked" not in st.session_state:
     st.session_state["logout_clicked"] = False
 
 # --- DATABASE CONNECTION ---
-def get_engine():
+# The engine (and its connection pool) is built once per process in db.py,
+# so reruns reuse pooled connections instead of doing a fresh handshake.
+# With [replica] enabled that engine is a local SQLite file kept in sync
+# with Supabase by a background thread (replica.py).
+def startup():
+    # Background services and the pooled engine. Each step is idempotent, so
+    # later reruns pay nothing; a connection problem stops the page here,
+    # before any helper or view queries.
     try:
-        db_url = st.secrets["connections"]["supabase"]["url"]
-        return create_engine(db_url)
+        replica.start_services()  # shared with api.py
     except Exception as e:
         st.error(f"❌ Database Connection Error: {e}")
         st.stop()
 
 # --- HELPER 1: FETCH EXERCISES ---
+# From the in-memory catalog (catalog.py): the library is read once per
+# lifter, not on every rerun.
 def get_exercises_from_db(user, category_filter=None):
-    engine = get_engine()
     try:
-        query_str = "SELECT name FROM exercise_library WHERE username = :user"
-        params = {"user": user}
-        if category_filter and category_filter != "All Exercises":
-            query_str += " AND category = :cat"
-            params["cat"] = category_filter
-        with engine.connect() as conn:
-            result = conn.execute(text(query_str), params)
-            rows = result.fetchall()
-            return [row[0] for row in rows]
+        return catalog.exercises(user, category_filter)
     except Exception:
         return []
 
-# --- HELPER 2: FETCH LAST LOG ---
-def get_last_log(user, exercise_name):
-    engine = get_engine()
+def get_training_days(user):
     try:
-        with engine.connect() as conn:
-            query = text("""
-                SELECT date, weight, sets, reps, notes, rpe
-                FROM workouts
-                WHERE username = :user AND exercise = :ex
-                ORDER BY date DESC LIMIT 1
-            """)
-            result = conn.execute(query, {"user": user, "ex": exercise_name}).fetchone()
-            return result
+        return catalog.days(user)
     except Exception:
-        return None
+        return []
+
+# --- HELPER 2: FETCH LAST LOGS (whole training day, one query) ---
+# Kept in session state per (user, day), so switching the exercise
+# dropdown reads from memory instead of hitting the database.
+def get_last_logs(user, category_filter=None):
+    cache = st.session_state.setdefault("last_logs", {})
+    key = (user, category_filter)
+    if key not in cache:
+        try:
+            logs = data_access.get_last_logs(user, category_filter)
+        except Exception:
+            return {}
+        if write_queue.pending(user):
+            return logs  # a queued delete may still change this, don't keep it
+        cache[key] = logs
+    return cache[key]
+
+def remember_last_log(exercise_name, data):
+    # Write-through after a save: the new set becomes "last time" if it's the newest
+    new_log = (data["date"], data["weight"], data["sets"], data["reps"], data["notes"], data["rpe"])
+    for logs in st.session_state.get("last_logs", {}).values():
+        old_log = logs.get(exercise_name)
+        if old_log is None or str(old_log[0]) <= str(new_log[0]):
+            logs[exercise_name] = new_log
 
 # --- 1. AUTO-LOGIN ---
-time.sleep(0.1) 
-cookie_user = cookie_manager.get(cookie="arm_wrestling_user")
+# No sleep: on a fresh session the cookie component hasn't reported back yet
+# and get() returns None, so the login form is drawn right away. When the
+# browser sends the cookies Streamlit reruns the script and we log in here.
+# With shared_cache on, the cookie holds a session token any app replica can
+# resolve (the username cookie would only be trusted by the browser's word).
+if shared_cache.enabled():
+    cookie_user = shared_cache.session_user(cookie_manager.get(cookie="arm_wrestling_session"))
+else:
+    cookie_user = cookie_manager.get(cookie="arm_wrestling_user")
 
 if not st.session_state["logged_in"] and cookie_user and not st.session_state["logout_clicked"]:
     if "passwords" in st.secrets and cookie_user in st.secrets["passwords"]:
         st.session_state["logged_in"] = True
         st.session_state["username"] = cookie_user
-        st.success(f"Welcome back, {cookie_user}!")
-        time.sleep(0.5)
+        st.toast(f"Welcome back, {cookie_user}!")
         st.rerun()
 
 # --- 2. MANUAL LOGIN ---
@@ -87,9 +111,11 @@ def check_login(username, password):
             st.session_state["username"] = username
             st.session_state["logout_clicked"] = False
             expires = datetime.now() + timedelta(days=30)
-            cookie_manager.set("arm_wrestling_user", username, expires_at=expires)
-            st.success("Logged in!")
-            time.sleep(0.5)
+            if shared_cache.enabled():
+                cookie_manager.set("arm_wrestling_session", shared_cache.create_session(username), expires_at=expires)
+            else:
+                cookie_manager.set("arm_wrestling_user", username, expires_at=expires)
+            st.toast("Logged in!")
             st.rerun()
         else:
             st.error("❌ Incorrect Password")
@@ -107,24 +133,25 @@ if not st.session_state["logged_in"]:
             check_login(user_input, pass_input)
     st.stop() 
 
+# --- DATA LAYER ---
+# Only imported once someone is logged in, so the login screen doesn't wait
+# for pandas / SQLAlchemy / numpy. Python keeps modules loaded, so later
+# reruns pay nothing here; plotly is only loaded by the views that draw charts.
+profiling.section("imports")
+import catalog
+import data_access
+import write_queue
+import replica
+import views
+
+startup()
+
 # =========================================================
 #  ✅ MAIN APP STARTS HERE
 # =========================================================
 
 st.title("Workout Log")
-
-# CATEGORY MAP
-CATEGORY_MAP = {
-    "Index Knuckle Pronation": "Pronation", "Heavy Pronation Lift": "Pronation",
-    "Static Back Pressure": "Back Pressure", "Single-Loop Back Pressure":"Back Pressure",
-    "Cupping (Pulley)": "Cupping", "Low Multi-Spinner":"Cupping",
-    "Volume Cupping":"Cupping", "Static Cupping":"Cupping",
-    "Finger Containment (Static)": "Fingers", "Heavy Wrist Wrench": "Wrist",
-    "Rising (Belt)": "Rising", "Volume Side Pressure": "Side Pressure",
-    "Volume Rising": "Rising", "Static Pronation" :"Pronation",
-    "Heavy Riser":"Rising", "High Cable Side Pressure":"Side Pressure",
-    "Partial Curl":"Bicep" 
-}
+profiling.section("sidebar")
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -133,33 +160,53 @@ with st.sidebar:
     st.info(f"Logged in as: **{current_user}**")
 
     if st.button("Log Out"):
-        cookie_manager.set("arm_wrestling_user", "logged_out")
+        if shared_cache.enabled():
+            shared_cache.end_session(cookie_manager.get(cookie="arm_wrestling_session"))
+            cookie_manager.set("arm_wrestling_session", "logged_out")
+        else:
+            cookie_manager.set("arm_wrestling_user", "logged_out")
         st.session_state["logged_in"] = False
         st.session_state["username"] = None
         st.session_state["logout_clicked"] = True
-        st.success("Logging out...")
-        time.sleep(1)
+        st.toast("Logged out.")
         st.rerun()
 
+    # Writes run in the background; show what's still in flight
+    in_flight = write_queue.pending(current_user)
+    if in_flight:
+        st.caption(f"⏳ Saving {in_flight} change(s)...")
+
+    sync = replica.sync_status()
+    if sync["enabled"]:
+        if sync["online"] is False:
+            st.caption(f"📴 Offline — {sync['pending']} change(s) kept on this device")
+        elif sync["pending"]:
+            st.caption(f"🔄 Syncing {sync['pending']} change(s)...")
+        else:
+            st.caption("☁️ Synced")
+
+    if profiling.enabled():
+        views.render_debug_panel(profile_session)
+
+# Anything the background writer couldn't save (after retries)
+for write_error in write_queue.pop_errors(current_user):
+    st.error(f"❌ {write_error}")
+
 # --- SECTION 1: INPUT FORM ---
+profiling.section("form")
 st.header(f"Log a Set for {current_user}")
 
 # 1. FILTERS & EXERCISE SELECTION (OUTSIDE THE FORM NOW!) 🔓
 # This allows the app to refresh and show stats immediately when you change exercise.
 
-if current_user == "Kaisar":
-    day_filter = st.radio("⚡ Quick Select Day:", ["All Exercises", "Tue (Heavy/Vol)", "Thu (Statics)", "Sat (Table Power)", "Upper Body", "Abs"], horizontal=True)
-elif current_user == "Rahil":
-    day_filter = st.radio("⚡ Quick Select Day:", ["All Exercises", "Monday", "Wednesday", "Friday", "Saturday"], horizontal=True)
+# The day menu is whatever training days this lifter's library uses
+training_days = get_training_days(current_user)
+if len(training_days) > 1:
+    day_filter = st.radio("⚡ Quick Select Day:", [catalog.ALL_EXERCISES] + training_days, horizontal=True)
 else:
-    day_filter = "All Exercises"
-
-# Logic to get the list of exercises
-db_category_map = {
-    "Tue (Heavy/Vol)": "Tuesday", "Thu (Statics)": "Thursday", "Sat (Table Power)": "Saturday",
-    "Upper Body": "Upper Body", "Abs": "Abs", "Monday": "Monday", "Wednesday": "Wednesday", "Friday": "Friday"
-}
-selected_db_category = db_category_map.get(day_filter, None)
+    day_filter = catalog.ALL_EXERCISES
+
+selected_db_category = None if day_filter == catalog.ALL_EXERCISES else day_filter
 exercise_options = get_exercises_from_db(current_user, selected_db_category)
 
 if not exercise_options:
@@ -169,7 +216,7 @@ if not exercise_options:
 exercise = st.selectbox("Select Exercise to Log:", exercise_options)
 
 # 🔥 PROGRESSIVE OVERLOAD DISPLAY (Updates Instantly) 🔥
-last_log = get_last_log(current_user, exercise)
+last_log = get_last_logs(current_user, selected_db_category).get(exercise)
 if last_log:
     last_date, last_weight, last_sets, last_reps, last_note, last_rpe = last_log      
     # Date formatting
@@ -218,304 +265,27 @@ with st.form("workout_form", clear_on_submit=False):
 
     if submitted:
         try:
-            engine = get_engine()
-            sql_query = text("""
-                INSERT INTO workouts (date, exercise, weight, sets, reps, rpe, username, notes, bodyweight)
-                VALUES (:date, :exercise, :weight, :sets, :reps, :rpe, :username, :notes, :bodyweight)
-            """)
             data = {
                 "date": d, "exercise": exercise, "weight": weight, "sets": sets, 
                 "reps": reps, "rpe": rpe, "username": current_user, "notes": notes, "bodyweight": Bodyweight
             }
-            with engine.connect() as conn:
-                conn.execute(sql_query, data)
-                conn.commit()
-            st.success(f"✅ Saved {exercise}!")
-            time.sleep(1)
+            # Queued for the background writer; the cached frame shows it right away
+            write_queue.submit_insert(current_user, data)
+            remember_last_log(exercise, data)
+            st.toast(f"✅ Saved {exercise}!")
             st.rerun()
         except Exception as e:
             st.error(f"❌ Save Failed: {e}")
 
 
 # --- SECTION 2: DASHBOARD ---
+profiling.section("dashboard")
 st.divider()
 
-try:
-    engine = get_engine()
-    df = pd.read_sql("SELECT * FROM workouts", engine)
-    df = df.rename(columns={"date": "Date", "exercise": "Exercise", "weight": "Weight_kg", "sets": "Sets", "reps": "Reps", "rpe": "RPE", "username": "User", "notes": "Notes", "bodyweight": "Bodyweight"})
-except Exception as e:
-    st.error(f"❌ Error loading data: {e}")
-    st.stop()
-
-if "User" in df.columns:
-    df = df[df["User"] == current_user]
-else:
-    df = pd.DataFrame()
-
-if not df.empty:
-    df["Category"] = df["Exercise"].map(CATEGORY_MAP).fillna("Other")
-    df["Date"] = pd.to_datetime(df["Date"])
-    df["Display_Date"] = df["Date"].dt.strftime('%Y-%m-%d')
-    df["Weight_kg"] = pd.to_numeric(df["Weight_kg"], errors='coerce').fillna(0)
-    df["Sets"] = pd.to_numeric(df["Sets"], errors='coerce').fillna(0)
-    # NOTE: We do NOT force Reps to numeric anymore, so "5,4,3" is allowed.
-    df["Bodyweight"] = pd.to_numeric(df["Bodyweight"],errors='coerce').fillna(0)
-else:
-    st.info(f"👋 Welcome, {current_user}! You haven't logged any workouts yet.")
-
-# --- TABS ---
-tabs_list = ["📈 Progress", "📅 History", "📚 Logbook", "⚖️ Bodyweight", "🛠️ Manage Data"]
-all_tabs = st.tabs(tabs_list)
-tab1, tab2, tab3, tab4, tab5 = all_tabs[0], all_tabs[1], all_tabs[2], all_tabs[3], all_tabs[4]
-
-with tab1: # 📈 Progress & Analytics
-    if not df.empty:
-        # --- 1. PRE-CALCULATE ANALYTICS ---
-        target_exercise = st.selectbox("Select Exercise for Analysis:", df["Exercise"].unique())
-        ex_data = df[df["Exercise"] == target_exercise].sort_values("Date")
-        
-        if len(ex_data) > 1:
-            # A. Prepare Data
-            ex_data['date_ordinal'] = ex_data['Date'].map(datetime.toordinal)
-            
-            # B. ML Prediction
-            slope, intercept = np.polyfit(ex_data['date_ordinal'], ex_data['Weight_kg'], 1)
-            monthly_gain = slope * 30 
-            
-            # C. Calculate e1RM
-            ex_data["Clean_Reps"] = ex_data["Reps"].astype(str).str.split(',').str[0]
-            ex_data["Clean_Reps"] = pd.to_numeric(ex_data["Clean_Reps"], errors='coerce').fillna(1)
-            ex_data["e1RM"] = ex_data["Weight_kg"] * (1 + (ex_data["Clean_Reps"] / 30))
-            current_e1rm = ex_data["e1RM"].iloc[-1] 
-
-            # --- 2. THE DASHBOARD ---
-            col_main, col_metrics = st.columns([3, 1])
-            
-            with col_main:
-                # Forecast
-                future_date = datetime.now() + timedelta(days=30)
-                future_val = (slope * future_date.toordinal()) + intercept
-                st.caption(f"🤖 **Forecast:** hitting **{future_val:.1f} kg** in 30 days.")
-                
-                # --- 📊 MAIN GRAPH (The "Sick" Scatter) ---
-                fig = px.scatter(
-                    ex_data, 
-                    x="Date", 
-                    y="Weight_kg", 
-                    size=ex_data["RPE"].replace(0, 1), 
-                    color="RPE", 
-                    color_continuous_scale="RdYlGn_r", 
-                    hover_data=["Sets", "Reps", "e1RM"], 
-                    title=f"Progress: {target_exercise}",
-                    trendline="ols" 
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-            with col_metrics:
-                st.write("### ⚡ Stats")
-                
-                # Metric 1: Velocity
-                if monthly_gain > 0.5:
-                    st.metric("Growth Speed", f"+{monthly_gain:.1f} kg/mo", delta="Fast")
-                elif monthly_gain > 0:
-                    st.metric("Growth Speed", f"+{monthly_gain:.1f} kg/mo", delta="Steady")
-                else:
-                    st.metric("Growth Speed", f"{monthly_gain:.1f} kg/mo", delta="Stalled", delta_color="inverse")
-                
-                # Metric 2: Current Max
-                st.metric("Est. 1-Rep Max", f"{current_e1rm:.1f} kg")
-                
-                # --- 📉 NEW: MINI e1RM GRAPH ---
-                st.write("Theoretical Limit Trend:")
-                # We use a simple line chart here because it fits small spaces better
-                st.line_chart(ex_data.set_index("Date")["e1RM"], height=150, color="#FF4B4B")
-                
-        else:
-            st.warning("Log at least 2 workouts to unlock Analytics.")
-    else:
-        st.write("Start training to see your strength curve here!")
-
-with tab2: # History
-    if not df.empty:
-        st.dataframe(df.sort_values("Date", ascending=False), use_container_width=True, hide_index=True)
-    else:
-        st.write("No history yet.")
-
-with tab3: # Logbook
-    st.subheader("📚 Training Logbook")
-    if not df.empty:
-        st.caption("Click a day to see your history.")
-        df["Day_Name"] = df["Date"].dt.day_name()
-        days_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        for day in days_order:
-            day_data = df[df["Day_Name"] == day]
-            if not day_data.empty:
-                with st.expander(f"🗓️ {day} ({len(day_data)} logs)"):
-                    st.dataframe(day_data.sort_values("Date", ascending=False)[["Display_Date", "Exercise", "Weight_kg", "Sets", "Reps", "Notes"]], use_container_width=True, hide_index=True)
-    else:
-        st.write("Your logs will be grouped by day here.")
-with tab4: # ⚖️ Bodyweight
-    if not df.empty:
-        # --- 1. DATA TRANSFORMATION ---
-        # Create a dedicated dataframe for bodyweight to keep things clean
-        bw_df = df[["Date", "Bodyweight"]].sort_values("Date").dropna()
-        
-        # Create the derived column (The Math)
-        bw_df["Bodyweight_lbs"] = bw_df["Bodyweight"] * 2.20462
-        
-        # --- 2. USER CONTROL ---
-        col_controls, col_graph = st.columns([1, 4])
-        
-        with col_controls:
-            st.write("##") # Spacer
-            # The Toggle Switch
-            unit_choice = st.radio("Select Unit:", ["KG", "LBS"])
-        
-        # --- 3. THE VISUALIZATION ---
-        with col_graph:
-            # Logic: Choose which column to plot based on the radio button
-            y_col = "Bodyweight" if unit_choice == "KG" else "Bodyweight_lbs"
-            color_hex = "#1f77b4" if unit_choice == "KG" else "#ff7f0e" # Blue for KG, Orange for LBS
-            
-            fig_bw = px.line(
-                bw_df, 
-                x="Date", 
-                y=y_col, 
-                markers=True,
-                title=f"Bodyweight History ({unit_choice})",
-                height=350
-            )
-            
-            # Make it look "Sexy" (Minimalist style)
-            fig_bw.update_traces(line_color=color_hex, line_width=3)
-            fig_bw.update_layout(yaxis_title=unit_choice)
-            
-            st.plotly_chart(fig_bw, use_container_width=True)
-            
-        # Optional: Show the latest stat text
-        latest_bw = bw_df.iloc[-1]
-        st.metric(
-            label="Current Bodyweight", 
-            value=f"{latest_bw[y_col]:.1f} {unit_choice}"
-        )
-            
-    else:
-        st.write("Track your bodyweight to see it here.")
-
-with tab5: # Manage Data
-    st.subheader("🛠️ Manage Exercises")
-    
-    # --- 1. ADD NEW EXERCISE TO LIBRARY ---
-    with st.expander("➕ Add New Exercise to Library"):
-        with st.form("add_ex_form"):
-            new_ex_name = st.text_input("Name (e.g. King's Move)")
-            
-            # --- 🔒 LOGIC: ONLY SHOW RELEVANT DAYS ---
-            if current_user == "Kaisar":
-                cat_options = ["Tuesday (Heavy/Vol)", "Thursday (Statics)", "Saturday (Table Power)", "Upper Body", "Abs", "General"]
-            elif current_user == "Rahil":
-                cat_options = ["Monday", "Wednesday", "Friday", "Saturday", "General"]
-            else:
-                cat_options = ["General", "Other"] # Fallback
-            
-            # The dropdown now adapts to YOU
-            new_ex_cat = st.selectbox("Category", cat_options)
-            
-            if st.form_submit_button("Add Exercise"):
-                if new_ex_name:
-                    try:
-                        engine = get_engine()
-                        with engine.connect() as conn:
-                            # We explicitly save the username so Rahil never sees Kaisar's moves
-                            conn.execute(
-                                text("INSERT INTO exercise_library (name, category, username) VALUES (:n, :c, :u)"),
-                                {"n": new_ex_name, "c": new_ex_cat, "u": current_user}
-                            )
-                            conn.commit()
-                        st.success(f"✅ Added '{new_ex_name}' to {new_ex_cat}!")
-                        time.sleep(1)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ Error: {e}")
-                else:
-                    st.warning("Please enter a name.")
-
-    st.divider()
-
-    # --- 2. MANAGE YOUR LIBRARY (Delete Exercises) ---
-    st.subheader(f"📋 {current_user}'s Exercise Library")
-    
-    try:
-        engine = get_engine()
-        # Fetch only YOUR exercises
-        lib_df = pd.read_sql(text("SELECT * FROM exercise_library WHERE username = :u"), engine, params={"u": current_user})
-        
-        if not lib_df.empty:
-            st.dataframe(lib_df, use_container_width=True, hide_index=True)
-            
-            # Tool to remove mistakes from the library
-            col_del, col_btn = st.columns([3, 1])
-            with col_del:
-                ex_to_del = st.selectbox("Select Exercise to Delete from Library:", lib_df["name"].unique())
-            with col_btn:
-                st.write("##")
-                if st.button("🗑️ Remove"):
-                    with engine.connect() as conn:
-                        conn.execute(text("DELETE FROM exercise_library WHERE name = :n AND username = :u"), {"n": ex_to_del, "u": current_user})
-                        conn.commit()
-                    st.success("Deleted!")
-                    time.sleep(1)
-                    st.rerun()
-        else:
-            st.info("No exercises found in your library.")
-            
-    except Exception as e:
-        st.error(f"Could not load library: {e}")
-
-    st.divider()
-    
-    # --- 3. DELETE WORKOUT LOGS (Smart Dropdown) ---
-    st.subheader(f"🗑️ Delete {current_user}'s Workout Logs")
-    
-    if not df.empty:
-        # Create a "Human Readable" label for the dropdown
-        # Format: "Jan 05 | Pronation | 30kg | Notes..."
-        df["Delete_Label"] = (
-            df["Date"].astype(str) + " | " + 
-            df["Exercise"] + " | " + 
-            df["Weight_kg"].astype(str) + "kg | " +
-            df["Notes"].fillna("")
-        )
-        
-        # User picks the text, but we use the ID secretly
-        log_to_delete = st.selectbox("Select Entry to Delete:", df["Delete_Label"])
-        
-        if st.button("🗑️ Delete Selected Log"):
-            # Find the hidden ID that matches the label
-            real_id_to_delete = df.loc[df["Delete_Label"] == log_to_delete, "id"].values[0]
-            
-            try:
-                with engine.connect() as conn:
-                    # Execute delete using the hidden ID
-                    conn.execute(
-                        text("DELETE FROM workouts WHERE id = :id AND username = :u"), 
-                        {"id": int(real_id_to_delete), "u": current_user}
-                    )
-                    conn.commit()
-                st.success(f"Deleted log: {log_to_delete}")
-                time.sleep(1)
-                st.rerun()
-            except Exception as e:
-                st.error(f"Error: {e}")
-                
-        # Show recent history for reference
-        with st.expander("View Recent History Table"):
-            st.dataframe(
-                df[["Date", "Exercise", "Weight_kg", "Sets", "Reps", "Notes"]], 
-                hide_index=True, 
-                use_container_width=True
-            )
-
-    else:
-        st.info("No logs to delete.")
\ No newline at end of file
+# --- VIEW ROUTER ---
+# Only the selected view runs (st.tabs would execute all five every rerun)
+available_views = views.views_for(current_user)
+active_view = st.radio("View", list(available_views), horizontal=True, label_visibility="collapsed", key="active_view")
+profiling.section(f"view:{active_view}")
+available_views[active_view](current_user)
+profiling.finish_run()
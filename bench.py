@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+
+import analytics
+import catalog
+import data_access
+import db
+import exercise_stats
+import synthetic_data
+import workout_cache
+
+# --- BENCHMARKS ---
+# Times the app's hot data paths headlessly (no browser, no Streamlit)
+# against one or more databases filled with synthetic_data histories.
+# Reports p50/p95 latency and rows/s per case and saves everything as JSON,
+# so two commits can be compared run for run.
+#
+#   python bench.py                                          -> SQLite file bench.db
+#   python bench.py --db sqlite:///bench.db --db postgresql://localhost/bench --out before.json
+#   python bench.py --compare before.json after.json
+#   python bench.py --startup                                -> cold import cost per startup phase
+#   python bench.py --logging                                -> sets/s: form path vs JSON API
+
+
+# --- CASES ---
+# Each case takes a lifter's username and returns the number of rows it handled.
+def _dashboard_load(user):
+    df = data_access.load_workouts(user, "dashboard")
+    data_access.add_derived_columns(df, user)
+    return len(df)
+
+
+def _dashboard_cached(user):
+    return len(workout_cache.get_workouts(user))
+
+
+def _last_logs(user):
+    return len(data_access.get_last_logs(user, "Monday")) + len(data_access.get_last_logs(user))
+
+
+def _exercises(user):
+    # Cold: library read + index build (what every rerun used to pay); then cached lookups
+    catalog.invalidate(user)
+    return len(catalog.exercises(user, "Monday")) + len(catalog.exercises(user))
+
+
+def _exercises_cached(user):
+    return len(catalog.exercises(user, "Monday")) + len(catalog.exercises(user)) + len(catalog.days(user))
+
+
+def _busiest_exercise(df):
+    return df["Exercise"].value_counts().index[0]
+
+
+def _progress_summary(user):
+    df = workout_cache.get_workouts(user)
+    exercise = _busiest_exercise(df)
+    summary = exercise_stats.get_summary(user, exercise)
+    exercise_stats.predict(summary, datetime.now())
+    exercise_stats.monthly_gain(summary)
+    return int(summary["n"])
+
+
+def _progress_refit(user):
+    # The fallback path: regression + e1RM straight from the frame
+    df = workout_cache.get_workouts(user)
+    ex_data = df[df["Exercise"] == _busiest_exercise(df)]
+    exercise_stats.summarize_frame(ex_data)
+    return len(ex_data)
+
+
+def _analytics(user):
+    df = workout_cache.get_workouts(user)
+    analytics.compute(df)
+    return len(df)
+
+
+def _logbook(user):
+    df = workout_cache.get_workouts(user)
+    for group_by in ["Weekday", "Week"]:
+        data_access.logbook_groups(df, group_by)
+    return len(df)
+
+
+def _delete_labels(user):
+    page, _ = data_access.fetch_history_page(user, limit=25, columns="manage")
+    data_access.delete_labels(page)
+    return len(page)
+
+
+def _delete_labels_all(user):
+    # Worst case: labels for the whole history (what the old picker did)
+    df = workout_cache.get_workouts(user)
+    data_access.delete_labels(df)
+    return len(df)
+
+
+CASES = {
+    "dashboard_load": _dashboard_load,
+    "dashboard_cached": _dashboard_cached,
+    "last_logs": _last_logs,
+    "exercises": _exercises,
+    "exercises_cached": _exercises_cached,
+    "progress_summary": _progress_summary,
+    "progress_refit": _progress_refit,
+    "analytics": _analytics,
+    "logbook_grouping": _logbook,
+    "delete_labels_page": _delete_labels,
+    "delete_labels_all": _delete_labels_all,
+}
+
+
+# --- RUNNER ---
+def _summarize(latencies, rows):
+    latencies = np.asarray(latencies)
+    p50 = float(np.percentile(latencies, 50))
+    return {
+        "runs": len(latencies),
+        "p50_ms": p50 * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "mean_ms": float(latencies.mean()) * 1000,
+        "rows": int(np.median(rows)),
+        "rows_per_s": float(np.median(rows) / p50) if p50 else 0.0,
+    }
+
+
+def _use_database(db_url):
+    # Everything in the app reads db.get_app_url(); point it at the target
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.pop("REPLICA_PATH", None)
+    db.dispose_all()
+    workout_cache.clear()
+    catalog.clear()
+
+
+def run_target(db_url, cases, repeat, users):
+    _use_database(db_url)
+    with db.connect() as conn:
+        lifters = [row[0] for row in conn.execute(text("SELECT DISTINCT username FROM workouts ORDER BY 1"))]
+    lifters = lifters[:users] if users else lifters
+    if not lifters:
+        raise SystemExit(f"❌ No workouts in {db_url}; run with --seed first.")
+    results = {}
+    for name in cases:
+        case = CASES[name]
+        case(lifters[0])  # warm-up: pool, caches, imports
+        latencies, rows = [], []
+        for i in range(repeat):
+            user = lifters[i % len(lifters)]
+            started = time.perf_counter()
+            rows.append(case(user))
+            latencies.append(time.perf_counter() - started)
+        results[name] = _summarize(latencies, rows)
+        print(f"  {name:<20} p50 {results[name]['p50_ms']:8.2f} ms   p95 {results[name]['p95_ms']:8.2f} ms"
+              f"   {results[name]['rows_per_s']:>12,.0f} rows/s")
+    return results
+
+
+# --- LOGGING THROUGHPUT (form vs JSON API) ---
+# The form path is what one "Save Workout" costs: queue the insert, then the
+# rerun reads the dashboard frame again. The API path posts whole sessions
+# over one keep-alive connection. Both log the same sets for one lifter and
+# are removed again afterwards (tagged by their notes).
+BENCH_NOTE = "bench-logging"
+
+
+def _logging_sets(user, count):
+    with db.connect() as conn:
+        names = [row[0] for row in conn.execute(
+            text("SELECT name FROM exercise_library WHERE username = :u ORDER BY name"), {"u": user}
+        )]
+    day = datetime.now().date().isoformat()
+    return [
+        {"date": day, "exercise": names[i % len(names)], "weight": 20.0 + i % 10, "sets": 3,
+         "reps": "8,7,6", "rpe": 8, "notes": BENCH_NOTE}
+        for i in range(count)
+    ]
+
+
+def _remove_logged(user):
+    params = {"u": user, "n": BENCH_NOTE}
+    with db.begin() as conn:
+        logged = [row[0] for row in conn.execute(
+            text("SELECT DISTINCT exercise FROM workouts WHERE username = :u AND notes = :n"), params
+        )]
+        conn.execute(text("""
+            DELETE FROM workout_sets WHERE workout_id IN (
+                SELECT id FROM workouts WHERE username = :u AND notes = :n
+            )
+        """), params)
+        conn.execute(text("DELETE FROM workouts WHERE username = :u AND notes = :n"), params)
+        for exercise in logged:
+            exercise_stats.rebuild(conn, user, exercise)
+    workout_cache.clear()
+
+
+def measure_logging(db_url, count=200, batch_size=20):
+    import base64
+    import http.client
+    import threading
+
+    import api
+    import write_queue
+
+    _use_database(db_url)
+    with db.connect() as conn:
+        user = conn.execute(text("SELECT MIN(username) FROM workouts")).scalar()
+    sets = _logging_sets(user, count)
+    report = {"sets": count, "batch_size": batch_size}
+
+    # 1. Form: one submit + one rerun per set, then wait for the writer
+    workout_cache.get_workouts(user)
+    started = time.perf_counter()
+    for data in sets:
+        write_queue.submit_insert(user, {**data, "username": user, "bodyweight": None})
+        workout_cache.get_workouts(user)
+    write_queue.flush()
+    report["form"] = {"seconds": time.perf_counter() - started}
+    _remove_logged(user)
+
+    # 2. API: sessions of batch_size sets, one request (and transaction) each
+    os.environ["API_PASSWORDS"] = f"{user}:bench"
+    api._passwords = None
+    server = api.make_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = http.client.HTTPConnection(*server.server_address[:2])
+    headers = {"Content-Type": "application/json",
+               "Authorization": "Basic " + base64.b64encode(f"{user}:bench".encode()).decode()}
+    for name, size in [("api_single", 1), ("api_batch", batch_size)]:
+        latencies = []
+        started = time.perf_counter()
+        for i in range(0, count, size):
+            sent = time.perf_counter()
+            client.request("POST", "/api/sets", json.dumps({"sets": sets[i:i + size]}), headers)
+            response = client.getresponse()
+            response.read()
+            if response.status != 201:
+                raise SystemExit(f"❌ API answered {response.status}")
+            latencies.append(time.perf_counter() - sent)
+        report[name] = {"seconds": time.perf_counter() - started, "p50_request_ms": float(np.median(latencies)) * 1000}
+        _remove_logged(user)
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+    for name in ["form", "api_single", "api_batch"]:
+        report[name]["sets_per_s"] = count / report[name]["seconds"]
+        print(f"  {name:<20} {report[name]['sets_per_s']:10,.0f} sets/s"
+              + (f"   p50 {report[name]['p50_request_ms']:8.2f} ms/request" if "p50_request_ms" in report[name] else ""))
+    return report
+
+
+# --- STARTUP (cold imports, fresh interpreter per run) ---
+# What each phase of app.py has to import. The login screen only needs the
+# first group; before lazy loading, every session start paid for all three.
+STARTUP_PHASES = {
+    "login_screen": ["streamlit", "extra_streamlit_components", "profiling", "shared_cache"],
+    "data_layer": ["db", "data_access", "write_queue", "replica", "views"],
+    "charts": ["charts"],
+}
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+out = {}
+for phase, modules in json.loads(sys.argv[1]).items():
+    started = time.perf_counter()
+    try:
+        for module in modules:
+            __import__(module)
+        out[phase] = time.perf_counter() - started
+    except ImportError as e:
+        out[phase] = str(e)
+print(json.dumps(out))
+"""
+
+
+def measure_startup(repeat=5):
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = {phase: [] for phase in STARTUP_PHASES}
+    errors = {}
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, json.dumps(STARTUP_PHASES)],
+            capture_output=True, text=True, cwd=here, check=True
+        )
+        for phase, value in json.loads(result.stdout).items():
+            if isinstance(value, str):
+                errors[phase] = value
+            else:
+                samples[phase].append(value)
+    report = {}
+    for phase, values in samples.items():
+        if phase in errors:
+            report[phase] = {"error": errors[phase]}
+            print(f"  {phase:<20} ⚠️ {errors[phase]}")
+            continue
+        report[phase] = {"runs": len(values), "p50_ms": float(np.median(values)) * 1000}
+        print(f"  {phase:<20} p50 {report[phase]['p50_ms']:8.1f} ms")
+    timed = [r["p50_ms"] for r in report.values() if "p50_ms" in r]
+    if "p50_ms" in report["login_screen"]:
+        # First paint now waits for the login imports only, not the whole stack
+        report["first_paint_ms"] = report["login_screen"]["p50_ms"]
+        report["eager_import_ms"] = sum(timed)
+        print(f"  imports before first paint: {report['first_paint_ms']:.1f} ms "
+              f"(was {report['eager_import_ms']:.1f} ms with everything imported up front)")
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['commit']} -> {after['commit']}")
+    for target, cases in after["results"].items():
+        print(f"\n{target}")
+        for name, stats in cases.items():
+            old = before["results"].get(target, {}).get(name)
+            if old is None:
+                continue
+            change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0.0
+            flag = "🔴" if change > 10 else "🟢" if change < -10 else "  "
+            print(f"  {flag} {name:<20} {old['p50_ms']:8.2f} -> {stats['p50_ms']:8.2f} ms ({change:+.0f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the app's data paths.")
+    parser.add_argument("--db", action="append", help="SQLAlchemy URL (repeat for several databases)")
+    parser.add_argument("--seed", action="store_true", help="load synthetic data first (idempotent)")
+    parser.add_argument("--users", type=int, default=20, help="synthetic lifters / lifters to cycle through")
+    parser.add_argument("--days", type=int, default=365, help="days of synthetic history per lifter")
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case")
+    parser.add_argument("--case", action="append", choices=list(CASES), help="only these cases")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--startup", action="store_true", help="also measure cold import time per startup phase")
+    parser.add_argument("--logging", action="store_true", help="also compare set logging: form path vs JSON API")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        raise SystemExit(0)
+
+    targets = args.db or ["sqlite:///bench.db"]
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {"users": args.users, "days": args.days, "repeat": args.repeat},
+        "results": {},
+    }
+    if args.startup:
+        print("🚀 Startup imports")
+        report["startup"] = measure_startup()
+    for db_url in targets:
+        label = db_url.split("@")[-1]  # never write credentials into the report
+        if args.seed:
+            print(f"🌱 Seeding {label} ...")
+            workouts, _, load_report = synthetic_data.load(db_url, args.users, args.days)
+            report.setdefault("seed", {})[label] = {"rows": len(workouts), "import": load_report}
+        print(f"⏱️ {label}")
+        report["results"][label] = run_target(db_url, args.case or list(CASES), args.repeat, args.users)
+        memory = workout_cache.memory_report()
+        report.setdefault("memory", {})[label] = memory
+        print(f"  🧠 cached frames {memory['bytes'] / 1e6:.2f} MB for {memory['rows']:,} rows "
+              f"({memory['saved_pct']:.0f}% less than {memory['plain_bytes'] / 1e6:.2f} MB with plain dtypes)")
+        if args.logging:
+            print(f"📝 Logging {label}")
+            report.setdefault("logging", {})[label] = measure_logging(db_url)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Saved {args.out}")
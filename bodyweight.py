@@ -0,0 +1,95 @@
+import pandas as pd
+from sqlalchemy import text
+
+import db
+
+# --- DAILY BODYWEIGHT SERIES ---
+# Bodyweight is typed on every set, so the workouts table holds one copy of
+# it per exercise logged that day (and 0 when the field was left empty).
+# bodyweight_daily keeps one value per lifter per day: the most recent
+# non-zero entry. It's maintained on every save/delete, so the Bodyweight
+# view reads a few hundred rows at most, then smooths / resamples / converts
+# units on that reduced series.
+
+LBS_PER_KG = 2.20462
+RESOLUTIONS = {"Daily": None, "Weekly": "W-SUN", "Monthly": "MS"}
+ROLLING_DAYS = 7
+ROLLING_PERIODS = 4  # weeks / months averaged once resampled
+
+
+# --- WRITE HOOKS (called inside the caller's transaction) ---
+def apply_insert(conn, data):
+    # The newest entry of a day wins, and a new row is always the newest
+    if not data.get("bodyweight"):
+        return
+    conn.execute(
+        text("""
+            INSERT INTO bodyweight_daily (username, date, bodyweight) VALUES (:u, :d, :bw)
+            ON CONFLICT (username, date) DO UPDATE SET bodyweight = excluded.bodyweight
+        """),
+        {"u": data["username"], "d": data["date"], "bw": float(data["bodyweight"])}
+    )
+
+
+def refresh_day(conn, user, day):
+    # After a delete: fall back to the day's next most recent entry (or nothing)
+    conn.execute(text("DELETE FROM bodyweight_daily WHERE username = :u AND date = :d"), {"u": user, "d": day})
+    conn.execute(
+        text("""
+            INSERT INTO bodyweight_daily (username, date, bodyweight)
+            SELECT username, date, bodyweight FROM workouts
+            WHERE username = :u AND date = :d AND bodyweight > 0
+            ORDER BY id DESC LIMIT 1
+        """),
+        {"u": user, "d": day}
+    )
+
+
+def rebuild(conn, user=None):
+    # Whole table (migration backfill, bulk imports) in one set-based statement
+    where = "WHERE username = :u" if user else ""
+    conn.execute(text(f"DELETE FROM bodyweight_daily {where}"), {"u": user})
+    conn.execute(
+        text(f"""
+            INSERT INTO bodyweight_daily (username, date, bodyweight)
+            SELECT username, date, bodyweight FROM (
+                SELECT username, date, bodyweight,
+                       ROW_NUMBER() OVER (PARTITION BY username, date ORDER BY id DESC) AS rn
+                FROM workouts
+                WHERE bodyweight > 0 {"AND username = :u" if user else ""}
+            ) latest
+            WHERE rn = 1
+        """),
+        {"u": user}
+    )
+
+
+# --- READ SIDE ---
+def load_daily(user, start_date=None, conn=None):
+    query = "SELECT date AS \"Date\", bodyweight AS \"Bodyweight\" FROM bodyweight_daily WHERE username = :u"
+    params = {"u": user}
+    if start_date is not None:
+        query += " AND date >= :start"
+        params["start"] = start_date
+    query = text(query + " ORDER BY date")
+    if conn is None:
+        with db.connect() as conn:
+            return pd.read_sql(query, conn, params=params, parse_dates=["Date"], dtype={"Bodyweight": "float64"})
+    return pd.read_sql(query, conn, params=params, parse_dates=["Date"], dtype={"Bodyweight": "float64"})
+
+
+def series(daily, unit="KG", resolution="Daily", rolling_days=ROLLING_DAYS):
+    # Date, Bodyweight, Average (last N calendar days, or last few weeks / months)
+    if daily.empty:
+        return daily.assign(Average=pd.Series(dtype="float64"))
+    values = daily.set_index("Date")["Bodyweight"]
+    freq = RESOLUTIONS[resolution]
+    if freq:
+        values = values.resample(freq).mean().dropna()
+        average = values.rolling(ROLLING_PERIODS, min_periods=1).mean()
+    else:
+        average = values.rolling(f"{rolling_days}D").mean()
+    out = pd.DataFrame({"Bodyweight": values, "Average": average})
+    if unit == "LBS":
+        out = out * LBS_PER_KG  # one vectorized step, on the reduced series
+    return out.reset_index(names="Date")
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import db
+import shared_cache
+
+# --- EXERCISE CATALOG ---
+# Each lifter's exercise_library, read once and kept in memory (LRU bound).
+# Reruns take the dropdown options, the day menu and the muscle group of
+# every logged exercise from here instead of querying the library again.
+# Adding or removing an exercise (write_queue) and library changes pulled
+# by the replica invalidate only that lifter's entry, on every app replica
+# when shared_cache is on.
+#
+# exercise_library.category is the training day ("Monday", "Abs"...);
+# muscle_group is what the dashboard calls Category ("Pronation"...).
+
+CATALOG_MAX_USERS = 64
+ALL_EXERCISES = "All Exercises"
+OTHER = "Other"
+GENERAL = "General"
+DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Muscle groups for the original exercise set. Only used to seed data: the
+# migration backfill, synthetic_data, and CSV logs that have no library.
+DEFAULT_MUSCLE_GROUPS = {
+    "Index Knuckle Pronation": "Pronation", "Heavy Pronation Lift": "Pronation",
+    "Static Back Pressure": "Back Pressure", "Single-Loop Back Pressure":"Back Pressure",
+    "Cupping (Pulley)": "Cupping", "Low Multi-Spinner":"Cupping",
+    "Volume Cupping":"Cupping", "Static Cupping":"Cupping",
+    "Finger Containment (Static)": "Fingers", "Heavy Wrist Wrench": "Wrist",
+    "Rising (Belt)": "Rising", "Volume Side Pressure": "Side Pressure",
+    "Volume Rising": "Rising", "Static Pronation" :"Pronation",
+    "Heavy Riser":"Rising", "High Cable Side Pressure":"Side Pressure",
+    "Partial Curl":"Bicep"
+}
+
+_entries = OrderedDict()  # username -> {"library", "names", "group_codes", "groups", "by_day", "version"}
+_versions = {}            # username -> counter, bumped on every invalidation
+_lock = threading.RLock()
+
+
+def _day_sort_key(day):
+    # Weekdays first in calendar order (also "Tuesday (Heavy/Vol)"), the rest A-Z
+    for i, name in enumerate(DAYS_ORDER):
+        if day.startswith(name):
+            return (0, i, day)
+    return (1, 0, day)
+
+
+def _build(library):
+    library = library.sort_values("name", ignore_index=True)
+    groups = pd.Categorical(library["muscle_group"].fillna(OTHER).replace("", OTHER))
+    categories = list(groups.categories)
+    if OTHER not in categories:
+        categories.append(OTHER)
+    groups = groups.set_categories(categories)
+    return {
+        "library": library,
+        "names": pd.Index(library["name"]),
+        # Position in names -> muscle group code; one extra slot for "not in the library"
+        "group_codes": np.append(groups.codes, categories.index(OTHER)).astype(groups.codes.dtype),
+        "groups": pd.CategoricalDtype(categories),
+        "by_day": {
+            day: list(names)
+            for day, names in sorted(library.groupby("category")["name"], key=lambda item: _day_sort_key(item[0]))
+        },
+    }
+
+
+def _load(user, conn):
+    return pd.read_sql(
+        text("SELECT name, category, muscle_group FROM exercise_library WHERE username = :u"),
+        conn, params={"u": user}, dtype={"name": "object", "category": "object", "muscle_group": "object"}
+    )
+
+
+def get(user, conn=None):
+    with _lock:
+        entry = _entries.get(user)
+        if entry is not None:
+            _entries.move_to_end(user)
+            return entry
+    # Shared between app replicas when shared_cache is on
+    shared_version = shared_cache.version("catalog", user)
+    library = shared_cache.load("catalog", user, shared_version)
+    if library is None:
+        if conn is None:
+            with db.connect() as conn:
+                library = _load(user, conn)
+        else:
+            library = _load(user, conn)
+        library["category"] = library["category"].fillna(GENERAL)
+        shared_cache.store("catalog", user, shared_version, library)
+    entry = _build(library)
+    with _lock:
+        entry["version"] = _versions.setdefault(user, 1)
+        _entries[user] = entry
+        _entries.move_to_end(user)
+        while len(_entries) > CATALOG_MAX_USERS:
+            _entries.popitem(last=False)
+    return entry
+
+
+def invalidate(user):
+    with _lock:
+        _entries.pop(user, None)
+        _versions[user] = _versions.get(user, 1) + 1
+
+
+# Another replica edited this lifter's library
+shared_cache.subscribe("catalog", invalidate)
+
+
+def clear():
+    with _lock:
+        for user in _entries:
+            _versions[user] = _versions.get(user, 1) + 1
+        _entries.clear()
+
+
+def version(user):
+    with _lock:
+        return _versions.get(user, 1)
+
+
+# --- LOOKUPS ---
+def exercises(user, day=None):
+    # Dropdown options: the whole library or one training day
+    entry = get(user)
+    if day and day != ALL_EXERCISES:
+        return list(entry["by_day"].get(day, []))
+    return list(entry["names"])
+
+
+def days(user):
+    # The lifter's "Quick Select Day" menu, straight from their library
+    return list(get(user)["by_day"])
+
+
+def muscle_groups(user):
+    return [group for group in get(user)["groups"].categories if group != OTHER]
+
+
+def library(user):
+    return get(user)["library"]
+
+
+def muscle_group_of(user, exercise_names):
+    # Categorical muscle group per exercise: one index lookup, no per-row dict access
+    entry = get(user)
+    positions = entry["names"].get_indexer(exercise_names)
+    positions[positions < 0] = len(entry["names"])
+    codes = entry["group_codes"][positions]
+    return pd.Categorical.from_codes(codes, dtype=entry["groups"])
@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.express as px
+
+import exercise_stats
+
+# --- FIGURE CACHE ---
+# Building a plotly figure (px.* + validation) is the slow part of a rerun.
+# Figures are cached per (chart, user, exercise, data version, unit) and
+# evicted LRU, so flipping an unrelated widget reuses the same figure. The
+# data version comes from workout_cache and changes on every save/delete.
+# Long histories are thinned with LTTB before plotting.
+#
+# The cache holds Figure objects, not fig.to_json(): st.plotly_chart takes a
+# figure or a dict and always validates and serializes it again itself, so a
+# cached JSON string would be parsed back into a Figure on every rerun. What
+# is saved here is the px build; downsampling keeps the per-rerun
+# serialization at MAX_POINTS per series. Rendering the JSON ourselves
+# (components.html + plotly.js) would need a CDN, which the offline replica
+# mode can't count on.
+
+MAX_FIGURES = 128
+MAX_POINTS = 500  # per series, after downsampling
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def cached_figure(key, build):
+    with _lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+            _stats["hits"] += 1
+            return fig
+    fig = build()
+    with _lock:
+        _figures[key] = fig
+        _figures.move_to_end(key)
+        _stats["misses"] += 1
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+            _stats["evictions"] += 1
+    return fig
+
+
+def figure_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["figures"] = len(_figures)
+    return stats
+
+
+# --- DOWNSAMPLING ---
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the points that shape the curve
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    picked = np.empty(threshold, dtype=int)
+    picked[0] = 0
+    picked[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third corner of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def downsample(frame, x_col, y_col, threshold=MAX_POINTS):
+    if len(frame) <= threshold:
+        return frame
+    x = frame[x_col].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[s]").astype(np.int64)
+    return frame.iloc[lttb_indices(x, frame[y_col].to_numpy(dtype=float), threshold)]
+
+
+# --- CHARTS ---
+def progress_figure(user, exercise, version, ex_data, summary):
+    def build():
+        plot_data = downsample(ex_data, "Date", "Weight_kg")
+        fig = px.scatter(
+            plot_data,
+            x="Date",
+            y="Weight_kg",
+            size=plot_data["RPE"].replace(0, 1),
+            color="RPE",
+            color_continuous_scale="RdYlGn_r",
+            hover_data=["Sets", "Reps", "Volume", "e1RM"],
+            title=f"Progress: {exercise}",
+        )
+        # Draw the stored regression line instead of refitting with statsmodels
+        trend_x, trend_y = exercise_stats.trend_line(summary)
+        fig.add_scatter(x=trend_x, y=trend_y, mode="lines", name="Trend", showlegend=False)
+        return fig
+
+    return cached_figure(("progress", user, exercise, version), build)
+
+
+def bodyweight_figure(user, version, bw_df, unit, resolution):
+    def build():
+        # Already one point per day/week/month; thinned further only for very long histories
+        plot_data = downsample(bw_df, "Date", "Bodyweight")
+        color_hex = "#1f77b4" if unit == "KG" else "#ff7f0e"  # Blue for KG, Orange for LBS
+        fig = px.line(
+            plot_data,
+            x="Date",
+            y="Bodyweight",
+            markers=True,
+            title=f"Bodyweight History ({unit})",
+            height=350
+        )
+        # Make it look "Sexy" (Minimalist style)
+        fig.update_traces(line_color=color_hex, line_width=3)
+        fig.add_scatter(
+            x=plot_data["Date"], y=plot_data["Average"], mode="lines", name="Average",
+            line={"color": color_hex, "width": 1, "dash": "dot"}
+        )
+        fig.update_layout(yaxis_title=unit, showlegend=False)
+        return fig
+
+    return cached_figure(("bodyweight", user, version, unit, resolution), build)
@@ -0,0 +1,353 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import text
+
+import bodyweight
+import catalog
+import db
+import exercise_stats
+import reps
+
+# --- DATA ACCESS LAYER ---
+# All reads of the workouts table go through here. Filtering by user,
+# column projection and dtypes are pushed into SQL, so the app never pulls
+# other lifters' rows (or columns it won't show) across the network.
+
+# App column name -> (SQL expression, dtype set at read time)
+# NULLs are defaulted in SQL so the ints never have to be patched in pandas.
+WORKOUT_COLUMNS = {
+    "id": ("id", "int64"),
+    "Date": ("date", None),  # parsed as datetime64 by read_sql
+    "Exercise": ("exercise", "string"),
+    "Weight_kg": ("COALESCE(weight, 0)", "float64"),
+    "Sets": ("COALESCE(sets, 0)", "int64"),
+    "Reps": ("COALESCE(CAST(reps AS TEXT), '')", "string"),
+    "RPE": ("COALESCE(rpe, 0)", "int64"),
+    "Notes": ("COALESCE(notes, '')", "string"),
+    "Bodyweight": ("COALESCE(bodyweight, 0)", "float64"),
+    # Stored per row on write (see reps.py), never re-parsed from the text
+    "Total_Reps": ("COALESCE(total_reps, 0)", "int64"),
+    "Volume": ("COALESCE(volume, 0)", "float64"),
+    "e1RM": ("COALESCE(best_e1rm, 0)", "float64"),
+    # Legacy notebook columns (CSV imports); empty for sets typed in the app
+    "Arm": ("COALESCE(arm, '')", "string"),
+    "Soreness": ("COALESCE(soreness, 0)", "int64"),
+}
+
+# What each dashboard tab actually displays
+VIEW_COLUMNS = {
+    "progress": ["id", "Date", "Exercise", "Weight_kg", "Sets", "Reps", "RPE", "Total_Reps", "Volume", "e1RM"],
+    "history": ["id", "Date", "Exercise", "Weight_kg", "Sets", "Reps", "RPE", "Notes", "Bodyweight"],
+    "logbook": ["id", "Date", "Exercise", "Weight_kg", "Sets", "Reps", "Notes"],
+    "bodyweight": ["Date", "Bodyweight"],
+    "manage": ["id", "Date", "Exercise", "Weight_kg", "Sets", "Reps", "Notes"],
+}
+VIEW_COLUMNS["dashboard"] = list(WORKOUT_COLUMNS)
+
+
+def _select_list(columns):
+    return ", ".join(f'{WORKOUT_COLUMNS[col][0]} AS "{col}"' for col in columns)
+
+
+def empty_frame(columns):
+    df = pd.DataFrame({col: pd.Series(dtype=WORKOUT_COLUMNS[col][1] or "datetime64[ns]") for col in columns})
+    return df
+
+
+def load_workouts(user, columns=None, start_date=None, end_date=None, exercises=None, after_id=None, conn=None):
+    if columns is None:
+        columns = VIEW_COLUMNS["dashboard"]
+    elif isinstance(columns, str):
+        columns = VIEW_COLUMNS[columns]
+
+    # 1. Build the WHERE clause (only this user's rows, only the range we show)
+    where = ["username = :user"]
+    params = {"user": user}
+    if start_date is not None:
+        where.append("date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        where.append("date <= :end_date")
+        params["end_date"] = end_date
+    if after_id is not None:
+        # Incremental fetch: only rows newer than what the caller already has
+        where.append("id > :after_id")
+        params["after_id"] = int(after_id)
+    if exercises:
+        placeholders = []
+        for i, ex in enumerate(exercises):
+            placeholders.append(f":ex{i}")
+            params[f"ex{i}"] = ex
+        where.append(f"exercise IN ({', '.join(placeholders)})")
+
+    query = text(f"SELECT {_select_list(columns)} FROM workouts WHERE {' AND '.join(where)} ORDER BY date, id")
+
+    # 2. Read with dtypes applied by pandas as the rows arrive
+    dtypes = {col: WORKOUT_COLUMNS[col][1] for col in columns if WORKOUT_COLUMNS[col][1]}
+    parse_dates = ["Date"] if "Date" in columns else None
+    if conn is None:
+        with db.connect() as conn:
+            df = pd.read_sql(query, conn, params=params, dtype=dtypes, parse_dates=parse_dates)
+    else:
+        df = pd.read_sql(query, conn, params=params, dtype=dtypes, parse_dates=parse_dates)
+
+    if df.empty:
+        return empty_frame(columns)
+    return df
+
+
+def add_derived_columns(df, user):
+    # Columns the dashboard shows but the database doesn't store
+    if "Exercise" in df.columns:
+        df["Category"] = catalog.muscle_group_of(user, df["Exercise"])
+    return df
+
+
+# --- COMPACT FRAME ---
+# The long-lived copy workout_cache shares between sessions. Repeated text
+# is stored as categories, weights as float32 (entered in 0.5 kg steps, so
+# exact) and small counts as int8/int16. Display strings aren't stored at all:
+# add_labels() builds them for the rows actually being shown.
+COMPACT_DTYPES = {
+    "Exercise": "category",
+    "Reps": "category",
+    "Notes": "category",
+    "Arm": "category",
+    "Weight_kg": "float32",
+    "Bodyweight": "float32",
+    "Volume": "float32",
+    "e1RM": "float32",
+    "Sets": "int16",
+    "RPE": "int8",
+    "Soreness": "int8",
+    "Total_Reps": "int32",
+}
+LABELS = {
+    "Display_Date": lambda df: df["Date"].dt.strftime("%Y-%m-%d"),
+}
+
+
+def compact_frame(df):
+    return df.astype({col: dtype for col, dtype in COMPACT_DTYPES.items() if col in df.columns})
+
+
+def append_compact(df, new_rows):
+    # pd.concat only keeps a categorical when both sides have the same
+    # categories, so new ones are appended first (existing codes stay valid)
+    new_rows = compact_frame(new_rows)
+    for col in df.columns:
+        if col not in new_rows.columns or not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        categories = df[col].cat.categories
+        extra = new_rows[col].cat.categories.difference(categories)
+        if len(extra):
+            categories = categories.append(extra)
+            df = df.assign(**{col: df[col].cat.set_categories(categories)})
+        new_rows = new_rows.assign(**{col: new_rows[col].cat.set_categories(categories)})
+    return pd.concat([df, new_rows], ignore_index=True)
+
+
+def add_labels(df, columns):
+    # Only the requested display columns, computed on this (already sliced) frame
+    missing = {col: LABELS[col](df) for col in columns if col in LABELS and col not in df.columns}
+    return df.assign(**missing) if missing else df
+
+
+def logbook_groups(log_df, group_by):
+    # [(weekday name or week start, rows)], newest rows first inside each group.
+    # One sort for everything; groupby keeps that order inside each group.
+    log_df = log_df.sort_values(["Date", "id"], ascending=False)
+    if group_by == "Weekday":
+        groups = log_df.groupby(log_df["Date"].dt.day_name(), sort=False)
+        return [(day, groups.get_group(day)) for day in catalog.DAYS_ORDER if day in groups.groups]
+    week_start = log_df["Date"].dt.to_period("W-SUN").dt.start_time
+    groups = log_df.groupby(week_start, sort=False)
+    return [(week, groups.get_group(week)) for week in groups.groups]  # newest week first
+
+
+def delete_labels(page):
+    # id -> "2026-01-05 | Pronation | 30.0kg | Notes..." for the delete picker
+    return dict(zip(
+        page["id"],
+        page["Date"].dt.strftime("%Y-%m-%d") + " | " +
+        page["Exercise"].astype("string") + " | " +
+        page["Weight_kg"].astype(str) + "kg | " +
+        page["Notes"].astype("string")
+    ))
+
+
+def list_logged_exercises(user, conn=None):
+    query = text("SELECT DISTINCT exercise FROM workouts WHERE username = :user ORDER BY exercise")
+    if conn is None:
+        with db.connect() as conn:
+            return [row[0] for row in conn.execute(query, {"user": user})]
+    return [row[0] for row in conn.execute(query, {"user": user})]
+
+
+def get_last_logs(user, category=None, conn=None):
+    # Latest log for every exercise of a training day, in one round trip.
+    # ROW_NUMBER works on both Postgres and SQLite (DISTINCT ON is Postgres-only).
+    category_filter = ""
+    params = {"user": user}
+    if category and category != catalog.ALL_EXERCISES:
+        category_filter = """
+            AND exercise IN (
+                SELECT name FROM exercise_library WHERE username = :user AND category = :cat
+            )"""
+        params["cat"] = category
+    query = text(f"""
+        SELECT exercise, date, weight, sets, reps, notes, rpe
+        FROM (
+            SELECT exercise, date, weight, sets, reps, notes, rpe,
+                   ROW_NUMBER() OVER (PARTITION BY exercise ORDER BY date DESC, id DESC) AS rn
+            FROM workouts
+            WHERE username = :user{category_filter}
+        ) latest
+        WHERE rn = 1
+    """)
+    if conn is None:
+        with db.connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+    else:
+        rows = conn.execute(query, params).fetchall()
+    # exercise -> (date, weight, sets, reps, notes, rpe), same shape as the old get_last_log
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def fetch_history_page(user, cursor=None, limit=25, exercise=None, start_date=None, end_date=None,
+                       columns="history", conn=None):
+    # Keyset pagination, newest first: the cursor is the (date, id) of the last
+    # row already shown, so page N costs the same as page 1 (no OFFSET scan).
+    if isinstance(columns, str):
+        columns = VIEW_COLUMNS[columns]
+    where = ["username = :user"]
+    params = {"user": user, "limit": int(limit) + 1}
+    if cursor is not None:
+        where.append("(date < :cursor_date OR (date = :cursor_date AND id < :cursor_id))")
+        params["cursor_date"], params["cursor_id"] = cursor[0], int(cursor[1])
+    if exercise:
+        where.append("exercise = :ex")
+        params["ex"] = exercise
+    if start_date is not None:
+        where.append("date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        where.append("date <= :end_date")
+        params["end_date"] = end_date
+
+    query = text(f"""
+        SELECT {_select_list(columns)}, date AS cursor_date FROM workouts
+        WHERE {' AND '.join(where)}
+        ORDER BY date DESC, id DESC
+        LIMIT :limit
+    """)
+    dtypes = {col: WORKOUT_COLUMNS[col][1] for col in columns if WORKOUT_COLUMNS[col][1]}
+    parse_dates = ["Date"] if "Date" in columns else None
+    if conn is None:
+        with db.connect() as conn:
+            df = pd.read_sql(query, conn, params=params, dtype=dtypes, parse_dates=parse_dates)
+    else:
+        df = pd.read_sql(query, conn, params=params, dtype=dtypes, parse_dates=parse_dates)
+
+    # The extra row only tells us whether there is a next page
+    next_cursor = None
+    if len(df) > limit:
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        next_cursor = (last["cursor_date"], int(last["id"]))
+    df = df.drop(columns="cursor_date")
+    if df.empty:
+        return empty_frame(columns), None
+    return df, next_cursor
+
+
+# --- WRITES ---
+# Keeping the INSERT/DELETE here lets caches and summaries hook into one place.
+# The exercise_stats summary is maintained inside the same transaction.
+
+INSERT_WORKOUT_SQL = text("""
+    INSERT INTO workouts (date, exercise, weight, sets, reps, rpe, username, notes, bodyweight,
+                          total_reps, volume, best_e1rm, updated_at)
+    VALUES (:date, :exercise, :weight, :sets, :reps, :rpe, :username, :notes, :bodyweight,
+            :total_reps, :volume, :best_e1rm, :updated_at)
+    RETURNING id
+""")
+
+INSERT_SETS_SQL = text("INSERT INTO workout_sets (workout_id, set_no, reps) VALUES (:workout_id, :set_no, :reps)")
+
+
+def utc_now():
+    # Naive UTC, so SQLite and Postgres TIMESTAMP columns compare the same way
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def with_set_metrics_many(batch):
+    # Parse the reps text once, at write time (one pass for a whole session)
+    matrix = reps.parse_reps([data["reps"] for data in batch], [data["sets"] for data in batch])
+    metrics = reps.set_metrics([data["weight"] or 0 for data in batch], matrix)
+    rows = []
+    for i, data in enumerate(batch):
+        row = dict(data)
+        row["total_reps"] = int(metrics["total_reps"][i])
+        row["volume"] = float(metrics["volume"][i])
+        row["best_e1rm"] = float(metrics["best_e1rm"][i])
+        # Replica sync resolves conflicts on this; a pushed row keeps its local stamp
+        row.setdefault("updated_at", utc_now())
+        rows.append(row)
+    return rows, matrix
+
+
+def insert_workout(conn, data):
+    return insert_workouts(conn, [data])[0]
+
+
+def insert_workouts(conn, batch):
+    # Rows one by one (each needs its id, and the summaries see earlier rows
+    # of the same batch); every performed set in one executemany at the end
+    rows, matrix = with_set_metrics_many(batch)
+    new_ids = []
+    for row in rows:
+        new_id = int(conn.execute(INSERT_WORKOUT_SQL, row).scalar_one())
+        exercise_stats.apply_insert(conn, row, new_id)
+        bodyweight.apply_insert(conn, row)
+        new_ids.append(new_id)
+    set_rows = reps.set_rows(new_ids, matrix)
+    if set_rows:
+        conn.execute(INSERT_SETS_SQL, set_rows)
+    return new_ids
+
+
+def delete_workout(conn, user, workout_id):
+    # SQLite only cascades with PRAGMA foreign_keys on, so clear the sets explicitly
+    conn.execute(
+        text("""
+            DELETE FROM workout_sets WHERE workout_id IN (
+                SELECT id FROM workouts WHERE id = :id AND username = :u
+            )
+        """),
+        {"id": int(workout_id), "u": user}
+    )
+    deleted = conn.execute(
+        text("DELETE FROM workouts WHERE id = :id AND username = :u RETURNING exercise, date"),
+        {"id": int(workout_id), "u": user}
+    ).fetchall()
+    for exercise, day in deleted:
+        exercise_stats.rebuild(conn, user, exercise)
+        bodyweight.refresh_day(conn, user, day)
+    return len(deleted)
+
+
+def row_to_frame(workout_id, data):
+    # Turn an INSERT payload into a one-row frame shaped like load_workouts()
+    row = {
+        "id": workout_id, "Date": data["date"], "Exercise": data["exercise"],
+        "Weight_kg": data["weight"] or 0, "Sets": data["sets"] or 0,
+        "Reps": str(data["reps"] or ""), "RPE": data["rpe"] or 0,
+        "Notes": data["notes"] or "", "Bodyweight": data["bodyweight"] or 0,
+        "Arm": data.get("arm") or "", "Soreness": data.get("soreness") or 0,
+    }
+    df = reps.enrich(pd.DataFrame([row]))
+    df["Date"] = pd.to_datetime(df["Date"])
+    columns = [col for col in WORKOUT_COLUMNS if col in df.columns]
+    return df[columns].astype({col: WORKOUT_COLUMNS[col][1] for col in columns if WORKOUT_COLUMNS[col][1]})
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+
+# --- SHARED ENGINE LAYER ---
+# One engine (and one connection pool) per database URL for the whole process.
+# Streamlit re-runs app.py on every click, but imported modules stay loaded,
+# so everything that lives here survives reruns and is shared by all sessions.
+
+DEFAULT_POOL_SETTINGS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,  # seconds, Supabase drops idle connections
+    "pool_pre_ping": True,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+_app_url = None
+
+_stats = {
+    "engines_created": 0,
+    "connects": 0,      # brand new DBAPI connections (handshakes)
+    "checkouts": 0,     # connections handed out by the pool
+    "checkins": 0,
+    "acquires": 0,      # connections taken through connect()/begin()
+    "wait_total_s": 0.0,
+    "wait_max_s": 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def _bump(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def get_database_url():
+    # 1. Environment wins (scripts, CI, API server)
+    env_url = os.environ.get("DATABASE_URL")
+    if env_url:
+        return env_url
+    # 2. Fall back to the Streamlit secrets used by the app
+    import streamlit as st
+    return st.secrets["connections"]["supabase"]["url"]
+
+
+def get_replica_path():
+    # Offline-first mode (see replica.py): the app talks to a local SQLite file
+    env_path = os.environ.get("REPLICA_PATH")
+    if env_path:
+        return env_path
+    try:
+        import streamlit as st
+        settings = st.secrets.get("replica", {})
+    except Exception:
+        settings = {}
+    if settings.get("enabled"):
+        return settings.get("path", "replica.db")
+    return None
+
+
+def get_app_url():
+    # What the app reads and writes: the local replica if enabled, else the cloud
+    global _app_url
+    if _app_url is None:
+        replica_path = get_replica_path()
+        _app_url = f"sqlite:///{replica_path}" if replica_path else get_database_url()
+    return _app_url
+
+
+def get_pool_settings():
+    settings = dict(DEFAULT_POOL_SETTINGS)
+    try:
+        import streamlit as st
+        overrides = st.secrets.get("pool", {})
+    except Exception:
+        overrides = {}
+    for key in settings:
+        if key in overrides:
+            settings[key] = overrides[key]
+        env_key = f"DB_{key.upper()}"
+        if env_key in os.environ:
+            raw = os.environ[env_key]
+            if isinstance(settings[key], bool):
+                settings[key] = raw.lower() in ("1", "true", "yes")
+            else:
+                settings[key] = type(DEFAULT_POOL_SETTINGS[key])(raw)
+    return settings
+
+
+def _attach_pool_counters(engine):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, conn_record):
+        _bump("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        _bump("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, conn_record):
+        _bump("checkins")
+
+
+def _use_wal(engine):
+    # Readers don't block the writer (and vice versa) on file databases
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, conn_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+def _build_engine(db_url):
+    kwargs = {}
+    if db_url.startswith("sqlite"):
+        # SQLite picks its own pool class; only pre-ping makes sense there
+        kwargs["pool_pre_ping"] = True
+    else:
+        kwargs.update(get_pool_settings())
+    engine = create_engine(db_url, **kwargs)
+    if db_url.startswith("sqlite") and ":memory:" not in db_url:
+        _use_wal(engine)
+    _attach_pool_counters(engine)
+    _bump("engines_created")
+    return engine
+
+
+def get_engine(db_url=None):
+    if db_url is None:
+        db_url = get_app_url()
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+    with _engines_lock:
+        # Another thread may have built it while we waited for the lock
+        if db_url not in _engines:
+            _engines[db_url] = _build_engine(db_url)
+        return _engines[db_url]
+
+
+def _record_wait(started):
+    waited = time.perf_counter() - started
+    with _stats_lock:
+        _stats["acquires"] += 1
+        _stats["wait_total_s"] += waited
+        _stats["wait_max_s"] = max(_stats["wait_max_s"], waited)
+
+
+@contextmanager
+def connect(db_url=None):
+    # Read-only work: a pooled connection, timed while we wait for it
+    engine = get_engine(db_url)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        _record_wait(started)
+        yield conn
+
+
+@contextmanager
+def begin(db_url=None):
+    # Writes: a pooled connection inside a transaction (commit/rollback for you)
+    engine = get_engine(db_url)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        _record_wait(started)
+        yield conn
+
+
+def pool_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_wait_ms"] = (
+        stats["wait_total_s"] / stats["acquires"] * 1000 if stats["acquires"] else 0.0
+    )
+    stats["pools"] = {url.split("@")[-1]: engine.pool.status() for url, engine in _engines.items()}
+    return stats
+
+
+def dispose_all():
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+    global _app_url
+    _app_url = None
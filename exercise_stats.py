@@ -0,0 +1,168 @@
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+import db
+import reps
+
+# --- PER-EXERCISE SUMMARY TABLE ---
+# One row per (username, exercise) holding running sums for a least-squares
+# line of weight over time, plus e1RM and session counters.
+# Updated on every save/delete, so the Progress tab reads it in O(1)
+# instead of refitting np.polyfit / statsmodels on each render.
+
+EPOCH = date(2020, 1, 1)  # x = days since EPOCH keeps the running sums small
+
+
+def day_number(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d").date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    elif hasattr(value, "date") and not isinstance(value, date):
+        value = value.date()  # pandas Timestamp
+    return float((value - EPOCH).days)
+
+
+# --- READ ---
+def _from_sums(row):
+    n, sx, sy, sxx, sxy = row["n"], row["sum_x"], row["sum_y"], row["sum_xx"], row["sum_xy"]
+    denom = n * sxx - sx * sx
+    if n < 2 or denom == 0:
+        slope = 0.0
+        intercept = sy / n if n else 0.0
+    else:
+        slope = (n * sxy - sx * sy) / denom
+        intercept = (sy - slope * sx) / n
+    summary = dict(row)
+    summary["slope"] = slope          # kg per day
+    summary["intercept"] = intercept  # kg at EPOCH
+    return summary
+
+
+def get_summary(user, exercise, conn=None):
+    query = text("""
+        SELECT n, sum_x, sum_y, sum_xx, sum_xy, current_e1rm, best_e1rm, sessions, first_date, last_date
+        FROM exercise_stats WHERE username = :u AND exercise = :ex
+    """)
+    if conn is None:
+        with db.connect() as conn:
+            row = conn.execute(query, {"u": user, "ex": exercise}).mappings().fetchone()
+    else:
+        row = conn.execute(query, {"u": user, "ex": exercise}).mappings().fetchone()
+    if row is None or not row["n"]:
+        return None
+    return _from_sums(row)
+
+
+def predict(summary, when):
+    return summary["slope"] * day_number(when) + summary["intercept"]
+
+
+def monthly_gain(summary):
+    return summary["slope"] * 30
+
+
+def trend_line(summary):
+    # Two points are enough to draw the stored regression on a chart
+    start = pd.Timestamp(summary["first_date"])
+    end = pd.Timestamp(summary["last_date"])
+    return [start, end], [predict(summary, start), predict(summary, end)]
+
+
+def summarize_frame(ex_data):
+    # Same summary computed from an in-memory slice (fallback / benchmarks)
+    if ex_data.empty:
+        return None
+    ex_data = ex_data.sort_values("Date", kind="stable")
+    x = (ex_data["Date"] - pd.Timestamp(EPOCH)).dt.days.astype(float)
+    y = ex_data["Weight_kg"].astype(float)
+    if "e1RM" in ex_data.columns:
+        e1rm = ex_data["e1RM"].to_numpy(dtype=float)
+    else:
+        e1rm = reps.enrich(ex_data.copy())["e1RM"].to_numpy(dtype=float)
+    row = {
+        "n": len(ex_data), "sum_x": x.sum(), "sum_y": y.sum(),
+        "sum_xx": (x * x).sum(), "sum_xy": (x * y).sum(),
+        "current_e1rm": e1rm[-1], "best_e1rm": e1rm.max(),
+        "sessions": ex_data["Date"].dt.normalize().nunique(),
+        "first_date": ex_data["Date"].min(), "last_date": ex_data["Date"].max(),
+    }
+    return _from_sums(row)
+
+
+# --- WRITE HOOKS (called inside the caller's transaction) ---
+def apply_insert(conn, data, workout_id):
+    x = day_number(data["date"])
+    y = float(data["weight"] or 0)
+    e1rm = data["best_e1rm"]  # parsed from the reps text by data_access.with_set_metrics_many
+    params = {"u": data["username"], "ex": data["exercise"], "x": x, "y": y, "e": e1rm, "d": data["date"]}
+
+    # Is this the first set of that exercise on that day?
+    same_day = conn.execute(
+        text("SELECT COUNT(*) FROM workouts WHERE username = :u AND exercise = :ex AND date = :d AND id <> :id"),
+        {**params, "id": workout_id}
+    ).scalar_one()
+    params["new_session"] = 0 if same_day else 1
+
+    updated = conn.execute(text("""
+        UPDATE exercise_stats SET
+            n = n + 1,
+            sum_x = sum_x + :x, sum_y = sum_y + :y,
+            sum_xx = sum_xx + :x * :x, sum_xy = sum_xy + :x * :y,
+            best_e1rm = CASE WHEN best_e1rm < :e THEN :e ELSE best_e1rm END,
+            current_e1rm = CASE WHEN last_date <= :d THEN :e ELSE current_e1rm END,
+            first_date = CASE WHEN first_date > :d THEN :d ELSE first_date END,
+            last_date = CASE WHEN last_date < :d THEN :d ELSE last_date END,
+            sessions = sessions + :new_session
+        WHERE username = :u AND exercise = :ex
+    """), params)
+    if updated.rowcount == 0:
+        conn.execute(text("""
+            INSERT INTO exercise_stats
+                (username, exercise, n, sum_x, sum_y, sum_xx, sum_xy,
+                 current_e1rm, best_e1rm, sessions, first_date, last_date)
+            VALUES (:u, :ex, 1, :x, :y, :x * :x, :x * :y, :e, :e, 1, :d, :d)
+        """), params)
+
+
+def rebuild(conn, user, exercise):
+    # Deletes can't be "un-maxed" from running sums: recompute this one exercise
+    rows = conn.execute(
+        text("""
+            SELECT date, COALESCE(weight, 0) AS weight, sets, reps FROM workouts
+            WHERE username = :u AND exercise = :ex ORDER BY date, id
+        """),
+        {"u": user, "ex": exercise}
+    ).fetchall()
+    conn.execute(
+        text("DELETE FROM exercise_stats WHERE username = :u AND exercise = :ex"),
+        {"u": user, "ex": exercise}
+    )
+    if not rows:
+        return
+    ex_data = pd.DataFrame(rows, columns=["Date", "Weight_kg", "Sets", "Reps"])
+    ex_data["Date"] = pd.to_datetime(ex_data["Date"])
+    s = summarize_frame(ex_data)
+    conn.execute(text("""
+        INSERT INTO exercise_stats
+            (username, exercise, n, sum_x, sum_y, sum_xx, sum_xy,
+             current_e1rm, best_e1rm, sessions, first_date, last_date)
+        VALUES (:u, :ex, :n, :sum_x, :sum_y, :sum_xx, :sum_xy,
+                :current_e1rm, :best_e1rm, :sessions, :first_date, :last_date)
+    """), {
+        "u": user, "ex": exercise,
+        "n": int(s["n"]), "sum_x": float(s["sum_x"]), "sum_y": float(s["sum_y"]),
+        "sum_xx": float(s["sum_xx"]), "sum_xy": float(s["sum_xy"]),
+        "current_e1rm": float(s["current_e1rm"]), "best_e1rm": float(s["best_e1rm"]),
+        "sessions": int(s["sessions"]),
+        "first_date": s["first_date"].date(), "last_date": s["last_date"].date(),
+    })
+
+
+def rebuild_all(conn):
+    pairs = conn.execute(text("SELECT DISTINCT username, exercise FROM workouts")).fetchall()
+    for user, exercise in pairs:
+        rebuild(conn, user, exercise)
+    return len(pairs)
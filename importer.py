@@ -0,0 +1,197 @@
+import csv
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import bodyweight
+import data_access
+import db
+import exercise_stats
+import reps
+
+# --- BULK WORKOUT IMPORTER ---
+# Streams CSV exports (the notebook's training_log.csv format, or a dump of
+# the cloud workouts table) in chunks and upserts them into `workouts`.
+# Re-running an import is safe: every row gets a hash of its content and
+# (username, row_hash) is unique, so rows already there are skipped.
+# Postgres gets COPY into a staging table; everything else uses executemany.
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# CSV column -> workouts column (legacy notebook export + app/cloud exports)
+COLUMN_ALIASES = {
+    "Date": "date", "date": "date",
+    "Exercise": "exercise", "exercise": "exercise",
+    "Weight_kg": "weight", "weight": "weight",
+    "Sets": "sets", "sets": "sets",
+    "Reps": "reps", "reps": "reps",
+    "RPE": "rpe", "rpe": "rpe",
+    "User": "username", "username": "username",
+    "Notes": "notes", "notes": "notes",
+    "Bodyweight": "bodyweight", "bodyweight": "bodyweight",
+    "Arm": "arm", "arm": "arm",
+    "Soreness": "soreness", "soreness": "soreness",
+}
+
+IMPORT_COLUMNS = [
+    "date", "exercise", "weight", "sets", "reps", "rpe", "username", "notes", "bodyweight",
+    "arm", "soreness", "total_reps", "volume", "best_e1rm", "row_hash",
+]
+# Stamped at insert like app/API writes, so the replica's newer-wins reconcile sees them
+WRITE_COLUMNS = IMPORT_COLUMNS + ["updated_at"]
+
+# What makes two rows "the same set" for idempotent re-imports
+HASH_COLUMNS = ["username", "date", "exercise", "arm", "weight", "sets", "reps"]
+
+
+def prepare_chunk(chunk, default_user):
+    # 1. Rename to the cloud schema, drop anything we don't store
+    chunk = chunk.rename(columns=COLUMN_ALIASES)
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()]
+    frame = pd.DataFrame(index=chunk.index)
+    for column in IMPORT_COLUMNS:
+        frame[column] = chunk[column] if column in chunk.columns else None
+
+    # 2. Clean values in bulk (the legacy CSV has " Wrist Wrench" style padding)
+    frame["username"] = frame["username"].fillna(default_user).astype(str).str.strip()
+    frame["exercise"] = frame["exercise"].astype(str).str.strip()
+    frame["arm"] = frame["arm"].astype("string").str.strip().str.upper()
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce").dt.date
+    frame["reps"] = frame["reps"].astype("string").str.replace(" ", "", regex=False)
+    for column in ["weight", "bodyweight"]:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    for column in ["sets", "rpe", "soreness"]:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int64")
+    frame = frame.dropna(subset=["date", "exercise"])
+    if frame.empty:
+        return frame
+
+    # 3. Per-set metrics, parsed once for the whole chunk
+    matrix = reps.parse_reps(frame["reps"], frame["sets"])
+    metrics = reps.set_metrics(frame["weight"].fillna(0).to_numpy(), matrix)
+    frame["total_reps"] = metrics["total_reps"]
+    frame["volume"] = metrics["volume"]
+    frame["best_e1rm"] = metrics["best_e1rm"]
+
+    # 4. Content hash for the upsert
+    key = frame[HASH_COLUMNS].astype(str)
+    frame["row_hash"] = np.char.mod("%016x", pd.util.hash_pandas_object(key, index=False).to_numpy())
+    return frame.drop_duplicates(subset=["username", "row_hash"])
+
+
+def _placeholders(conn, count):
+    # Driver-level executemany skips SQLAlchemy's per-row parameter processing
+    marker = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    return ", ".join([marker] * count)
+
+
+def _tuples(frame, columns):
+    # NaN / pd.NA -> None so every driver binds NULL
+    values = frame[columns].astype(object)
+    return list(values.where(frame[columns].notna(), None).itertuples(index=False, name=None))
+
+
+def _insert_executemany(conn, frame):
+    # The stamp is bound as a plain datetime (a pandas column would hand over Timestamps)
+    stamp = (data_access.utc_now(),)
+    columns = ", ".join(WRITE_COLUMNS)
+    result = conn.exec_driver_sql(
+        f"INSERT INTO workouts ({columns}) VALUES ({_placeholders(conn, len(WRITE_COLUMNS))}) "
+        "ON CONFLICT (username, row_hash) DO NOTHING",
+        [row + stamp for row in _tuples(frame, IMPORT_COLUMNS)]
+    )
+    return result.rowcount
+
+
+def _insert_copy(conn, frame):
+    # Postgres: COPY the chunk into a temp table, then one set-based upsert
+    frame = frame.assign(updated_at=data_access.utc_now())
+    columns = ", ".join(WRITE_COLUMNS)
+    conn.execute(text(f"""
+        CREATE TEMP TABLE IF NOT EXISTS import_stage AS
+        SELECT {columns} FROM workouts WITH NO DATA
+    """))
+    conn.execute(text("TRUNCATE import_stage"))
+    buffer = io.StringIO()
+    frame[WRITE_COLUMNS].to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL, na_rep="\\N")
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY import_stage ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    finally:
+        cursor.close()
+    result = conn.execute(text(f"""
+        INSERT INTO workouts ({columns})
+        SELECT {columns} FROM import_stage
+        ON CONFLICT (username, row_hash) DO NOTHING
+    """))
+    return result.rowcount
+
+
+def _finish(conn, touched, after_id):
+    # Per-set rows for everything this run inserted (ids above the mark taken
+    # at the start), in one bulk pass: the cost follows the import, not the table
+    rows = conn.execute(text("""
+        SELECT w.id, w.sets, w.reps FROM workouts w
+        WHERE w.id > :after_id AND w.row_hash IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM workout_sets s WHERE s.workout_id = w.id)
+    """), {"after_id": after_id}).fetchall()
+    if rows:
+        matrix = reps.parse_reps([r[2] for r in rows], [r[1] for r in rows])
+        set_rows = reps.set_rows([r[0] for r in rows], matrix)
+        if set_rows:
+            conn.exec_driver_sql(
+                f"INSERT INTO workout_sets (workout_id, set_no, reps) VALUES ({_placeholders(conn, 3)})",
+                [(r["workout_id"], r["set_no"], r["reps"]) for r in set_rows]
+            )
+    # Summaries only for the exercises this import touched
+    for user, exercise in sorted(touched):
+        exercise_stats.rebuild(conn, user, exercise)
+    for user in sorted({user for user, _ in touched}):
+        bodyweight.rebuild(conn, user)
+
+
+def import_csv(path, db_url=None, default_user="Azaan", chunksize=DEFAULT_CHUNKSIZE, verbose=True):
+    started = time.perf_counter()
+    read_rows = 0
+    inserted = 0
+    touched = set()
+    with db.begin(db_url) as conn:
+        use_copy = conn.dialect.name == "postgresql"
+        after_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM workouts")).scalar_one()
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype={"Reps": str, "reps": str}, skipinitialspace=True):
+            frame = prepare_chunk(chunk, default_user)
+            read_rows += len(chunk)
+            if frame.empty:
+                continue
+            if use_copy:
+                chunk_inserted = _insert_copy(conn, frame)
+            else:
+                chunk_inserted = _insert_executemany(conn, frame)
+            inserted += chunk_inserted
+            if chunk_inserted:
+                touched.update(zip(frame["username"], frame["exercise"]))
+            if verbose:
+                rate = read_rows / (time.perf_counter() - started)
+                print(f"  ... {read_rows:,} rows read ({rate:,.0f} rows/s)")
+        if inserted:
+            _finish(conn, touched, after_id)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "rows_read": read_rows,
+        "rows_inserted": inserted,
+        "rows_skipped": read_rows - inserted,
+        "seconds": elapsed,
+        "rows_per_second": read_rows / elapsed if elapsed else 0.0,
+        "method": "copy" if use_copy else "executemany",
+    }
+    if verbose:
+        print(
+            f"✅ Imported {inserted:,} new rows ({report['rows_skipped']:,} already there) "
+            f"in {elapsed:.2f}s — {report['rows_per_second']:,.0f} rows/s via {report['method']}"
+        )
+    return report
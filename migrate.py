@@ -1,20 +1,27 @@
-import pandas as pd
-import sqlite3
+import argparse
 
-# 1. Load the CSV (The Source)
-df = pd.read_csv("training_log.csv")
+import importer
+import migrations
 
-# 2. Connect to the Database (The Destination)
-# This creates a NEW file called 'arm_wrestling.db'
-conn = sqlite3.connect("arm_wrestling.db")
+# Import a training log CSV into the `workouts` table.
+#
+#   python migrate.py                                   -> training_log.csv into local arm_wrestling.db
+#   python migrate.py history.csv --user Rahil --db postgresql://...
+#
+# Safe to run again: rows that are already there are skipped, nothing is replaced.
 
-# 3. The Magic Command
-# 'if_exists="replace"' -> This solves your duplicate problem! 
-# It deletes the old table and makes a fresh one every time you run this.
-df.to_sql("training_logs", conn, if_exists="replace", index=False)
+parser = argparse.ArgumentParser(description="Bulk-import workouts from a CSV export.")
+parser.add_argument("csv_path", nargs="?", default="training_log.csv")
+parser.add_argument("--db", default="sqlite:///arm_wrestling.db", help="SQLAlchemy URL of the target database")
+parser.add_argument("--user", default="Azaan", help="username for rows without a User column")
+parser.add_argument("--chunksize", type=int, default=importer.DEFAULT_CHUNKSIZE)
+args = parser.parse_args()
 
-# 4. Check if it worked
-print("Migration Complete! Here is the data inside SQL:")
-print(pd.read_sql("SELECT * FROM training_logs LIMIT 5", conn))
+# 1. Make sure the target has the current schema
+migrations.run_migrations(args.db, verbose=False)
 
-conn.close()
\ No newline at end of file
+# 2. Stream the CSV in
+try:
+    importer.import_csv(args.csv_path, db_url=args.db, default_user=args.user, chunksize=args.chunksize)
+except Exception as e:
+    print(f"❌ Import failed: {e}")
\ No newline at end of file
@@ -0,0 +1,330 @@
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+import bodyweight
+import catalog
+import db
+import exercise_stats
+import reps
+
+# --- VERSIONED SCHEMA MIGRATIONS ---
+# Replaces the one-off init_cloud_db.py / upgrade_db.py scripts.
+# Every step runs once, inside its own transaction, and is recorded in
+# schema_migrations. Works on Supabase (Postgres) and local SQLite files.
+#
+#   python migrations.py                      -> database from secrets / DATABASE_URL
+#   python migrations.py sqlite:///local.db   -> any SQLAlchemy URL
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        return func
+    return register
+
+
+def _id_column(dialect):
+    return "id SERIAL PRIMARY KEY" if dialect == "postgresql" else "id INTEGER PRIMARY KEY AUTOINCREMENT"
+
+
+def _column_types(conn, table):
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(
+            text("SELECT column_name, data_type FROM information_schema.columns WHERE table_name = :t"),
+            {"t": table}
+        )
+    else:
+        rows = [(row[1], row[2]) for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+    return {name: (col_type or "").upper() for name, col_type in rows}
+
+
+# --- 1. BASE TABLES ---
+@migration(1, "create workouts and exercise_library")
+def _create_base_tables(conn, dialect):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS workouts (
+            {_id_column(dialect)},
+            date DATE NOT NULL,
+            exercise TEXT NOT NULL,
+            weight FLOAT,
+            sets INTEGER,
+            reps TEXT,
+            rpe INTEGER,
+            username TEXT,
+            notes TEXT,
+            bodyweight FLOAT
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS exercise_library (
+            {_id_column(dialect)},
+            name TEXT NOT NULL,
+            category TEXT,
+            username TEXT NOT NULL
+        )
+    """))
+
+
+# --- 2. REPS AS TEXT ("5,4,3" is a valid entry) ---
+@migration(2, "store workouts.reps as text")
+def _reps_as_text(conn, dialect):
+    if "INT" not in _column_types(conn, "workouts").get("reps", ""):
+        return
+    if dialect == "postgresql":
+        conn.execute(text("ALTER TABLE workouts ALTER COLUMN reps TYPE TEXT USING reps::text"))
+        return
+    # SQLite can't change a column type in place: rebuild the table
+    conn.execute(text(f"""
+        CREATE TABLE workouts_new (
+            {_id_column(dialect)},
+            date DATE NOT NULL,
+            exercise TEXT NOT NULL,
+            weight FLOAT,
+            sets INTEGER,
+            reps TEXT,
+            rpe INTEGER,
+            username TEXT,
+            notes TEXT,
+            bodyweight FLOAT
+        )
+    """))
+    conn.execute(text("""
+        INSERT INTO workouts_new (id, date, exercise, weight, sets, reps, rpe, username, notes, bodyweight)
+        SELECT id, date, exercise, weight, sets, CAST(reps AS TEXT), rpe, username, notes, bodyweight
+        FROM workouts
+    """))
+    conn.execute(text("DROP TABLE workouts"))
+    conn.execute(text("ALTER TABLE workouts_new RENAME TO workouts"))
+
+
+# --- 3. INDEXES FOR THE HOT QUERIES ---
+@migration(3, "indexes on workouts/exercise_library, unique library names")
+def _hot_query_indexes(conn, dialect):
+    # get_last_log: WHERE username AND exercise ORDER BY date DESC LIMIT 1
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_workouts_user_exercise_date ON workouts (username, exercise, date DESC)"
+    ))
+    # get_exercises_from_db: WHERE username AND category
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_exercise_library_user_category ON exercise_library (username, category)"
+    ))
+    # Drop duplicate library entries (keep the oldest) before enforcing uniqueness
+    conn.execute(text("""
+        DELETE FROM exercise_library
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM exercise_library GROUP BY username, name
+        )
+    """))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_exercise_library_user_name ON exercise_library (username, name)"
+    ))
+
+
+# --- 4. PER-EXERCISE SUMMARY (regression sums, e1RM) ---
+@migration(4, "exercise_stats summary table")
+def _exercise_stats(conn, dialect):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS exercise_stats (
+            username TEXT NOT NULL,
+            exercise TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            sum_x FLOAT NOT NULL,
+            sum_y FLOAT NOT NULL,
+            sum_xx FLOAT NOT NULL,
+            sum_xy FLOAT NOT NULL,
+            current_e1rm FLOAT,
+            best_e1rm FLOAT,
+            sessions INTEGER NOT NULL,
+            first_date DATE,
+            last_date DATE,
+            PRIMARY KEY (username, exercise)
+        )
+    """))
+    # Backfill from the history that's already there
+    exercise_stats.rebuild_all(conn)
+
+
+# --- 5. STRUCTURED SETS (per-set reps + per-row totals) ---
+@migration(5, "workout_sets table and per-row volume / e1RM")
+def _workout_sets(conn, dialect):
+    existing = _column_types(conn, "workouts")
+    for column, col_type in [("total_reps", "INTEGER"), ("volume", "FLOAT"), ("best_e1rm", "FLOAT")]:
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE workouts ADD COLUMN {column} {col_type}"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS workout_sets (
+            workout_id INTEGER NOT NULL REFERENCES workouts(id) ON DELETE CASCADE,
+            set_no INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            PRIMARY KEY (workout_id, set_no)
+        )
+    """))
+
+    # Backfill: parse every reps string once, in bulk
+    rows = conn.execute(text("SELECT id, COALESCE(weight, 0), sets, reps FROM workouts")).fetchall()
+    if not rows:
+        return
+    ids = [row[0] for row in rows]
+    matrix = reps.parse_reps([row[3] for row in rows], [row[2] for row in rows])
+    metrics = reps.set_metrics([row[1] for row in rows], matrix)
+    conn.execute(
+        text("UPDATE workouts SET total_reps = :t, volume = :v, best_e1rm = :e WHERE id = :id"),
+        [
+            {"id": i, "t": int(t), "v": float(v), "e": float(e)}
+            for i, t, v, e in zip(ids, metrics["total_reps"], metrics["volume"], metrics["best_e1rm"])
+        ]
+    )
+    conn.execute(text("DELETE FROM workout_sets"))
+    set_rows = reps.set_rows(ids, matrix)
+    if set_rows:
+        conn.execute(
+            text("INSERT INTO workout_sets (workout_id, set_no, reps) VALUES (:workout_id, :set_no, :reps)"),
+            set_rows
+        )
+    # e1RM now comes from the best set: refresh the summaries too
+    exercise_stats.rebuild_all(conn)
+
+
+# --- 6. BULK IMPORT SUPPORT (legacy CSV columns + idempotency key) ---
+@migration(6, "arm/soreness columns and import dedupe key")
+def _import_columns(conn, dialect):
+    existing = _column_types(conn, "workouts")
+    for column, col_type in [("arm", "TEXT"), ("soreness", "INTEGER"), ("row_hash", "TEXT")]:
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE workouts ADD COLUMN {column} {col_type}"))
+    # Rows typed in the app keep row_hash NULL, which never conflicts
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_workouts_user_row_hash ON workouts (username, row_hash)"
+    ))
+
+
+# --- 7. KEYSET PAGING FOR HISTORY / DELETE PICKERS ---
+@migration(7, "index for newest-first history pages")
+def _history_index(conn, dialect):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_workouts_user_date_id ON workouts (username, date DESC, id DESC)"
+    ))
+
+
+# --- 8. OFFLINE REPLICA SYNC (see replica.py) ---
+@migration(8, "workouts.updated_at for replica sync")
+def _updated_at(conn, dialect):
+    if "updated_at" not in _column_types(conn, "workouts"):
+        conn.execute(text("ALTER TABLE workouts ADD COLUMN updated_at TIMESTAMP"))
+    # The syncer pulls "rows changed since the last pull"
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_workouts_updated_at ON workouts (updated_at)"))
+
+
+# --- 9. ONE BODYWEIGHT PER DAY ---
+@migration(9, "bodyweight_daily series")
+def _bodyweight_daily(conn, dialect):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS bodyweight_daily (
+            username TEXT NOT NULL,
+            date DATE NOT NULL,
+            bodyweight FLOAT NOT NULL,
+            PRIMARY KEY (username, date)
+        )
+    """))
+    bodyweight.rebuild(conn)
+
+
+# --- 10. MUSCLE GROUP PER LIBRARY EXERCISE ---
+@migration(10, "exercise_library.muscle_group")
+def _muscle_group(conn, dialect):
+    if "muscle_group" not in _column_types(conn, "exercise_library"):
+        conn.execute(text("ALTER TABLE exercise_library ADD COLUMN muscle_group TEXT"))
+    # Replaces the CATEGORY_MAP dict app.py used to apply on every render
+    conn.execute(
+        text("UPDATE exercise_library SET muscle_group = :g WHERE name = :n AND muscle_group IS NULL"),
+        [{"n": name, "g": group} for name, group in catalog.DEFAULT_MUSCLE_GROUPS.items()]
+    )
+
+
+# --- 11. TEAM ROLLUP TABLES ---
+@migration(11, "team rollup summary tables")
+def _team_rollup(conn, dialect):
+    # Filled by team_rollup.refresh(); the coach tab reads nothing else
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS team_weekly (
+            username TEXT NOT NULL,
+            week DATE NOT NULL,
+            sessions INTEGER NOT NULL,
+            sets INTEGER NOT NULL,
+            volume FLOAT NOT NULL,
+            avg_rpe FLOAT,
+            best_e1rm FLOAT,
+            prs INTEGER NOT NULL,
+            left_volume FLOAT NOT NULL,
+            right_volume FLOAT NOT NULL,
+            PRIMARY KEY (username, week)
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS team_prs (
+            username TEXT NOT NULL,
+            exercise TEXT NOT NULL,
+            best_e1rm FLOAT NOT NULL,
+            date DATE NOT NULL,
+            PRIMARY KEY (username, exercise)
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS team_rollup_state (
+            username TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL,
+            id_sum BIGINT NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL
+        )
+    """))
+
+
+# --- RUNNER ---
+def _ensure_version_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """))
+
+
+def applied_versions(db_url=None):
+    with db.begin(db_url) as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(db_url=None, verbose=True):
+    done = applied_versions(db_url)
+    applied = []
+    for version, name, func in sorted(MIGRATIONS):
+        if version in done:
+            continue
+        # One transaction per step: a failure leaves earlier steps applied
+        with db.begin(db_url) as conn:
+            func(conn, conn.dialect.name)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.now()}
+            )
+        applied.append(version)
+        if verbose:
+            print(f"✅ Applied migration {version}: {name}")
+    if verbose and not applied:
+        print("ℹ️ Database already up to date.")
+    return applied
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else db.get_database_url()
+    try:
+        run_migrations(url)
+    except Exception as e:
+        print(f"❌ FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+# --- OPT-IN PROFILING ---
+# (stdlib only at import time: app.py loads this before the login screen)
+# Off unless PROFILE=1 (or [profiling] enabled = true in secrets). Per rerun
+# it records wall time per app section, every SQL statement (count + time,
+# through engine events) and the size of the DataFrames the views load.
+# Finished reruns are appended to a JSON-lines file and the last few are kept
+# in memory for the debug panel in the sidebar. Statements slower than
+# slow_query_ms are logged on their own as well.
+#
+#   [profiling]
+#   enabled = true
+#   slow_query_ms = 100
+#   log_path = "metrics.jsonl"
+#
+# app.py is a script, so sections are checkpoints rather than with-blocks:
+# section("form") closes whatever section was open and starts the next one.
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "slow_query_ms": 100.0,
+    "log_path": "metrics.jsonl",
+    "keep_runs": 50,  # per session, for the debug panel
+}
+
+logger = logging.getLogger("workout_buddy.profiling")
+
+_settings = None
+_local = threading.local()               # the rerun this thread is working on
+_open_runs = {}                          # session -> run not finished yet (st.stop / st.rerun)
+_history = defaultdict(lambda: deque(maxlen=DEFAULT_SETTINGS["keep_runs"]))
+_lock = threading.Lock()
+_sql_totals = {"count": 0, "ms": 0.0, "slow": 0}  # all threads, incl. background writers
+
+
+def get_settings():
+    global _settings
+    if _settings is None:
+        settings = dict(DEFAULT_SETTINGS)
+        try:
+            import streamlit as st
+            overrides = st.secrets.get("profiling", {})
+        except Exception:
+            overrides = {}
+        for key in settings:
+            if key in overrides:
+                settings[key] = type(DEFAULT_SETTINGS[key])(overrides[key])
+        if "PROFILE" in os.environ:
+            settings["enabled"] = os.environ["PROFILE"].lower() in ("1", "true", "yes")
+        if "PROFILE_LOG" in os.environ:
+            settings["log_path"] = os.environ["PROFILE_LOG"]
+        if "PROFILE_SLOW_MS" in os.environ:
+            settings["slow_query_ms"] = float(os.environ["PROFILE_SLOW_MS"])
+        _settings = settings
+        if settings["enabled"]:
+            _install_sql_hooks()
+    return _settings
+
+
+def enabled():
+    return get_settings()["enabled"]
+
+
+# --- SQL HOOKS (every engine, including the ones built later) ---
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("profiling_started")
+    if not stack:
+        return  # hooks were installed mid-statement
+    started = stack.pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run["sql"]["count"] += 1
+        run["sql"]["ms"] += elapsed_ms
+    slow = elapsed_ms >= _settings["slow_query_ms"]
+    with _lock:
+        _sql_totals["count"] += 1
+        _sql_totals["ms"] += elapsed_ms
+        _sql_totals["slow"] += slow
+    if slow:
+        entry = {
+            "type": "slow_query",
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "ms": round(elapsed_ms, 2),
+            "rows": cursor.rowcount,
+            "executemany": executemany,
+            "statement": " ".join(statement.split())[:500],
+            "thread": threading.current_thread().name,
+        }
+        logger.warning("Slow query (%.0f ms): %s", elapsed_ms, entry["statement"])
+        if run is not None:
+            run["slow"].append(entry)
+        _write(entry)
+
+
+def _install_sql_hooks():
+    # Imported here so the login screen doesn't load SQLAlchemy just to profile
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    if not event.contains(Engine, "before_cursor_execute", _before_execute):
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+
+
+# --- PER-RERUN RECORDING ---
+def start_run(session, user=None):
+    if not enabled():
+        return
+    with _lock:
+        previous = _open_runs.pop(session, None)
+    if previous is not None:
+        # The last rerun ended in st.stop() / st.rerun(): close it as it stood
+        _close(previous, "interrupted")
+    run = {
+        "type": "rerun",
+        "session": session,
+        "user": user,
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "started": time.perf_counter(),
+        "sections": {},
+        "open_section": None,
+        "sql": {"count": 0, "ms": 0.0},
+        "frames": {},
+        "slow": [],
+    }
+    _local.run = run
+    with _lock:
+        _open_runs[session] = run
+
+
+def section(name):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    now = time.perf_counter()
+    _end_section(run, now)
+    run["open_section"] = (name, now)
+
+
+def frame(name, df):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    run["frames"][name] = {
+        "rows": int(df.shape[0]),
+        "cols": int(df.shape[1]),
+        "bytes": int(df.memory_usage(index=True, deep=False).sum()),
+    }
+
+
+def finish_run():
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    with _lock:
+        _open_runs.pop(run["session"], None)
+    return _close(run, "complete")
+
+
+def _end_section(run, now):
+    if run["open_section"] is not None:
+        name, started = run["open_section"]
+        run["sections"][name] = run["sections"].get(name, 0.0) + (now - started) * 1000
+        run["open_section"] = None
+
+
+def _close(run, status):
+    now = time.perf_counter()
+    _end_section(run, now)
+    if getattr(_local, "run", None) is run:
+        _local.run = None
+    record = {
+        "type": run["type"],
+        "ts": run["ts"],
+        "session": run["session"],
+        "user": run["user"],
+        "status": status,
+        "total_ms": round((now - run["started"]) * 1000, 2),
+        "sections": {name: round(ms, 2) for name, ms in run["sections"].items()},
+        "sql": {"count": run["sql"]["count"], "ms": round(run["sql"]["ms"], 2)},
+        "frames": run["frames"],
+        "slow_queries": len(run["slow"]),
+    }
+    with _lock:
+        _history[run["session"]].append(record)
+    _write(record)
+    return record
+
+
+def _write(record):
+    path = _settings["log_path"] if _settings else None
+    if not path:
+        return
+    line = json.dumps(record, default=str)
+    with _lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+# --- READ SIDE (debug panel, scripts) ---
+def recent_runs(session):
+    with _lock:
+        return list(_history.get(session, ()))
+
+
+def sql_totals():
+    with _lock:
+        return dict(_sql_totals)
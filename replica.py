@@ -0,0 +1,476 @@
+import json
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+import bodyweight
+import catalog
+import data_access
+import db
+import exercise_stats
+import migrations
+import reps
+import shared_cache
+import workout_cache
+
+# --- OFFLINE-FIRST LOCAL REPLICA ---
+# With [replica] enabled in secrets (or REPLICA_PATH set), db.get_engine()
+# hands the app a local SQLite file in WAL mode instead of Supabase, so every
+# read and write stays on the device. Triggers journal each local insert /
+# delete into sync_journal, and one background syncer pushes the journal to
+# the remote database in batches and pulls other devices' rows back. When the
+# connection drops the journal simply grows until it comes back.
+#
+#   [replica]
+#   enabled = true
+#   path = "replica.db"
+#   sync_interval = 5
+#
+# Ids: rows written locally are numbered from LOCAL_ID_BASE up and remote rows
+# keep their own ids, so the two never collide. sync_ids maps a pushed local
+# row to the id the remote gave it.
+# Conflicts: a local delete that hasn't been pushed beats the remote row;
+# otherwise the copy with the newer updated_at wins (remote on a tie).
+
+LOCAL_ID_BASE = 10 ** 12
+DEFAULT_SETTINGS = {
+    "sync_interval": 5.0,   # seconds between sync rounds
+    "batch_size": 200,      # journal entries pushed per remote transaction
+    "reconcile_every": 12,  # rounds between full id / library comparisons
+}
+
+SYNC_COLUMNS = [
+    "id", "date", "exercise", "weight", "sets", "reps", "rpe", "username", "notes", "bodyweight",
+    "total_reps", "volume", "best_e1rm", "arm", "soreness", "row_hash", "updated_at",
+]
+PUSH_COLUMNS = ["date", "exercise", "weight", "sets", "reps", "rpe", "username", "notes", "bodyweight", "updated_at"]
+
+_syncer = None
+_start_lock = threading.Lock()
+_wake = threading.Event()
+_status = {
+    "enabled": False, "online": None, "pending": 0, "pushed": 0, "pulled": 0,
+    "rounds": 0, "last_sync": None, "last_error": None,
+}
+_status_lock = threading.Lock()
+
+
+def get_settings():
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        import streamlit as st
+        overrides = st.secrets.get("replica", {})
+    except Exception:
+        overrides = {}
+    for key in settings:
+        if key in overrides:
+            settings[key] = type(DEFAULT_SETTINGS[key])(overrides[key])
+    return settings
+
+
+def _set_status(**values):
+    with _status_lock:
+        _status.update(values)
+
+
+def sync_status():
+    with _status_lock:
+        return dict(_status)
+
+
+def _plain(value):
+    # pysqlite's implicit date adapters are deprecated; bind ISO text instead
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _stamp(value):
+    if value is None:
+        return None
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+# --- LOCAL SCHEMA (journal, id map, triggers) ---
+def _prepare_local(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS sync_journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER,
+            payload TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS sync_ids (
+            local_id INTEGER PRIMARY KEY,
+            remote_id INTEGER NOT NULL UNIQUE
+        )
+    """))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)"))
+    conn.execute(text("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('applying_remote', '0')"))
+
+    # Journal app writes only; the syncer flips applying_remote while it applies pulled rows
+    when = "WHEN (SELECT value FROM sync_state WHERE key = 'applying_remote') = '0'"
+    triggers = {
+        "journal_workouts_insert": (
+            "AFTER INSERT ON workouts",
+            "INSERT INTO sync_journal (table_name, op, row_id) VALUES ('workouts', 'insert', NEW.id)",
+        ),
+        "journal_workouts_delete": (
+            "AFTER DELETE ON workouts",
+            "INSERT INTO sync_journal (table_name, op, row_id, payload) "
+            "VALUES ('workouts', 'delete', OLD.id, json_object('username', OLD.username))",
+        ),
+        "journal_library_insert": (
+            "AFTER INSERT ON exercise_library",
+            "INSERT INTO sync_journal (table_name, op, payload) VALUES ('exercise_library', 'insert', "
+            "json_object('name', NEW.name, 'category', NEW.category, 'muscle_group', NEW.muscle_group, "
+            "'username', NEW.username))",
+        ),
+        "journal_library_delete": (
+            "AFTER DELETE ON exercise_library",
+            "INSERT INTO sync_journal (table_name, op, payload) VALUES ('exercise_library', 'delete', "
+            "json_object('name', OLD.name, 'username', OLD.username))",
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        # Recreated every start so devices pick up changed trigger bodies
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} {event} {when} BEGIN {body}; END"))
+
+    # Local ids start far above anything the remote hands out
+    conn.execute(text("""
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'workouts', 0 WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'workouts')
+    """))
+    conn.execute(
+        text("UPDATE sqlite_sequence SET seq = MAX(seq, :base) WHERE name = 'workouts'"),
+        {"base": LOCAL_ID_BASE}
+    )
+
+
+def _get_state(conn, key, default=None):
+    value = conn.execute(text("SELECT value FROM sync_state WHERE key = :k"), {"k": key}).scalar()
+    return default if value is None else value
+
+
+def _set_state(conn, key, value):
+    conn.execute(
+        text("INSERT OR REPLACE INTO sync_state (key, value) VALUES (:k, :v)"),
+        {"k": key, "v": None if value is None else str(value)}
+    )
+
+
+def _applying_remote(conn, flag):
+    _set_state(conn, "applying_remote", "1" if flag else "0")
+
+
+def pending_count(local_url=None):
+    with db.connect(local_url or db.get_app_url()) as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM sync_journal")).scalar_one()
+
+
+# --- PUSH (local journal -> remote) ---
+def push(local_url, remote_url, batch_size=DEFAULT_SETTINGS["batch_size"]):
+    with db.connect(local_url) as local:
+        entries = local.execute(
+            text("SELECT seq, table_name, op, row_id, payload FROM sync_journal ORDER BY seq LIMIT :n"),
+            {"n": batch_size}
+        ).fetchall()
+        if not entries:
+            return 0
+        remote_ids = dict(local.execute(text("SELECT local_id, remote_id FROM sync_ids")).fetchall())
+        insert_ids = [e.row_id for e in entries if e.table_name == "workouts" and e.op == "insert"]
+        rows = {}
+        if insert_ids:
+            columns = ", ".join(["id"] + PUSH_COLUMNS)
+            placeholders = ", ".join(f":id{i}" for i in range(len(insert_ids)))
+            result = local.execute(
+                text(f"SELECT {columns} FROM workouts WHERE id IN ({placeholders})"),
+                {f"id{i}": row_id for i, row_id in enumerate(insert_ids)}
+            )
+            rows = {row.id: dict(row._mapping) for row in result}
+
+    # 1. Replay the batch on the remote in one transaction
+    new_ids = {}
+    dropped_ids = []
+    with db.begin(remote_url) as remote:
+        for entry in entries:
+            payload = json.loads(entry.payload) if entry.payload else {}
+            if entry.table_name == "workouts" and entry.op == "insert":
+                row = rows.get(entry.row_id)
+                if row is None or entry.row_id in remote_ids:
+                    continue  # deleted before it was pushed, or already pushed
+                data = {col: row[col] for col in PUSH_COLUMNS}
+                new_ids[entry.row_id] = data_access.insert_workout(remote, data)
+                remote_ids[entry.row_id] = new_ids[entry.row_id]
+            elif entry.table_name == "workouts" and entry.op == "delete":
+                target = entry.row_id
+                if target >= LOCAL_ID_BASE:
+                    target = remote_ids.get(target)
+                    dropped_ids.append(entry.row_id)
+                    if target is None:
+                        continue  # never reached the remote
+                data_access.delete_workout(remote, payload["username"], target)
+            elif entry.table_name == "exercise_library" and entry.op == "insert":
+                remote.execute(
+                    text("""
+                        INSERT INTO exercise_library (name, category, muscle_group, username)
+                        VALUES (:name, :category, :muscle_group, :username)
+                        ON CONFLICT (username, name) DO NOTHING
+                    """),
+                    {"muscle_group": None, **payload}  # journalled before muscle groups existed
+                )
+            elif entry.table_name == "exercise_library" and entry.op == "delete":
+                remote.execute(
+                    text("DELETE FROM exercise_library WHERE name = :name AND username = :username"),
+                    payload
+                )
+
+    # 2. Remember the remote ids and trim the journal
+    with db.begin(local_url) as local:
+        if new_ids:
+            local.execute(
+                text("INSERT OR REPLACE INTO sync_ids (local_id, remote_id) VALUES (:l, :r)"),
+                [{"l": l, "r": r} for l, r in new_ids.items()]
+            )
+        for local_id in dropped_ids:
+            local.execute(text("DELETE FROM sync_ids WHERE local_id = :l"), {"l": local_id})
+        local.execute(text("DELETE FROM sync_journal WHERE seq <= :s"), {"s": entries[-1].seq})
+    return len(entries)
+
+
+# --- PULL (remote -> local) ---
+def _write_sets(local, workout_ids, rows):
+    if not workout_ids:
+        return
+    for workout_id in workout_ids:
+        local.execute(text("DELETE FROM workout_sets WHERE workout_id = :id"), {"id": workout_id})
+    matrix = reps.parse_reps([row["reps"] for row in rows], [row["sets"] for row in rows])
+    set_rows = reps.set_rows(workout_ids, matrix)
+    if set_rows:
+        local.execute(data_access.INSERT_SETS_SQL, set_rows)
+
+
+def pull(local_url, remote_url):
+    with db.connect(local_url) as local:
+        high_water = int(_get_state(local, "remote_max_id", 0))
+        since = _get_state(local, "remote_since", "1970-01-01 00:00:00")
+    with db.connect(remote_url) as remote:
+        result = remote.execute(
+            text(f"""
+                SELECT {", ".join(SYNC_COLUMNS)} FROM workouts
+                WHERE id > :hw OR updated_at > :since
+                ORDER BY id
+            """),
+            {"hw": high_water, "since": since}
+        )
+        pulled = [{col: _plain(value) for col, value in row._mapping.items()} for row in result]
+    if not pulled:
+        return 0
+
+    applied = []
+    touched = set()
+    with db.begin(local_url) as local:
+        _applying_remote(local, True)
+        ours = {r for (r,) in local.execute(text("SELECT remote_id FROM sync_ids"))}
+        deleted_here = {
+            r for (r,) in local.execute(
+                text("SELECT row_id FROM sync_journal WHERE table_name = 'workouts' AND op = 'delete'")
+            )
+        }
+        ids = [row["id"] for row in pulled]
+        placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
+        local_stamps = dict(local.execute(
+            text(f"SELECT id, updated_at FROM workouts WHERE id IN ({placeholders})"),
+            {f"id{i}": row_id for i, row_id in enumerate(ids)}
+        ).fetchall())
+        for row in pulled:
+            if row["id"] in ours or row["id"] in deleted_here:
+                continue  # our own pushed row, or one we deleted and haven't pushed yet
+            if row["id"] in local_stamps:
+                mine, theirs = _stamp(local_stamps[row["id"]]), _stamp(row["updated_at"])
+                if mine is not None and (theirs is None or mine > theirs):
+                    continue
+            applied.append(row)
+        if applied:
+            columns = ", ".join(SYNC_COLUMNS)
+            local.execute(
+                text(f"INSERT OR REPLACE INTO workouts ({columns}) VALUES ({', '.join(':' + c for c in SYNC_COLUMNS)})"),
+                applied
+            )
+            _write_sets(local, [row["id"] for row in applied], applied)
+            touched = {(row["username"], row["exercise"]) for row in applied}
+            for user, exercise in sorted(touched):
+                exercise_stats.rebuild(local, user, exercise)
+            for user, day in sorted({(row["username"], row["date"]) for row in applied}):
+                bodyweight.refresh_day(local, user, day)
+        _set_state(local, "remote_max_id", max(high_water, max(ids)))
+        stamps = [row["updated_at"] for row in pulled if row["updated_at"]]
+        if stamps:
+            _set_state(local, "remote_since", max(max(stamps), since))
+        _applying_remote(local, False)
+
+    # Pulled ids sit below the cached high-water mark: reload those users
+    for user in {user for user, _ in touched}:
+        workout_cache.invalidate(user)
+    return len(applied)
+
+
+def reconcile(local_url, remote_url):
+    # Full comparison for what pull() can't see: remote deletes and library edits
+    with db.connect(remote_url) as remote:
+        remote_ids = {r for (r,) in remote.execute(text("SELECT id FROM workouts"))}
+        remote_library = {
+            (row.username, row.name): (row.category, row.muscle_group)
+            for row in remote.execute(text("SELECT name, category, muscle_group, username FROM exercise_library"))
+        }
+
+    touched = set()
+    with db.begin(local_url) as local:
+        # A pending journal entry means the remote hasn't caught up yet: leave it alone
+        pending = local.execute(text("SELECT table_name, row_id, payload FROM sync_journal")).fetchall()
+        pending_rows = {row_id for table, row_id, _ in pending if table == "workouts"}
+        pending_names = {
+            (p["username"], p["name"])
+            for table, _, payload in pending if table == "exercise_library"
+            for p in [json.loads(payload)]
+        }
+        _applying_remote(local, True)
+
+        gone = local.execute(text("""
+            SELECT w.id, w.username, w.exercise, w.date, s.remote_id FROM workouts w
+            LEFT JOIN sync_ids s ON s.local_id = w.id
+        """)).fetchall()
+        days = set()
+        for row_id, user, exercise, day, remote_id in gone:
+            identity = remote_id if row_id >= LOCAL_ID_BASE else row_id
+            if identity is None or identity in remote_ids or row_id in pending_rows:
+                continue
+            local.execute(text("DELETE FROM workout_sets WHERE workout_id = :id"), {"id": row_id})
+            local.execute(text("DELETE FROM workouts WHERE id = :id"), {"id": row_id})
+            local.execute(text("DELETE FROM sync_ids WHERE local_id = :id"), {"id": row_id})
+            touched.add((user, exercise))
+            days.add((user, day))
+        for user, exercise in sorted(touched):
+            exercise_stats.rebuild(local, user, exercise)
+        for user, day in sorted(days):
+            bodyweight.refresh_day(local, user, day)
+
+        local_library = {
+            (row.username, row.name): (row.category, row.muscle_group)
+            for row in local.execute(text("SELECT name, category, muscle_group, username FROM exercise_library"))
+        }
+        library_users = set()
+        for key, (category, muscle_group) in remote_library.items():
+            if key in pending_names or local_library.get(key) == (category, muscle_group):
+                continue
+            local.execute(
+                text("DELETE FROM exercise_library WHERE username = :u AND name = :n"),
+                {"u": key[0], "n": key[1]}
+            )
+            local.execute(
+                text("INSERT INTO exercise_library (name, category, muscle_group, username) VALUES (:n, :c, :g, :u)"),
+                {"n": key[1], "c": category, "g": muscle_group, "u": key[0]}
+            )
+            library_users.add(key[0])
+        for key in local_library:
+            if key not in remote_library and key not in pending_names:
+                local.execute(
+                    text("DELETE FROM exercise_library WHERE username = :u AND name = :n"),
+                    {"u": key[0], "n": key[1]}
+                )
+                library_users.add(key[0])
+        _applying_remote(local, False)
+
+    for user in {user for user, _ in touched}:
+        workout_cache.invalidate(user)
+    for user in library_users:
+        catalog.invalidate(user)
+    return len(touched)
+
+
+# --- SYNCER ---
+def sync_once(local_url=None, remote_url=None, full=False, settings=None):
+    local_url = local_url or db.get_app_url()
+    remote_url = remote_url or db.get_database_url()
+    settings = settings or get_settings()
+    pushed = 0
+    try:
+        # Push first so the pull recognises our own rows by their remote ids
+        while True:
+            count = push(local_url, remote_url, settings["batch_size"])
+            pushed += count
+            if count < settings["batch_size"]:
+                break
+        pulled = pull(local_url, remote_url)
+        if full:
+            reconcile(local_url, remote_url)
+    except Exception as e:
+        _set_status(online=False, last_error=str(e), pending=pending_count(local_url))
+        return False
+    with _status_lock:
+        _status["online"] = True
+        _status["last_error"] = None
+        _status["pushed"] += pushed
+        _status["pulled"] += pulled
+        _status["rounds"] += 1
+        _status["last_sync"] = datetime.now()
+        _status["pending"] = pending_count(local_url)
+    return True
+
+
+def _run(local_url, remote_url, settings):
+    rounds = 0
+    while True:
+        _wake.wait(settings["sync_interval"])
+        _wake.clear()
+        rounds += 1
+        sync_once(local_url, remote_url, full=rounds % settings["reconcile_every"] == 0, settings=settings)
+
+
+def request_sync():
+    # Don't wait for the next tick (e.g. right after a save)
+    _wake.set()
+
+
+def start():
+    # Idempotent; a no-op unless the replica is enabled
+    global _syncer
+    if db.get_replica_path() is None:
+        return False
+    if _syncer is not None and _syncer.is_alive():
+        return True
+    with _start_lock:
+        if _syncer is not None and _syncer.is_alive():
+            return True
+        local_url = db.get_app_url()
+        remote_url = db.get_database_url()
+        settings = get_settings()
+        migrations.run_migrations(local_url, verbose=False)
+        with db.begin(local_url) as conn:
+            _prepare_local(conn)
+            first_run = _get_state(conn, "remote_max_id") is None
+        _set_status(enabled=True, pending=pending_count(local_url))
+        if first_run:
+            # Seed the replica before the first page renders (stays empty if offline)
+            sync_once(local_url, remote_url, full=True, settings=settings)
+        _syncer = threading.Thread(
+            target=_run, args=(local_url, remote_url, settings), name="replica-sync", daemon=True
+        )
+        _syncer.start()
+    return True
+
+
+def start_services():
+    # What every process that serves lifters starts (app.startup, api.make_server):
+    # this sync thread, the shared-cache poller and the pooled engine. Idempotent.
+    start()
+    shared_cache.start()
+    db.get_engine()
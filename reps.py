@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# --- MULTI-SET REPS PARSER ---
+# Reps are typed as free text: "10" (same reps every set) or "5,4,3" (one
+# number per set). Everything here works on whole columns at once and turns
+# that text into a (rows x sets) float matrix, NaN-padded, so volume and e1RM
+# use every set instead of just the first number.
+
+MAX_SETS = 20  # a single "10" is repeated across at most this many sets
+
+
+def parse_reps(reps, sets=None):
+    reps = pd.Series(reps, dtype="string").reset_index(drop=True)
+    n = len(reps)
+    if n == 0:
+        return np.empty((0, 0))
+
+    # 1. Every integer in the text, one column per set ("5, 4 / 3" works too)
+    cleaned = reps.str.replace(r"[^0-9]+", ",", regex=True).str.strip(",")
+    parts = cleaned.str.split(",", expand=True)
+    if parts.shape[1] == 0:
+        return np.full((n, 1), np.nan)
+    matrix = np.column_stack([
+        pd.to_numeric(parts[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        for col in parts.columns
+    ])
+
+    if sets is None:
+        return matrix
+
+    # 2. "10" with Sets=3 means 10,10,10
+    sets = np.clip(pd.to_numeric(pd.Series(sets), errors="coerce").fillna(1).to_numpy(dtype=int), 1, MAX_SETS)
+    single = (~np.isnan(matrix)).sum(axis=1) == 1
+    if single.any():
+        width = max(matrix.shape[1], int(sets[single].max()))
+        if width > matrix.shape[1]:
+            matrix = np.hstack([matrix, np.full((n, width - matrix.shape[1]), np.nan)])
+        fill = single[:, None] & (np.arange(width)[None, :] < sets[:, None])
+        matrix = np.where(fill, matrix[:, [0]], matrix)
+    return matrix
+
+
+def epley(weight, reps):
+    return weight * (1 + reps / 30)
+
+
+def set_metrics(weight, reps_matrix):
+    weight = np.asarray(weight, dtype=float)
+    if reps_matrix.shape[1] == 0:
+        reps_matrix = np.full((len(weight), 1), np.nan)
+    has_reps = ~np.isnan(reps_matrix).all(axis=1)
+    total_reps = np.nansum(reps_matrix, axis=1)
+    # Best set = most reps at the logged weight; unparseable reps count as a single
+    best_reps = np.where(has_reps, np.nanmax(np.where(has_reps[:, None], reps_matrix, 0), axis=1), 1)
+    return {
+        "total_reps": total_reps.astype(int),
+        "volume": weight * total_reps,
+        "best_reps": best_reps,
+        "best_e1rm": epley(weight, best_reps),
+    }
+
+
+def enrich(df):
+    # Adds Total_Reps / Volume / e1RM to a frame with Weight_kg, Sets, Reps
+    matrix = parse_reps(df["Reps"], df["Sets"])
+    metrics = set_metrics(df["Weight_kg"].to_numpy(dtype=float), matrix)
+    df["Total_Reps"] = metrics["total_reps"]
+    df["Volume"] = metrics["volume"]
+    df["e1RM"] = metrics["best_e1rm"]
+    return df
+
+
+def set_rows(workout_ids, reps_matrix):
+    # Long format for the workout_sets table: one row per performed set
+    rows_idx, set_idx = np.nonzero(~np.isnan(reps_matrix))
+    ids = np.asarray(workout_ids)[rows_idx]
+    values = reps_matrix[rows_idx, set_idx]
+    return [
+        {"workout_id": int(w), "set_no": int(s) + 1, "reps": int(r)}
+        for w, s, r in zip(ids, set_idx, values)
+    ]
@@ -0,0 +1,400 @@
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+# --- SHARED CACHE & SESSION STORE (across app replicas) ---
+# (stdlib only at import time: app.py uses the session store on the login screen)
+# Several app.py processes behind a load balancer share one key-value store.
+# It holds the prepared per-user frames, catalog entries and analytics tables,
+# so a replica that has never seen a lifter doesn't cold-load them from
+# Postgres. It also holds login sessions, so any replica can resume a cookie.
+#
+#   [shared_cache]
+#   backend = "sqlite"          # "memory" (in-process stand-in) or "off"
+#   path = "shared_cache.db"    # one file on a volume every replica mounts
+#   ttl = 600
+#   secret = "..."              # signs every entry (default: the database URL)
+#
+# Keys are versioned: "workouts:<user>:v<n>". A committed write bumps the
+# user's version (so stale entries are never read again, they just expire)
+# and publishes an invalidation. Every replica polls the event log and drops
+# its own in-process copy for that user. Backends only need GET/SET with a
+# TTL, INCR, and an append-only event log, so a Redis backend (SET EX / INCR /
+# XADD + XREAD) can be added next to these two.
+#
+# Anyone who can write the store could otherwise plant a pickle (code runs
+# on load) or a session. Every value is HMAC-signed with a secret the
+# replicas share and the signature is checked before unpickling.
+
+DEFAULT_SETTINGS = {
+    "backend": "off",
+    "path": "shared_cache.db",
+    "ttl": 600.0,            # seconds a shared entry lives
+    "poll_interval": 0.5,    # seconds between event-log reads
+    "session_days": 30,
+    "event_retention": 3600.0,
+    "secret": "",
+}
+CHANNEL = "invalidate"
+ORIGIN = uuid.uuid4().hex[:12]  # this replica; its own events aren't applied twice
+
+_settings = None
+_backend = None
+_subscribers = {}  # namespace -> [callback(user)]
+_poller = None
+_start_lock = threading.Lock()
+_signing_key = None
+_stats = {"hits": 0, "misses": 0, "stores": 0, "published": 0, "received": 0, "rejected": 0, "publish_errors": 0}
+_stats_lock = threading.Lock()
+
+
+def get_settings():
+    global _settings
+    if _settings is None:
+        settings = dict(DEFAULT_SETTINGS)
+        try:
+            import streamlit as st
+            overrides = st.secrets.get("shared_cache", {})
+        except Exception:
+            overrides = {}
+        for key in settings:
+            if key in overrides:
+                settings[key] = type(DEFAULT_SETTINGS[key])(overrides[key])
+        if "SHARED_CACHE" in os.environ:
+            settings["backend"] = os.environ["SHARED_CACHE"]
+        if "SHARED_CACHE_PATH" in os.environ:
+            settings["path"] = os.environ["SHARED_CACHE_PATH"]
+        if "SHARED_CACHE_SECRET" in os.environ:
+            settings["secret"] = os.environ["SHARED_CACHE_SECRET"]
+        _settings = settings
+    return _settings
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+# --- SIGNING ---
+def _hmac_key():
+    # [shared_cache] secret, else the database URL every replica already holds
+    # (read like db.get_database_url, without importing SQLAlchemy here)
+    global _signing_key
+    if _signing_key is None:
+        secret = get_settings()["secret"] or os.environ.get("DATABASE_URL")
+        if not secret:
+            import streamlit as st
+            secret = st.secrets["connections"]["supabase"]["url"]
+        _signing_key = hashlib.sha256(f"shared_cache:{secret}".encode("utf-8")).digest()
+    return _signing_key
+
+
+def _sign(blob):
+    return hmac.new(_hmac_key(), blob, hashlib.sha256).digest() + blob
+
+
+def _verify(signed):
+    # -> the payload, or None if it wasn't written by a replica holding the key
+    mac, blob = signed[:32], signed[32:]
+    if len(mac) == 32 and hmac.compare_digest(mac, hmac.new(_hmac_key(), blob, hashlib.sha256).digest()):
+        return blob
+    _count("rejected")
+    return None
+
+
+# --- BACKENDS ---
+class MemoryBackend:
+    # In-process stand-in for a key-value server (tests, a single replica)
+    def __init__(self):
+        self._data = {}    # key -> (value, expires_at or None)
+        self._events = []  # (seq, channel, message, created_at)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] < time.time():
+                del self._data[key]
+                return None
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, (0, None))[0]) + 1
+            self._data[key] = (value, None)
+            return value
+
+    def publish(self, channel, message):
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, channel, message, time.time()))
+            return self._seq
+
+    def read_events(self, after_seq):
+        with self._lock:
+            return [(seq, channel, message) for seq, channel, message, _ in self._events if seq > after_seq]
+
+    def last_seq(self):
+        with self._lock:
+            return self._seq
+
+    def purge(self, retention):
+        cutoff = time.time() - retention
+        with self._lock:
+            self._events = [event for event in self._events if event[3] >= cutoff]
+            self._data = {k: v for k, v in self._data.items() if v[1] is None or v[1] >= time.time()}
+
+
+class SQLiteBackend:
+    # One WAL-mode file shared by every replica on the host / volume
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections can't cross threads: one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl else None)
+            )
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key):
+        conn = self._conn()
+        with conn:
+            return conn.execute("""
+                INSERT INTO kv (key, value, expires_at) VALUES (?, 1, NULL)
+                ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+                RETURNING value
+            """, (key,)).fetchone()[0]
+
+    def publish(self, channel, message):
+        conn = self._conn()
+        with conn:
+            return conn.execute(
+                "INSERT INTO events (channel, message, created_at) VALUES (?, ?, ?)",
+                (channel, message, time.time())
+            ).lastrowid
+
+    def read_events(self, after_seq):
+        return self._conn().execute(
+            "SELECT seq, channel, message FROM events WHERE seq > ? ORDER BY seq", (after_seq,)
+        ).fetchall()
+
+    def last_seq(self):
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def purge(self, retention):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - retention,))
+            conn.execute("DELETE FROM kv WHERE expires_at < ?", (time.time(),))
+
+
+BACKENDS = {"memory": lambda settings: MemoryBackend(), "sqlite": lambda settings: SQLiteBackend(settings["path"])}
+
+
+def get_backend():
+    # None when the shared cache is off: every call below is then a no-op
+    global _backend
+    if _backend is None:
+        name = get_settings()["backend"]
+        if name in (None, "", "off"):
+            return None
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown shared_cache backend: {name}")
+        with _start_lock:
+            if _backend is None:
+                _backend = BACKENDS[name](get_settings())
+    return _backend
+
+
+def enabled():
+    return get_backend() is not None
+
+
+# --- VERSIONED DATA ---
+def _key(namespace, user, suffix):
+    return f"{namespace}:{quote(user, safe='')}:{suffix}"
+
+
+def version(namespace, user):
+    backend = get_backend()
+    if backend is None:
+        return 0
+    value = backend.get(_key(namespace, user, "version"))
+    return int(value) if value is not None else 0
+
+
+def bump(namespace, user):
+    # After a committed write: new version for everyone, then tell the other replicas.
+    # Never raises: the write is already in, and callers must not redo it because
+    # the cache was busy ("database is locked"); other replicas fall back on the TTL.
+    backend = get_backend()
+    if backend is None:
+        return 0
+    try:
+        new_version = backend.incr(_key(namespace, user, "version"))
+        message = json.dumps({"origin": ORIGIN, "namespace": namespace, "user": user, "version": new_version})
+        backend.publish(CHANNEL, message)
+    except Exception:
+        _count("publish_errors")  # shown in cache_stats()
+        return None
+    _count("published")
+    return new_version
+
+
+def load(namespace, user, version):
+    backend = get_backend()
+    if backend is None:
+        return None
+    signed = backend.get(_key(namespace, user, f"v{version}"))
+    blob = _verify(signed) if signed is not None else None
+    if blob is None:
+        _count("misses")
+        return None
+    _count("hits")
+    return pickle.loads(blob)
+
+
+def store(namespace, user, version, value):
+    backend = get_backend()
+    if backend is None:
+        return
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    backend.set(_key(namespace, user, f"v{version}"), _sign(blob), get_settings()["ttl"])
+    _count("stores")
+
+
+# --- PUB/SUB INVALIDATION ---
+def subscribe(namespace, callback):
+    # callback(user) runs on the poller thread when another replica bumps namespace
+    callbacks = _subscribers.setdefault(namespace, [])
+    if callback not in callbacks:
+        callbacks.append(callback)
+
+
+def _dispatch(events):
+    for _, channel, message in events:
+        if channel != CHANNEL:
+            continue
+        event = json.loads(message)
+        if event["origin"] == ORIGIN:
+            continue  # we already updated our own caches when we wrote
+        _count("received")
+        for callback in _subscribers.get(event["namespace"], []):
+            callback(event["user"])
+
+
+def _poll(backend, settings):
+    seen = backend.last_seq()
+    last_purge = time.monotonic()
+    while True:
+        time.sleep(settings["poll_interval"])
+        try:
+            events = backend.read_events(seen)
+            if events:
+                seen = events[-1][0]
+                _dispatch(events)
+            if time.monotonic() - last_purge > settings["event_retention"] / 4:
+                backend.purge(settings["event_retention"])
+                last_purge = time.monotonic()
+        except Exception:
+            pass  # next round tries again; local caches still expire on their TTL
+
+
+def start():
+    # Idempotent; a no-op when the shared cache is off
+    global _poller
+    backend = get_backend()
+    if backend is None:
+        return False
+    if _poller is not None and _poller.is_alive():
+        return True
+    with _start_lock:
+        if _poller is None or not _poller.is_alive():
+            _poller = threading.Thread(target=_poll, args=(backend, get_settings()), name="shared-cache", daemon=True)
+            _poller.start()
+    return True
+
+
+# --- SESSIONS ---
+# The login cookie carries a random token; the store maps it to the lifter.
+def create_session(user):
+    token = secrets.token_urlsafe(32)
+    get_backend().set(f"session:{token}", _sign(user.encode("utf-8")), get_settings()["session_days"] * 86400)
+    return token
+
+
+def session_user(token):
+    backend = get_backend()
+    if backend is None or not token:
+        return None
+    value = backend.get(f"session:{token}")
+    value = _verify(value) if value is not None else None
+    return value.decode("utf-8") if value is not None else None
+
+
+def end_session(token):
+    backend = get_backend()
+    if backend is not None and token:
+        backend.delete(f"session:{token}")
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["backend"] = get_settings()["backend"]
+    stats["origin"] = ORIGIN
+    return stats
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+from urllib.parse import quote
+
+import pandas as pd
+from sqlalchemy import text
+
+import data_access
+import db
+
+# --- PARQUET SNAPSHOTS ---
+# Each lifter's workouts as Parquet, partitioned by user and month:
+#
+#   snapshots/username=Azaan/month=2026-01/part-0.parquet
+#   snapshots/username=Azaan/_manifest.json
+#
+# Exports are incremental. One grouped query fingerprints every month
+# (row count + id sum), and only months whose fingerprint changed are
+# rewritten, so a new set rewrites just the current month and a delete just
+# its own month. The loader memory-maps the files. Old months come from the
+# snapshot and only stale months are read from the database, which is what
+# the notebook and workout_cache's full loads use when [snapshots] is set.
+# pyarrow is imported on first export / load, never just for the settings.
+#
+#   python snapshots.py export                 -> every user, ./snapshots
+#   python snapshots.py export --user Azaan --root /data/snapshots --db postgresql://...
+
+DEFAULT_ROOT = "snapshots"
+MANIFEST = "_manifest.json"  # files starting with "_" are skipped by Parquet readers
+COLUMNS = data_access.VIEW_COLUMNS["dashboard"]
+
+
+def get_snapshot_root():
+    # None -> snapshots are not used by the app (export/load still work with a root)
+    env_root = os.environ.get("SNAPSHOT_DIR")
+    if env_root:
+        return env_root
+    try:
+        import streamlit as st
+        return st.secrets.get("snapshots", {}).get("path")
+    except Exception:
+        return None
+
+
+def _user_dir(root, user):
+    return os.path.join(root, f"username={quote(user, safe='')}")
+
+
+def _month_expr(conn):
+    if conn.dialect.name == "postgresql":
+        return "to_char(date, 'YYYY-MM')"
+    return "strftime('%Y-%m', date)"
+
+
+def month_fingerprints(user, conn):
+    # month -> {"rows", "id_sum"}: any insert or delete in a month changes it
+    rows = conn.execute(
+        text(f"""
+            SELECT {_month_expr(conn)} AS month, COUNT(*), SUM(id) FROM workouts
+            WHERE username = :u GROUP BY 1
+        """),
+        {"u": user}
+    )
+    return {month: {"rows": int(count), "id_sum": int(id_sum)} for month, count, id_sum in rows}
+
+
+def read_manifest(root, user):
+    path = os.path.join(_user_dir(root, user), MANIFEST)
+    if not os.path.exists(path):
+        return {"months": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(root, user, manifest):
+    path = os.path.join(_user_dir(root, user), MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _month_range(month):
+    start = pd.Timestamp(f"{month}-01")
+    return start.date(), (start + pd.offsets.MonthEnd(0)).date()
+
+
+def _months_of(df):
+    return df["Date"].dt.strftime("%Y-%m")
+
+
+def _load_months(user, months, conn):
+    # One query from the oldest stale month on, then keep only the stale months
+    start, _ = _month_range(min(months))
+    df = data_access.load_workouts(user, COLUMNS, start_date=start, conn=conn)
+    return df[_months_of(df).isin(set(months))]
+
+
+# --- EXPORT ---
+def export_user(user, root=DEFAULT_ROOT, db_url=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    user_dir = _user_dir(root, user)
+    os.makedirs(user_dir, exist_ok=True)
+    manifest = read_manifest(root, user)
+    with db.connect(db_url) as conn:
+        current = month_fingerprints(user, conn)
+        stale = sorted(m for m, fp in current.items() if manifest["months"].get(m) != fp)
+        df = _load_months(user, stale, conn) if stale else None
+
+    # 1. Rewrite changed months (write to a temp file, then swap in)
+    written_rows = 0
+    if stale:
+        for month, month_df in df.groupby(_months_of(df), sort=True):
+            month_dir = os.path.join(user_dir, f"month={month}")
+            os.makedirs(month_dir, exist_ok=True)
+            target = os.path.join(month_dir, "part-0.parquet")
+            table = pa.Table.from_pandas(month_df.reset_index(drop=True), preserve_index=False)
+            pq.write_table(table, target + ".tmp", compression="zstd")
+            os.replace(target + ".tmp", target)
+            written_rows += len(month_df)
+
+    # 2. Months that no longer have any rows
+    removed = [m for m in manifest["months"] if m not in current]
+    for month in removed:
+        shutil.rmtree(os.path.join(user_dir, f"month={month}"), ignore_errors=True)
+
+    manifest = {"months": current, "exported_at": datetime.now().isoformat(timespec="seconds")}
+    _write_manifest(root, user, manifest)
+    return {
+        "user": user,
+        "months_written": len(stale),
+        "months_unchanged": len(current) - len(stale),
+        "months_removed": len(removed),
+        "rows_written": written_rows,
+    }
+
+
+def export_all(root=DEFAULT_ROOT, db_url=None, verbose=True):
+    with db.connect(db_url) as conn:
+        users = [row[0] for row in conn.execute(text("SELECT DISTINCT username FROM workouts WHERE username IS NOT NULL"))]
+    reports = []
+    for user in users:
+        report = export_user(user, root, db_url)
+        reports.append(report)
+        if verbose:
+            print(
+                f"✅ {user}: {report['months_written']} month(s) written ({report['rows_written']:,} rows), "
+                f"{report['months_unchanged']} unchanged, {report['months_removed']} removed"
+            )
+    return reports
+
+
+# --- LOAD ---
+def _read(path, columns=None, filters=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # Memory-mapped: the OS pages the file in, nothing is copied up front
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True, partitioning="hive")
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype(), pa.large_string(): pd.StringDtype()}.get)
+
+
+def load(user=None, root=DEFAULT_ROOT, columns=None, months=None):
+    # A snapshot as it was exported (no database access). user=None -> everyone.
+    path = _user_dir(root, user) if user else root
+    if not os.path.isdir(path):
+        return data_access.empty_frame(columns or COLUMNS)
+    filters = [("month", "in", list(months))] if months else None
+    df = _read(path, columns=columns, filters=filters)
+    df = df.drop(columns=[col for col in ["month"] if col in df.columns and (columns is None or col not in columns)])
+    sort_by = [col for col in ["Date", "id"] if col in df.columns]
+    return df.sort_values(sort_by, ignore_index=True) if sort_by else df
+
+
+def load_fresh(user, root, conn=None):
+    # Up-to-date frame: unchanged months from the snapshot, stale ones from the database
+    if conn is None:
+        with db.connect() as conn:
+            return load_fresh(user, root, conn)
+    current = month_fingerprints(user, conn)
+    exported = read_manifest(root, user)["months"]
+    fresh = [m for m, fp in current.items() if exported.get(m) == fp]
+    stale = [m for m in current if m not in fresh]
+    parts = []
+    if fresh:
+        parts.append(load(user, root, COLUMNS, months=fresh))
+    if stale:
+        parts.append(_load_months(user, stale, conn))
+    if not parts:
+        return data_access.empty_frame(COLUMNS)
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    dtypes = {col: data_access.WORKOUT_COLUMNS[col][1] for col in COLUMNS if data_access.WORKOUT_COLUMNS[col][1]}
+    df = df[COLUMNS].astype(dtypes)
+    return df.sort_values(["Date", "id"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export workouts to partitioned Parquet snapshots.")
+    parser.add_argument("command", choices=["export", "info"])
+    parser.add_argument("--root", default=get_snapshot_root() or DEFAULT_ROOT)
+    parser.add_argument("--db", help="SQLAlchemy URL (default: secrets / DATABASE_URL)")
+    parser.add_argument("--user", help="only this lifter")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        db_url = args.db or db.get_database_url()
+        if args.user:
+            print(export_user(args.user, args.root, db_url))
+        else:
+            export_all(args.root, db_url)
+    else:
+        df = load(args.user, args.root)
+        print(f"{len(df):,} rows in {args.root}")
+        print(df.dtypes)
@@ -0,0 +1,136 @@
+import argparse
+import os
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import catalog
+import db
+import importer
+import migrations
+
+# --- SYNTHETIC TRAINING HISTORIES ---
+# Realistic fake logs for benchmarks and load tests. Every lifter gets a
+# split of catalog.DEFAULT_MUSCLE_GROUPS exercises over four training days, trains most of
+# those days, and progresses with noise. Sets use "10" or "6,5,4" style reps,
+# and RPE, notes, arm and a drifting bodyweight are filled in too.
+#
+#   python synthetic_data.py synthetic.csv --users 50 --days 730
+#   python synthetic_data.py --db sqlite:///bench.db --users 20    -> loaded straight in
+
+TRAINING_DAYS = {"Monday": 0, "Wednesday": 2, "Friday": 4, "Saturday": 5}  # library category -> weekday
+EXERCISES_PER_USER = 8
+ATTENDANCE = 0.85
+NOTES = ["", "", "", "", "Felt strong", "Elbow a bit tight", "New PR!", "Short on time"]
+
+
+def _reps_text(rng, sets):
+    # Half the sets are "8" (same reps every set), the rest a descending "6,5,4"
+    first = rng.integers(3, 11, size=len(sets))
+    single = rng.random(len(sets)) < 0.5
+    out = []
+    for n, top, same in zip(sets, first, single):
+        if same or n == 1:
+            out.append(str(top))
+        else:
+            out.append(",".join(str(max(1, top - k)) for k in range(n)))
+    return out
+
+
+def generate(users=20, days=365, seed=0, end=None):
+    # Returns (workouts in the CSV import format, exercise library rows)
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=pd.Timestamp(end or date.today()), periods=days, freq="D")
+    exercises = np.array(list(catalog.DEFAULT_MUSCLE_GROUPS))
+    day_names = list(TRAINING_DAYS)
+    frames = []
+    library = []
+
+    for u in range(users):
+        user = f"lifter{u:03d}"
+        # 1. This lifter's split: exercise -> training day
+        picked = rng.choice(exercises, size=min(EXERCISES_PER_USER, len(exercises)), replace=False)
+        plan = pd.DataFrame({
+            "Exercise": picked,
+            "Day": [day_names[i % len(day_names)] for i in range(len(picked))],
+        })
+        plan["Weekday"] = plan["Day"].map(TRAINING_DAYS)
+        plan["Base"] = rng.uniform(15, 60, size=len(plan))
+        plan["Gain"] = rng.uniform(0.005, 0.03, size=len(plan))  # kg per day
+        library += [
+            {"name": ex, "category": day, "muscle_group": catalog.DEFAULT_MUSCLE_GROUPS[ex], "username": user}
+            for ex, day in zip(plan["Exercise"], plan["Day"])
+        ]
+
+        # 2. Sessions actually trained (most of the planned days)
+        trained = dates[dates.weekday.isin(TRAINING_DAYS.values()) & (rng.random(len(dates)) < ATTENDANCE)]
+        sessions = pd.DataFrame({"Date": trained, "Weekday": trained.weekday})
+        rows = sessions.merge(plan, on="Weekday")
+        if rows.empty:
+            continue
+        n = len(rows)
+
+        # 3. Progression with noise, rounded to plate increments
+        elapsed = (rows["Date"] - dates[0]).dt.days.to_numpy()
+        weight = rows["Base"].to_numpy() + rows["Gain"].to_numpy() * elapsed + rng.normal(0, 1.5, size=n)
+        sets = rng.integers(1, 6, size=n)
+        bodyweight = rng.uniform(70, 100) + np.cumsum(rng.normal(0, 0.1, size=len(dates)))
+        frames.append(pd.DataFrame({
+            "Date": rows["Date"].dt.strftime("%Y-%m-%d"),
+            "User": user,
+            "Exercise": rows["Exercise"],
+            "Arm": rng.choice(["L", "R"], size=n),
+            "Weight_kg": np.round(np.clip(weight, 2.5, None) * 2) / 2,
+            "Sets": sets,
+            "Reps": _reps_text(rng, sets),
+            "RPE": rng.integers(6, 11, size=n),
+            "Notes": rng.choice(NOTES, size=n),
+            "Bodyweight": np.round(bodyweight[elapsed], 1),
+        }))
+
+    workouts = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return workouts, pd.DataFrame(library)
+
+
+def load(db_url, users=20, days=365, seed=0, verbose=False):
+    # Generate and load into any database the app supports (idempotent)
+    workouts, library = generate(users, days, seed)
+    migrations.run_migrations(db_url, verbose=False)
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        workouts.to_csv(path, index=False)
+        report = importer.import_csv(path, db_url=db_url, verbose=verbose)
+    finally:
+        os.remove(path)
+    with db.begin(db_url) as conn:
+        conn.execute(
+            text("""
+                INSERT INTO exercise_library (name, category, muscle_group, username)
+                VALUES (:name, :category, :muscle_group, :username)
+                ON CONFLICT (username, name) DO NOTHING
+            """),
+            library.to_dict("records")
+        )
+    return workouts, library, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic training histories.")
+    parser.add_argument("csv_path", nargs="?", help="write the workouts to this CSV")
+    parser.add_argument("--db", help="SQLAlchemy URL to load the data into")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.db:
+        workouts, library, _ = load(args.db, args.users, args.days, args.seed, verbose=True)
+    else:
+        workouts, library = generate(args.users, args.days, args.seed)
+    if args.csv_path:
+        workouts.to_csv(args.csv_path, index=False)
+        print(f"✅ Wrote {len(workouts):,} rows for {args.users} lifters to {args.csv_path}")
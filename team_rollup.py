@@ -0,0 +1,314 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import data_access
+import db
+
+# --- TEAM ROLLUP ---
+# Coaches look at the whole roster, so scanning every athlete's log per
+# viewer won't do. A batch job summarizes each athlete into small tables:
+#
+#   team_weekly        one row per athlete per week: sessions, sets, volume,
+#                      average RPE, best e1RM, PRs set, left/right arm volume
+#   team_prs           best e1RM per athlete per exercise, and when
+#   team_rollup_state  the (row count, id sum) each athlete was summarized at
+#
+# Only athletes whose fingerprint changed (new or deleted logs) are
+# recomputed. They are split into shards that run in a process pool (spawned,
+# so every worker opens its own connections), and the parent writes each
+# shard's rows in one transaction as it finishes. The coach tab reads only
+# these tables.
+#
+#   python team_rollup.py                      -> refresh stale athletes once
+#   python team_rollup.py --every 300          -> keep refreshing (cron-less)
+#   python team_rollup.py --full --workers 8 --db postgresql://...
+#
+#   [team]
+#   coaches = ["Azaan"]
+#   roster = ["Kaisar", "Rahil"]   # optional, default: every athlete
+
+DEFAULT_SETTINGS = {
+    "coaches": [],
+    "roster": [],
+    "workers": 0,       # 0 -> one per CPU
+    "shard_size": 8,    # athletes per pool task
+    "weeks_shown": 12,  # coach tab history
+}
+ROLLUP_COLUMNS = ["id", "Date", "Exercise", "Weight_kg", "Sets", "Reps", "RPE", "Arm"]
+WEEK_FREQ = "W-SUN"  # same weeks as the Logbook
+TREND_WEEKS = 4
+
+_settings = None
+
+
+def _listed(value):
+    return [name.strip() for name in value.split(",") if name.strip()] if isinstance(value, str) else list(value)
+
+
+def get_settings():
+    global _settings
+    if _settings is None:
+        settings = dict(DEFAULT_SETTINGS)
+        try:
+            import streamlit as st
+            overrides = st.secrets.get("team", {})
+        except Exception:
+            overrides = {}
+        for key in settings:
+            if key in overrides:
+                settings[key] = _listed(overrides[key]) if isinstance(DEFAULT_SETTINGS[key], list) else int(overrides[key])
+        if "TEAM_COACHES" in os.environ:
+            settings["coaches"] = _listed(os.environ["TEAM_COACHES"])
+        if "TEAM_ROSTER" in os.environ:
+            settings["roster"] = _listed(os.environ["TEAM_ROSTER"])
+        _settings = settings
+    return _settings
+
+
+def is_coach(user):
+    return user in get_settings()["coaches"]
+
+
+# --- PER-ATHLETE SUMMARY (pure pandas, runs in the workers) ---
+def summarize_athlete(df):
+    # -> (weekly rows, PR rows) for one athlete's full log. analytics is only
+    # needed by the batch job; the coach check on every rerun stays light.
+    import analytics
+
+    sets = analytics.prepare_sets(df)
+    sets["e1RM"] = sets["e1RM_Epley"].fillna(0.0)
+
+    # A PR is a set that beats the best e1RM logged before it on that exercise
+    best_so_far = sets.groupby("Exercise", observed=True)["e1RM"].cummax()
+    best_before = best_so_far.groupby(sets["Exercise"], observed=True).shift(1)
+    sets["PR"] = sets["e1RM"] > best_before  # NaN (first time) -> False
+
+    sets["Week"] = sets["Date"].dt.to_period(WEEK_FREQ).dt.start_time
+    sets["Logged_RPE"] = sets["RPE"].where(sets["RPE"] > 0)
+    sets["Left"] = sets["Volume"].where(sets["Arm"] == "L", 0.0)
+    sets["Right"] = sets["Volume"].where(sets["Arm"] == "R", 0.0)
+    weekly = sets.groupby("Week").agg(
+        sessions=("Date", "nunique"),
+        sets=("Sets", "sum"),
+        volume=("Volume", "sum"),
+        avg_rpe=("Logged_RPE", "mean"),
+        best_e1rm=("e1RM", "max"),
+        prs=("PR", "sum"),
+        left_volume=("Left", "sum"),
+        right_volume=("Right", "sum"),
+    ).reset_index().rename(columns={"Week": "week"})
+
+    lifted = sets[sets["e1RM"] > 0]
+    best = lifted.loc[lifted.groupby("Exercise", observed=True)["e1RM"].idxmax()]
+    prs = pd.DataFrame({"exercise": best["Exercise"], "best_e1rm": best["e1RM"], "date": best["Date"]})
+    return weekly, prs
+
+
+def _records(df, date_columns):
+    # Plain Python values: picklable back to the parent, bindable by any driver
+    df = df.astype(object).where(df.notna(), None)
+    for col in date_columns:
+        df[col] = [value.date() if value is not None else None for value in df[col]]
+    return df.to_dict("records")
+
+
+def _compute_shard(db_url, users):
+    # Worker process: read each athlete once, return rows for the parent to write
+    results = {}
+    with db.connect(db_url) as conn:
+        for user in users:
+            df = data_access.load_workouts(user, ROLLUP_COLUMNS, conn=conn)
+            weekly, prs = summarize_athlete(df)
+            results[user] = (_records(weekly, ["week"]), _records(prs, ["date"]))
+    return results
+
+
+# --- BATCH JOB ---
+def fingerprints(conn):
+    # username -> (rows, id sum): any insert or delete changes it
+    rows = conn.execute(text(
+        "SELECT username, COUNT(*), SUM(id) FROM workouts WHERE username IS NOT NULL GROUP BY username"
+    ))
+    return {user: (int(count), int(id_sum)) for user, count, id_sum in rows}
+
+
+def _write(conn, results, current):
+    for user, (weekly, prs) in results.items():
+        conn.execute(text("DELETE FROM team_weekly WHERE username = :u"), {"u": user})
+        conn.execute(text("DELETE FROM team_prs WHERE username = :u"), {"u": user})
+        if weekly:
+            conn.execute(
+                text("""
+                    INSERT INTO team_weekly (username, week, sessions, sets, volume, avg_rpe, best_e1rm, prs,
+                                             left_volume, right_volume)
+                    VALUES (:username, :week, :sessions, :sets, :volume, :avg_rpe, :best_e1rm, :prs,
+                            :left_volume, :right_volume)
+                """),
+                [{"username": user, **row} for row in weekly]
+            )
+        if prs:
+            conn.execute(
+                text("INSERT INTO team_prs (username, exercise, best_e1rm, date) VALUES (:username, :exercise, :best_e1rm, :date)"),
+                [{"username": user, **row} for row in prs]
+            )
+        row_count, id_sum = current[user]
+        conn.execute(
+            text("""
+                INSERT INTO team_rollup_state (username, row_count, id_sum, refreshed_at) VALUES (:u, :n, :s, :t)
+                ON CONFLICT (username) DO UPDATE
+                SET row_count = excluded.row_count, id_sum = excluded.id_sum, refreshed_at = excluded.refreshed_at
+            """),
+            {"u": user, "n": row_count, "s": id_sum, "t": datetime.now()}
+        )
+
+
+def _remove(conn, users):
+    for user in users:
+        for table in ["team_weekly", "team_prs", "team_rollup_state"]:
+            conn.execute(text(f"DELETE FROM {table} WHERE username = :u"), {"u": user})
+
+
+def refresh(db_url=None, workers=None, full=False, verbose=False):
+    db_url = db_url or db.get_database_url()
+    settings = get_settings()
+    started = time.perf_counter()
+
+    # 1. Who changed since the last run (fingerprints are read before any
+    #    athlete, so logs arriving meanwhile are picked up next time)
+    with db.connect(db_url) as conn:
+        current = fingerprints(conn)
+        if settings["roster"]:
+            current = {user: fp for user, fp in current.items() if user in settings["roster"]}
+        done = {
+            user: (int(count), int(id_sum))
+            for user, count, id_sum in conn.execute(text("SELECT username, row_count, id_sum FROM team_rollup_state"))
+        }
+    stale = sorted(user for user, fp in current.items() if full or done.get(user) != fp)
+    gone = sorted(set(done) - set(current))
+    shards = [stale[i:i + settings["shard_size"]] for i in range(0, len(stale), settings["shard_size"])]
+    workers = max(1, min(workers or settings["workers"] or os.cpu_count() or 1, len(shards)))
+
+    # 2. Summarize shard by shard; write each one as soon as it's back
+    if workers == 1:
+        for shard in shards:
+            with db.begin(db_url) as conn:
+                _write(conn, _compute_shard(db_url, shard), current)
+    else:
+        # spawn, not fork: a forked worker would share the parent's pooled connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for results in pool.map(_compute_shard, repeat(db_url), shards):
+                with db.begin(db_url) as conn:
+                    _write(conn, results, current)
+    if gone:
+        with db.begin(db_url) as conn:
+            _remove(conn, gone)
+
+    report = {
+        "athletes": len(current),
+        "refreshed": len(stale),
+        "unchanged": len(current) - len(stale),
+        "removed": len(gone),
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if verbose:
+        print(
+            f"✅ {report['refreshed']} athlete(s) refreshed, {report['unchanged']} unchanged, "
+            f"{report['removed']} removed ({report['workers']} worker(s), {report['seconds']:.2f}s)"
+        )
+    return report
+
+
+# --- READ SIDE (coach tab) ---
+# The job writes to the primary database; the local replica doesn't copy these tables
+def _connect():
+    return db.connect(db.get_database_url())
+
+
+def load_weekly(users=None, since=None, conn=None):
+    query = (
+        'SELECT username AS "Athlete", week AS "Week", sessions AS "Sessions", sets AS "Sets", volume AS "Volume", '
+        'avg_rpe AS "Avg_RPE", best_e1rm AS "Best_e1RM", prs AS "PRs", left_volume AS "Left_Volume", '
+        'right_volume AS "Right_Volume" FROM team_weekly WHERE 1 = 1'
+    )
+    params = {}
+    users = users if users is not None else get_settings()["roster"]
+    if since is not None:
+        query += " AND week >= :since"
+        params["since"] = pd.Timestamp(since).date()
+    if users:
+        query += f" AND username IN ({', '.join(f':u{i}' for i in range(len(users)))})"
+        params.update({f"u{i}": user for i, user in enumerate(users)})
+    query = text(query + " ORDER BY username, week")
+    if conn is None:
+        with _connect() as conn:
+            return pd.read_sql(query, conn, params=params, parse_dates=["Week"])
+    return pd.read_sql(query, conn, params=params, parse_dates=["Week"])
+
+
+def load_prs(user, conn=None):
+    query = text(
+        'SELECT exercise AS "Exercise", best_e1rm AS "Best_e1RM", date AS "Date" FROM team_prs '
+        "WHERE username = :u ORDER BY best_e1rm DESC"
+    )
+    if conn is None:
+        with _connect() as conn:
+            return pd.read_sql(query, conn, params={"u": user}, parse_dates=["Date"])
+    return pd.read_sql(query, conn, params={"u": user}, parse_dates=["Date"])
+
+
+def last_refreshed(conn=None):
+    query = text("SELECT MAX(refreshed_at) FROM team_rollup_state")
+    if conn is None:
+        with _connect() as conn:
+            return conn.execute(query).scalar()
+    return conn.execute(query).scalar()
+
+
+def roster_summary(weekly, weeks=TREND_WEEKS):
+    # One row per athlete: the last few weeks against the few before them
+    if weekly.empty:
+        return pd.DataFrame(columns=["Athlete", "Volume", "Volume_Change_%", "Avg_RPE", "PRs", "Arm_Imbalance_%"])
+    latest = weekly["Week"].max()
+    recent = weekly[weekly["Week"] > latest - pd.Timedelta(weeks=weeks)]
+    before = weekly[(weekly["Week"] <= latest - pd.Timedelta(weeks=weeks))
+                    & (weekly["Week"] > latest - pd.Timedelta(weeks=2 * weeks))]
+    now = recent.groupby("Athlete").agg(
+        Volume=("Volume", "sum"), Avg_RPE=("Avg_RPE", "mean"), PRs=("PRs", "sum"),
+        Left=("Left_Volume", "sum"), Right=("Right_Volume", "sum"),
+    )
+    previous = before.groupby("Athlete")["Volume"].sum().reindex(now.index)
+    now["Volume_Change_%"] = (now["Volume"] / previous.where(previous > 0) - 1) * 100
+    # Signed: positive means the left arm did more
+    strongest = np.maximum(now["Left"], now["Right"])
+    now["Arm_Imbalance_%"] = (now["Left"] - now["Right"]) / strongest.where(strongest > 0) * 100
+    return now.drop(columns=["Left", "Right"]).reset_index()[
+        ["Athlete", "Volume", "Volume_Change_%", "Avg_RPE", "PRs", "Arm_Imbalance_%"]
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the team rollup tables.")
+    parser.add_argument("--db", help="SQLAlchemy URL (default: secrets / DATABASE_URL)")
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    parser.add_argument("--full", action="store_true", help="recompute every athlete")
+    parser.add_argument("--every", type=float, help="keep running, refreshing every N seconds")
+    args = parser.parse_args()
+
+    db_url = args.db or db.get_database_url()
+    while True:
+        refresh(db_url, args.workers, args.full, verbose=True)
+        if not args.every:
+            break
+        args.full = False
+        time.sleep(args.every)
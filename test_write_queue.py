@@ -0,0 +1,49 @@
+import sqlite3
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+import catalog
+import db
+import migrations
+import shared_cache
+import workout_cache
+import write_queue
+
+USER = "lifter001"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'wq.db'}")
+    monkeypatch.delenv("REPLICA_PATH", raising=False)
+    db.dispose_all()
+    workout_cache.clear()
+    catalog.clear()
+    migrations.run_migrations(verbose=False)
+    yield
+    write_queue.flush()
+    write_queue.pop_errors(USER)
+    db.dispose_all()
+
+
+def _workout():
+    return {"date": date(2024, 5, 1), "exercise": "Heavy Riser", "weight": 40.0, "sets": 3,
+            "reps": "8,7,6", "rpe": 8, "username": USER, "notes": "", "bodyweight": None}
+
+
+def test_failing_publish_does_not_replay_a_committed_batch(database, monkeypatch):
+    # The shared cache is sqlite too and can be locked right after our commit
+    def locked(namespace, user):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(shared_cache, "bump", locked)
+
+    workout_cache.get_workouts(USER)
+    write_queue.submit_insert(USER, _workout())
+    assert write_queue.flush(user=USER)
+
+    with db.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM workouts")).scalar() == 1
+    assert write_queue.pop_errors(USER) == []
+    assert len(workout_cache.get_workouts(USER)) == 1
@@ -1,26 +1,11 @@
-import sqlite3
+import sys
+import migrations
 
-db_name = "arm_wrestling.db"
-conn = sqlite3.connect(db_name)
-cursor = conn.cursor()
+# Local databases are upgraded by the same versioned runner as the cloud one.
+db_url = sys.argv[1] if len(sys.argv) > 1 else "sqlite:///arm_wrestling.db"
 
-# 1. Add 'User' column (For your friend)
 try:
-    cursor.execute("ALTER TABLE training_logs ADD COLUMN User TEXT")
-    print("✅ User column added.")
-except sqlite3.OperationalError:
-    print("ℹ️ User column already exists.")
-
-# 2. Add 'Notes' column (For Notion replacement)
-try:
-    cursor.execute("ALTER TABLE training_logs ADD COLUMN Notes TEXT")
-    print("✅ Notes column added.")
-except sqlite3.OperationalError:
-    print("ℹ️ Notes column already exists.")
-
-# 3. Set default user for existing data
-cursor.execute("UPDATE training_logs SET User = 'Azaan' WHERE User IS NULL")
-conn.commit()
-conn.close()
-
-print("🎉 Database successfully upgraded to Version 2.0!")
\ No newline at end of file
+    migrations.run_migrations(db_url)
+    print("🎉 Database successfully upgraded!")
+except Exception as e:
+    print(f"❌ FAILED: {e}")
\ No newline at end of file
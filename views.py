@@ -0,0 +1,529 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy.exc import IntegrityError
+
+import bodyweight
+import catalog
+import data_access
+import db
+import exercise_stats
+import profiling
+import shared_cache
+import workout_cache
+import write_queue
+
+# --- DASHBOARD VIEWS ---
+# st.tabs runs every tab body on every rerun even though only one is visible.
+# Each view here is a plain function and app.py calls only the selected one,
+# so a Save on the top form doesn't pay for the other four tabs.
+# Views load their own data, on demand. plotly (charts) and analytics are
+# imported inside the views that use them, so a session that never opens a
+# chart never pays for loading plotly.
+
+
+def load_user_workouts(user):
+    try:
+        # Only this user's rows, prepared once and then served from the per-user cache
+        df = workout_cache.get_workouts(user)
+        profiling.frame("workouts", df)
+        return df, workout_cache.data_version(user)
+    except Exception as e:
+        st.error(f"❌ Error loading data: {e}")
+        st.stop()
+
+
+# --- PAGING ---
+# Tables are sliced here, on the server: only one page of rows is sent
+# to the browser no matter how long the history is.
+PAGE_SIZE = 25
+WEEKS_PER_PAGE = 4
+LOGBOOK_COLUMNS = ["Display_Date", "Exercise", "Weight_kg", "Sets", "Reps", "Notes"]
+
+
+def page_picker(total_items, page_size, key):
+    pages = max(1, -(-total_items // page_size))
+    if pages == 1:
+        return 1
+    return st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+
+
+def show_page(frame, columns, key, page_size=PAGE_SIZE):
+    page = page_picker(len(frame), page_size, key)
+    rows = frame.iloc[(page - 1) * page_size: page * page_size]
+    st.dataframe(
+        data_access.add_labels(rows, columns)[columns],
+        use_container_width=True, hide_index=True
+    )
+
+
+# --- KEYSET PAGER (History + delete picker) ---
+# Pages come straight from SQL (LIMIT + a (date, id) cursor), so the cost of
+# rendering doesn't grow with the size of the history. The cursor stack lives
+# in session state: push for "Older", pop for "Newer".
+def _older(key, cursor):
+    st.session_state[key]["cursors"].append(cursor)
+
+
+def _newer(key):
+    st.session_state[key]["cursors"].pop()
+
+
+def _with_pending(user, page, cursor, next_cursor, filters):
+    # Same view of the log as the dashboard: queued deletes are hidden, queued
+    # inserts (from the cached frame) are shown on the page their date falls on
+    page = page[~page["id"].isin(write_queue.pending_deletes(user))]
+    rows = workout_cache.provisional_rows(user, page["id"])
+    if rows is None or rows.empty:
+        return page.reset_index(drop=True)
+    exercise, start_date, end_date = filters
+    keep = pd.Series(True, index=rows.index)
+    if exercise != "All":
+        keep &= rows["Exercise"] == exercise
+    if start_date is not None:
+        keep &= (rows["Date"] >= pd.Timestamp(start_date)) & (rows["Date"] <= pd.Timestamp(end_date))
+    # Page window: (next page's first date, this page's cursor date]
+    if cursor is not None:
+        keep &= rows["Date"] <= pd.Timestamp(cursor[0])
+    if next_cursor is not None:
+        keep &= rows["Date"] > pd.Timestamp(next_cursor[0])
+    rows = rows.loc[keep, list(page.columns)].astype(page.dtypes.to_dict())
+    if rows.empty:
+        return page.reset_index(drop=True)
+    return pd.concat([page, rows]).sort_values(["Date", "id"], ascending=False, ignore_index=True)
+
+
+def history_pager(user, key, columns="history"):
+    # 1. Search by exercise / date range
+    col_ex, col_range = st.columns(2)
+    with col_ex:
+        exercise = st.selectbox("Exercise", ["All"] + data_access.list_logged_exercises(user), key=f"{key}_exercise")
+    with col_range:
+        date_range = st.date_input("Date range", value=(), key=f"{key}_range")
+    start_date, end_date = (date_range[0], date_range[1]) if len(date_range) == 2 else (None, None)
+
+    # New search -> back to the first page
+    filters = (exercise, start_date, end_date)
+    state = st.session_state.setdefault(key, {"filters": filters, "cursors": [None]})
+    if state["filters"] != filters:
+        state["filters"] = filters
+        state["cursors"] = [None]
+
+    # 2. One page from the database, plus this lifter's queued saves/deletes
+    #    (the writer commits them in the background; nothing waits here)
+    page, next_cursor = data_access.fetch_history_page(
+        user, cursor=state["cursors"][-1], limit=PAGE_SIZE,
+        exercise=None if exercise == "All" else exercise,
+        start_date=start_date, end_date=end_date, columns=columns
+    )
+    if write_queue.pending(user):
+        page = _with_pending(user, page, state["cursors"][-1], next_cursor, filters)
+        st.caption("⏳ Saving your latest changes...")
+    profiling.frame(key, page)
+
+    # 3. Navigation
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("⬅️ Newer", key=f"{key}_newer", disabled=len(state["cursors"]) == 1,
+                  on_click=_newer, args=(key,))
+    with col_page:
+        st.caption(f"Page {len(state['cursors'])}")
+    with col_next:
+        st.button("Older ➡️", key=f"{key}_older", disabled=next_cursor is None,
+                  on_click=_older, args=(key, next_cursor))
+    return page
+
+
+# --- 📈 Progress & Analytics ---
+def render_progress(user):
+    import analytics
+    import charts
+
+    df, data_version = load_user_workouts(user)
+    if not df.empty:
+        # --- 1. PRE-CALCULATE ANALYTICS ---
+        target_exercise = st.selectbox("Select Exercise for Analysis:", df["Exercise"].unique().tolist())
+        # Cached frame is already sorted by date; the slice is never modified, no copy needed
+        ex_data = df[df["Exercise"] == target_exercise]
+        
+        if len(ex_data) > 1:
+            # A. Summary row (regression sums + e1RM), maintained on every save/delete
+            try:
+                summary = exercise_stats.get_summary(user, target_exercise)
+            except Exception:
+                summary = None
+            if summary is None:
+                summary = exercise_stats.summarize_frame(ex_data)
+
+            # B. ML Prediction (O(1) from the stored sums)
+            monthly_gain = exercise_stats.monthly_gain(summary)
+            
+            # C. e1RM / volume are stored per row (best set of "5,4,3"), nothing to re-parse
+            current_e1rm = summary["current_e1rm"]
+
+            # --- 2. THE DASHBOARD ---
+            col_main, col_metrics = st.columns([3, 1])
+            
+            with col_main:
+                # Forecast
+                future_date = datetime.now() + timedelta(days=30)
+                future_val = exercise_stats.predict(summary, future_date)
+                st.caption(f"🤖 **Forecast:** hitting **{future_val:.1f} kg** in 30 days.")
+                
+                # --- 📊 MAIN GRAPH (The "Sick" Scatter) ---
+                # Rebuilt only when this user's data changes (cached per data version)
+                fig = charts.progress_figure(user, target_exercise, data_version, ex_data, summary)
+                st.plotly_chart(fig, use_container_width=True)
+
+            with col_metrics:
+                st.write("### ⚡ Stats")
+                
+                # Metric 1: Velocity
+                if monthly_gain > 0.5:
+                    st.metric("Growth Speed", f"+{monthly_gain:.1f} kg/mo", delta="Fast")
+                elif monthly_gain > 0:
+                    st.metric("Growth Speed", f"+{monthly_gain:.1f} kg/mo", delta="Steady")
+                else:
+                    st.metric("Growth Speed", f"{monthly_gain:.1f} kg/mo", delta="Stalled", delta_color="inverse")
+                
+                # Metric 2: Current Max
+                st.metric("Est. 1-Rep Max", f"{current_e1rm:.1f} kg")
+
+                # Metric 3: Workload + other e1RM formulas (prepared once per data version)
+                tables = analytics.cached_tables(user, data_version, df)
+                category = ex_data["Category"].iloc[-1]
+                load = analytics.latest(tables["workload"]["category"], "category", category)
+                if load is not None and pd.notna(load["ACWR"]):
+                    if load["ACWR"] > 1.5:
+                        st.metric(f"{category} Workload (7:28)", f"{load['ACWR']:.2f}", delta="Spike", delta_color="inverse")
+                    elif load["ACWR"] < 0.8:
+                        st.metric(f"{category} Workload (7:28)", f"{load['ACWR']:.2f}", delta="Detraining", delta_color="off")
+                    else:
+                        st.metric(f"{category} Workload (7:28)", f"{load['ACWR']:.2f}", delta="Sweet spot")
+                session = analytics.latest(tables["sessions"]["exercise"], "exercise", target_exercise)
+                if session is not None:
+                    st.caption(
+                        f"Last session 1RM — Brzycki {session['e1RM_Brzycki']:.1f} kg · "
+                        f"Lombardi {session['e1RM_Lombardi']:.1f} kg · fatigue {session['Fatigue']:,.0f}"
+                    )
+                
+                # --- 📉 NEW: MINI e1RM GRAPH ---
+                st.write("Theoretical Limit Trend:")
+                # We use a simple line chart here because it fits small spaces better
+                st.line_chart(ex_data.set_index("Date")["e1RM"], height=150, color="#FF4B4B")
+                
+        else:
+            st.warning("Log at least 2 workouts to unlock Analytics.")
+    else:
+        st.info(f"👋 Welcome, {user}! You haven't logged any workouts yet.")
+        st.write("Start training to see your strength curve here!")
+
+
+# --- 📅 History ---
+def render_history(user):
+    page = history_pager(user, key="history_pager")
+    if not page.empty:
+        st.dataframe(page, use_container_width=True, hide_index=True)
+    else:
+        st.write("No history yet.")
+
+
+# --- 📚 Logbook ---
+def render_logbook(user):
+    df, _ = load_user_workouts(user)
+    st.subheader("📚 Training Logbook")
+    if not df.empty:
+        st.caption("Click a day to see your history.")
+        logbook_ranges = {"Last 4 weeks": 28, "Last 3 months": 91, "Last year": 365, "All time": None}
+        logbook_range = st.selectbox("Show:", list(logbook_ranges), index=1)
+        range_days = logbook_ranges[logbook_range]
+        group_by = st.radio("Group by:", ["Weekday", "Week"], horizontal=True, key="logbook_group_by")
+        log_df = df
+        if range_days:
+            log_df = df[df["Date"] >= pd.Timestamp(date.today() - timedelta(days=range_days))]
+        if log_df.empty:
+            st.write("No logs in this range.")
+            return
+
+        groups = data_access.logbook_groups(log_df, group_by)
+        if group_by == "Weekday":
+            for day, day_data in groups:
+                with st.expander(f"🗓️ {day} ({len(day_data)} logs)"):
+                    show_page(day_data, LOGBOOK_COLUMNS, key=f"logbook_page_{day}")
+        else:
+            week_page = page_picker(len(groups), WEEKS_PER_PAGE, key="logbook_week_page")
+            for week, week_data in groups[(week_page - 1) * WEEKS_PER_PAGE: week_page * WEEKS_PER_PAGE]:
+                with st.expander(f"🗓️ Week of {week:%b %d, %Y} ({len(week_data)} logs)"):
+                    show_page(week_data, LOGBOOK_COLUMNS, key=f"logbook_page_{week:%Y%m%d}")
+    else:
+        st.write("Your logs will be grouped by day here.")
+
+
+# --- ⚖️ Bodyweight ---
+def render_bodyweight(user):
+    import charts
+
+    # One value per day from bodyweight_daily, not one per logged set
+    try:
+        daily = bodyweight.load_daily(user)
+    except Exception as e:
+        st.error(f"❌ Error loading data: {e}")
+        return
+    profiling.frame("bodyweight_daily", daily)
+    if not daily.empty:
+        # --- 1. USER CONTROL ---
+        col_controls, col_graph = st.columns([1, 4])
+        
+        with col_controls:
+            st.write("##") # Spacer
+            # The Toggle Switch
+            unit_choice = st.radio("Select Unit:", ["KG", "LBS"])
+            resolution = st.radio("Show:", list(bodyweight.RESOLUTIONS), key="bodyweight_resolution")
+        
+        # --- 2. DATA TRANSFORMATION (on the reduced series) ---
+        bw_df = bodyweight.series(daily, unit_choice, resolution)
+        
+        # --- 3. THE VISUALIZATION ---
+        with col_graph:
+            # One cached figure per unit / resolution, rebuilt only when the series changes
+            data_version = int(pd.util.hash_pandas_object(daily, index=False).sum())
+            fig_bw = charts.bodyweight_figure(user, data_version, bw_df, unit_choice, resolution)
+            
+            st.plotly_chart(fig_bw, use_container_width=True)
+            
+        # Optional: Show the latest stat text
+        latest_bw = bw_df.iloc[-1]
+        st.metric(
+            label="Current Bodyweight", 
+            value=f"{latest_bw['Bodyweight']:.1f} {unit_choice}",
+            delta=f"{latest_bw['Bodyweight'] - latest_bw['Average']:+.1f} vs average",
+            delta_color="off"
+        )
+            
+    else:
+        st.write("Track your bodyweight to see it here.")
+
+
+# --- 🛠️ Manage Data ---
+def render_manage(user):
+    st.subheader("🛠️ Manage Exercises")
+    
+    # --- 1. ADD NEW EXERCISE TO LIBRARY ---
+    with st.expander("➕ Add New Exercise to Library"):
+        with st.form("add_ex_form"):
+            new_ex_name = st.text_input("Name (e.g. King's Move)")
+            
+            # --- 🔒 LOGIC: ONLY SHOW RELEVANT DAYS (the ones already in your library) ---
+            cat_options = catalog.days(user) or catalog.DAYS_ORDER
+            if catalog.GENERAL not in cat_options:
+                cat_options = cat_options + [catalog.GENERAL]
+            new_ex_cat = st.selectbox("Category", cat_options)
+
+            # What the dashboard groups it under (Pronation, Cupping...)
+            group_options = catalog.muscle_groups(user) + [catalog.OTHER]
+            new_ex_group = st.selectbox("Muscle Group", group_options)
+            new_group_name = st.text_input("...or a new muscle group", placeholder="e.g. Hook")
+            
+            if st.form_submit_button("Add Exercise"):
+                if new_ex_name:
+                    try:
+                        # We explicitly save the username so Rahil never sees Kaisar's moves
+                        muscle_group = new_group_name.strip() or new_ex_group
+                        op = write_queue.submit_library_add(
+                            user, new_ex_name, new_ex_cat, muscle_group, report_errors=False
+                        )
+                        # Wait for this one commit (milliseconds) so the menus include it
+                        write_queue.wait(op)
+                        st.toast(f"✅ Added '{new_ex_name}' to {new_ex_cat}!")
+                        st.rerun()
+                    except TimeoutError:
+                        # Slow commit: any error still shows up on a later rerun
+                        st.info(f"⏳ Still saving '{new_ex_name}'... it will show up in a moment.")
+                    except IntegrityError:
+                        # (username, name) is unique in the library
+                        st.warning(f"'{new_ex_name}' is already in your library.")
+                    except Exception as e:
+                        st.error(f"❌ Error: {e}")
+                else:
+                    st.warning("Please enter a name.")
+
+    st.divider()
+
+    # --- 2. MANAGE YOUR LIBRARY (Delete Exercises) ---
+    st.subheader(f"📋 {user}'s Exercise Library")
+    
+    try:
+        # Only YOUR exercises, from the cached catalog
+        lib_df = catalog.library(user)
+        
+        if not lib_df.empty:
+            st.dataframe(lib_df, use_container_width=True, hide_index=True)
+            
+            # Tool to remove mistakes from the library
+            col_del, col_btn = st.columns([3, 1])
+            with col_del:
+                ex_to_del = st.selectbox("Select Exercise to Delete from Library:", lib_df["name"].unique())
+            with col_btn:
+                st.write("##")
+                if st.button("🗑️ Remove"):
+                    try:
+                        write_queue.wait(write_queue.submit_library_remove(user, ex_to_del, report_errors=False))
+                        st.toast("Deleted!")
+                        st.rerun()
+                    except TimeoutError:
+                        st.info(f"⏳ Still removing '{ex_to_del}'...")
+        else:
+            st.info("No exercises found in your library.")
+            
+    except Exception as e:
+        st.error(f"Could not load library: {e}")
+
+    st.divider()
+    
+    # --- 3. DELETE WORKOUT LOGS (Smart Dropdown) ---
+    st.subheader(f"🗑️ Delete {user}'s Workout Logs")
+    
+    page = history_pager(user, key="delete_pager", columns="manage")
+    if not page.empty:
+        # "Human Readable" labels for this page only; the selectbox value is the id itself,
+        # so two identical-looking entries still delete the right row
+        labels = data_access.delete_labels(page)
+        id_to_delete = st.selectbox("Select Entry to Delete:", list(labels), format_func=labels.get)
+        
+        if st.button("🗑️ Delete Selected Log"):
+            try:
+                # Delete by id: gone from the cache and this list right away,
+                # committed in the background (a failure shows up as a warning)
+                write_queue.submit_delete(user, id_to_delete)
+                st.session_state.pop("last_logs", None)  # "last time" panel may have changed
+                st.toast(f"Deleted log: {labels[id_to_delete]}")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error: {e}")
+                
+        # Show this page for reference
+        with st.expander("View Recent History Table"):
+            st.dataframe(
+                page[["Date", "Exercise", "Weight_kg", "Sets", "Reps", "Notes"]], 
+                hide_index=True, 
+                use_container_width=True
+            )
+
+    else:
+        st.info("No logs to delete.")
+
+# --- 🏋️ Team (coaches only) ---
+def render_team(user):
+    import team_rollup
+
+    # Reads only the rollup tables (team_rollup.py), never the athletes' logs
+    weeks_shown = team_rollup.get_settings()["weeks_shown"]
+    since = pd.Timestamp(date.today() - timedelta(weeks=weeks_shown))
+    try:
+        weekly = team_rollup.load_weekly(since=since)
+        refreshed_at = team_rollup.last_refreshed()
+    except Exception as e:
+        st.error(f"❌ Error loading team data: {e}")
+        return
+    profiling.frame("team_weekly", weekly)
+
+    col_title, col_refresh = st.columns([4, 1])
+    with col_title:
+        st.subheader("🏋️ Team Overview")
+        st.caption(f"Summaries as of {refreshed_at:%b %d, %H:%M}" if refreshed_at else "Not summarized yet.")
+    with col_refresh:
+        if st.button("🔄 Refresh", key="team_refresh"):
+            with st.spinner("Summarizing athletes..."):
+                report = team_rollup.refresh()
+            st.success(f"✅ {report['refreshed']} athlete(s) updated")
+            st.rerun()
+    if weekly.empty:
+        st.write("Athletes show up here once the team summary has run.")
+        return
+
+    st.dataframe(
+        team_rollup.roster_summary(weekly), use_container_width=True, hide_index=True,
+        column_config={
+            "Volume": st.column_config.NumberColumn(f"Volume ({team_rollup.TREND_WEEKS} wk)", format="%.0f"),
+            "Volume_Change_%": st.column_config.NumberColumn("vs previous", format="%+.0f%%"),
+            "Avg_RPE": st.column_config.NumberColumn("Avg RPE", format="%.1f"),
+            "Arm_Imbalance_%": st.column_config.NumberColumn("L/R imbalance", format="%+.0f%%"),
+        }
+    )
+
+    athlete = st.selectbox("Athlete:", weekly["Athlete"].unique().tolist(), key="team_athlete")
+    athlete_weeks = weekly[weekly["Athlete"] == athlete].set_index("Week")
+    col_volume, col_rpe = st.columns(2)
+    with col_volume:
+        st.write("**Weekly volume (L / R)**")
+        st.bar_chart(athlete_weeks[["Left_Volume", "Right_Volume"]], height=220)
+    with col_rpe:
+        st.write("**Average RPE**")
+        st.line_chart(athlete_weeks["Avg_RPE"], height=220)
+    st.write("**Personal records**")
+    prs = team_rollup.load_prs(athlete)
+    if not prs.empty:
+        st.dataframe(
+            prs, use_container_width=True, hide_index=True,
+            column_config={
+                "Best_e1RM": st.column_config.NumberColumn("Best e1RM", format="%.1f"),
+                "Date": st.column_config.DateColumn("Set on"),
+            }
+        )
+    else:
+        st.write("No PRs yet.")
+
+
+# --- 🛠 DEBUG PANEL (profiling on) ---
+def render_debug_panel(session):
+    import charts
+
+    with st.expander("🛠 Debug: performance"):
+        runs = profiling.recent_runs(session)
+        if not runs:
+            st.caption("Timings show up from the next rerun on.")
+            return
+        last = runs[-1]
+        st.metric("Last rerun", f"{last['total_ms']:.0f} ms", delta=last["status"], delta_color="off")
+        st.write("**Sections (ms)**")
+        st.dataframe(pd.Series(last["sections"], name="ms"), use_container_width=True)
+        st.write(f"**SQL:** {last['sql']['count']} statements, {last['sql']['ms']:.1f} ms "
+                 f"({last['slow_queries']} slow)")
+        if last["frames"]:
+            st.write("**DataFrames**")
+            st.dataframe(pd.DataFrame(last["frames"]).T, use_container_width=True)
+        st.write("**Recent reruns (ms)**")
+        st.line_chart(pd.Series([run["total_ms"] for run in runs], name="total_ms"), height=120)
+        memory = workout_cache.memory_report(compare=False)
+        st.caption(
+            f"Cached frames: {memory['rows']:,} rows in {memory['bytes'] / 1e6:.2f} MB "
+            f"({memory['bytes_per_row']:.0f} B/row, shared by all sessions)"
+        )
+        totals = profiling.sql_totals()
+        pool = db.pool_stats()
+        st.caption(
+            f"Process: {totals['count']} statements / {totals['slow']} slow · "
+            f"pool avg wait {pool['avg_wait_ms']:.2f} ms · "
+            f"cache {workout_cache.cache_stats()} · figures {charts.figure_stats()} · "
+            f"writes {write_queue.queue_stats()} · shared {shared_cache.cache_stats()}"
+        )
+
+
+VIEWS = {
+    "📈 Progress": render_progress,
+    "📅 History": render_history,
+    "📚 Logbook": render_logbook,
+    "⚖️ Bodyweight": render_bodyweight,
+    "🛠️ Manage Data": render_manage,
+}
+
+
+def views_for(user):
+    # Coaches ([team] coaches) get the roster tab as well. team_rollup only
+    # pulls in analytics when it summarizes, so this check stays light.
+    import team_rollup
+
+    if team_rollup.is_coach(user):
+        return {**VIEWS, "🏋️ Team": render_team}
+    return VIEWS
@@ -0,0 +1,279 @@
+import threading
+import time
+from collections import OrderedDict
+
+import catalog
+import data_access
+import shared_cache
+
+# --- PER-USER WORKOUT CACHE ---
+# Every widget click re-runs app.py. Instead of re-reading the whole table,
+# each user's prepared DataFrame is kept here (process-wide, LRU + TTL bound).
+# Later reruns only fetch rows with an id above the highest one we hold,
+# and Save/Delete patch the cached frame directly. Writes made in this
+# process are in the frame already, so that fetch is skipped for a couple of
+# seconds after the last one: clicks in a row are served without a query.
+#
+# One frame per user, shared by all of that user's sessions, in the compact
+# dtypes from data_access.COMPACT_DTYPES. Sessions get a shallow copy (a view
+# of the same column buffers), so memory grows with users x history, not with
+# open tabs. memory_report() shows the footprint next to the plain dtypes.
+
+CACHE_TTL_SECONDS = 600   # full reload at least this often (catches edits from elsewhere)
+CACHE_MAX_USERS = 64
+RECHECK_SECONDS = 2.0     # how late another process's new rows may show up (shared_cache drops us sooner)
+
+_entries = OrderedDict()  # username -> {"df", "max_id", "loaded_at", "version", "catalog_version"}
+_versions = {}            # username -> counter, survives eviction so versions never repeat
+_committing = {}          # username -> {real id: temporary id} for inserts being committed
+_checked = {}             # username -> when the database was last asked for new rows
+_lock = threading.RLock()
+_snapshot_dir = None      # "" once we know snapshots are off
+_stats = {"hits": 0, "fresh_hits": 0, "full_loads": 0, "shared_loads": 0, "incremental_loads": 0, "evictions": 0}
+
+
+def _prepare(user, df):
+    return data_access.compact_frame(data_access.add_derived_columns(df, user))
+
+
+def _store(user, df, loaded_at=None):
+    version = _versions.get(user, 0) + 1
+    _versions[user] = version
+    _entries[user] = {
+        "df": df,
+        "max_id": int(df["id"].max()) if not df.empty else 0,
+        "loaded_at": loaded_at if loaded_at is not None else time.monotonic(),
+        "version": version,
+        "catalog_version": catalog.version(user),
+    }
+    _entries.move_to_end(user)
+    while len(_entries) > CACHE_MAX_USERS:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def _snapshot_root():
+    # Resolved once per process (SNAPSHOT_DIR or [snapshots] path)
+    global _snapshot_dir
+    if _snapshot_dir is None:
+        import snapshots
+        _snapshot_dir = snapshots.get_snapshot_root() or ""
+    return _snapshot_dir
+
+
+def _load_frame(user):
+    # Another replica may have prepared this user already (see shared_cache.py).
+    # The version is read before the database, so a write landing in between
+    # can only make what we store newer than its key, never older.
+    shared_version = shared_cache.version("workouts", user)
+    df = shared_cache.load("workouts", user, shared_version)
+    if df is not None:
+        return data_access.add_derived_columns(df, user), "shared_loads"  # muscle groups from our own catalog
+    snapshot_root = _snapshot_root()
+    if snapshot_root:
+        # Closed months come memory-mapped from Parquet, only stale months from SQL
+        import snapshots
+        df = _prepare(user, snapshots.load_fresh(user, snapshot_root))
+    else:
+        df = _prepare(user, data_access.load_workouts(user, "dashboard"))
+    shared_cache.store("workouts", user, shared_version, df)
+    return df, "full_loads"
+
+
+def get_workouts(user):
+    # Database round trips run outside the lock, so one lifter's reload never
+    # holds up another lifter's rerun. The lock only guards merging and storing.
+    with _lock:
+        entry = _entries.get(user)
+        now = time.monotonic()
+        stale = entry is None or now - entry["loaded_at"] > CACHE_TTL_SECONDS
+        fresh = not stale and now - _checked.get(user, -RECHECK_SECONDS) < RECHECK_SECONDS
+        max_id = None if stale else entry["max_id"]
+        if fresh:
+            _stats["fresh_hits"] += 1
+            _entries.move_to_end(user)
+        else:
+            # Set before the read: a row committed meanwhile is fetched next time
+            _checked[user] = now
+
+    if stale:
+        df, kind = _load_frame(user)
+        with _lock:
+            _stats[kind] += 1
+            _store(user, df)
+    elif not fresh:
+        # 1. Only rows we haven't seen yet
+        new_rows = data_access.load_workouts(user, "dashboard", after_id=max_id)
+        fetched_max = int(new_rows["id"].max()) if not new_rows.empty else max_id
+        new_rows = _prepare(user, new_rows) if not new_rows.empty else new_rows
+        with _lock:
+            entry = _entries.get(user)
+            if entry is None or entry["max_id"] != max_id:
+                pass  # evicted, or another rerun merged first (its frame has these rows)
+            else:
+                # Rows we confirmed ourselves are already in the frame
+                new_rows = new_rows[~new_rows["id"].isin(entry["df"]["id"])]
+                # A queued insert committed but not confirmed yet: its real row replaces the provisional one
+                swaps = _committing.get(user, {})
+                replaced = [swaps[i] for i in new_rows["id"] if i in swaps]
+                base = entry["df"][~entry["df"]["id"].isin(replaced)] if replaced else entry["df"]
+                if new_rows.empty:
+                    _stats["hits"] += 1
+                    entry["max_id"] = fetched_max
+                    _entries.move_to_end(user)
+                else:
+                    df = data_access.append_compact(base, new_rows.reset_index(drop=True))
+                    df = df.sort_values(["Date", "id"], ignore_index=True)
+                    _stats["incremental_loads"] += 1
+                    _store(user, df, loaded_at=entry["loaded_at"])
+
+    with _lock:
+        if user not in _entries:
+            # Evicted while we were reading: load again (rare, only under LRU pressure)
+            return get_workouts(user)
+        # 2. Library edited since: re-label the muscle groups, the rows stay
+        entry = _entries[user]
+        if entry["catalog_version"] != catalog.version(user):
+            df = entry["df"].copy(deep=False)
+            df["Category"] = catalog.muscle_group_of(user, df["Exercise"])
+            _store(user, df, loaded_at=entry["loaded_at"])
+            _entries[user]["max_id"] = max(_entries[user]["max_id"], entry["max_id"])
+        # Shallow copy: callers may add columns without touching the cached frame
+        return _entries[user]["df"].copy(deep=False)
+
+
+def data_version(user):
+    with _lock:
+        return _versions.get(user, 0)
+
+
+# --- WRITE-THROUGH HOOKS ---
+
+def add_row(user, workout_id, data):
+    with _lock:
+        entry = _entries.get(user)
+        if entry is None:
+            return
+        new_row = _prepare(user, data_access.row_to_frame(workout_id, data))
+        df = data_access.append_compact(entry["df"], new_row)
+        df = df.sort_values(["Date", "id"], ignore_index=True)
+        _store(user, df, loaded_at=entry["loaded_at"])
+
+
+def remove_row(user, workout_id):
+    with _lock:
+        entry = _entries.get(user)
+        if entry is None:
+            return
+        df = entry["df"]
+        _store(user, df[df["id"] != int(workout_id)].reset_index(drop=True), loaded_at=entry["loaded_at"])
+        # Keep the high-water mark so the deleted id isn't fetched "again"
+        _entries[user]["max_id"] = max(_entries[user]["max_id"], entry["max_id"])
+
+
+def expect_row(user, temp_id, workout_id):
+    # Inside the writer's transaction, before it commits (see get_workouts)
+    with _lock:
+        _committing.setdefault(user, {})[int(workout_id)] = int(temp_id)
+
+
+def forget_expected(user, workout_id):
+    with _lock:
+        swaps = _committing.get(user, {})
+        swaps.pop(int(workout_id), None)
+        if not swaps:
+            _committing.pop(user, None)
+
+
+def confirm_row(user, temp_id, workout_id):
+    # A queued insert was committed: swap its provisional id for the real one.
+    # This runs after the commit, so a rerun may have fetched the real row
+    # already; then the provisional copy is dropped instead (never both).
+    with _lock:
+        forget_expected(user, workout_id)
+        entry = _entries.get(user)
+        if entry is None:
+            return
+        ids = entry["df"]["id"]
+        is_temp = ids == int(temp_id)
+        if not is_temp.any():
+            return  # deleted, reloaded or already replaced by a rerun
+        if (ids == int(workout_id)).any():
+            df = entry["df"][~is_temp].reset_index(drop=True)
+        else:
+            # Only the id column is rebuilt; every other column stays shared
+            df = entry["df"].copy(deep=False)
+            df["id"] = ids.mask(is_temp, int(workout_id))
+        _store(user, df, loaded_at=entry["loaded_at"])
+        # Ids committed by others below workout_id may still be unread: keep the mark
+        _entries[user]["max_id"] = entry["max_id"]
+
+
+def provisional_rows(user, shown_ids=()):
+    # Queued inserts (temporary negative ids) for views that read pages from SQL.
+    # One whose real row is already among shown_ids is left out (never both).
+    with _lock:
+        entry = _entries.get(user)
+        if entry is None:
+            return None
+        df = entry["df"]
+        rows = df[df["id"] < 0]
+        replaced = {temp for real, temp in _committing.get(user, {}).items() if real in set(shown_ids)}
+    return rows[~rows["id"].isin(replaced)]
+
+
+def note_write(user):
+    # Rows written in this process without patching the frame (the API's
+    # log_sets): ask the database on the next read
+    with _lock:
+        _checked.pop(user, None)
+
+
+def invalidate(user):
+    with _lock:
+        _entries.pop(user, None)
+        _checked.pop(user, None)
+
+
+# Another replica saved or deleted a set for this user
+shared_cache.subscribe("workouts", invalidate)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _checked.clear()
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["users"] = len(_entries)
+        stats["rows"] = int(sum(len(e["df"]) for e in _entries.values()))
+    return stats
+
+
+def _plain_copy(df):
+    # The same rows in the dtypes the cache used before compacting, for comparison
+    plain = {col: dtype for col, (_, dtype) in data_access.WORKOUT_COLUMNS.items() if dtype and col in df.columns}
+    plain["Category"] = "object"
+    return data_access.add_labels(df.astype(plain), ["Display_Date"])
+
+
+def memory_report(compare=True):
+    # Deep bytes per cached user (and per column), optionally next to the plain frame
+    with _lock:
+        frames = {user: entry["df"] for user, entry in _entries.items()}
+    report = {"users": {}, "columns": {}, "rows": 0, "bytes": 0}
+    for user, df in frames.items():
+        usage = df.memory_usage(index=True, deep=True)
+        report["users"][user] = {"rows": len(df), "bytes": int(usage.sum())}
+        report["rows"] += len(df)
+        report["bytes"] += int(usage.sum())
+        for col, size in usage.items():
+            report["columns"][col] = report["columns"].get(col, 0) + int(size)
+    report["bytes_per_row"] = report["bytes"] / report["rows"] if report["rows"] else 0.0
+    if compare:
+        report["plain_bytes"] = int(sum(_plain_copy(df).memory_usage(index=True, deep=True).sum() for df in frames.values()))
+        report["saved_pct"] = 100 * (1 - report["bytes"] / report["plain_bytes"]) if report["plain_bytes"] else 0.0
+    return report
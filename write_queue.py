@@ -0,0 +1,306 @@
+import itertools
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+import catalog
+import data_access
+import db
+import replica
+import shared_cache
+import workout_cache
+
+# --- BACKGROUND WRITE QUEUE ---
+# Save / Delete / library edits are handed to one worker thread instead of
+# blocking the Streamlit rerun. The UI updates optimistically (the cached
+# frame gets the new row right away, under a temporary negative id) and the
+# worker commits queued operations in grouped transactions. Failed batches
+# are retried; anything that still fails is rolled back in the cache and
+# reported through pop_errors().
+
+MAX_PENDING = 1000      # bounded: submit() blocks instead of growing forever
+BATCH_SIZE = 50
+BATCH_WINDOW_S = 0.05   # how long to wait for more ops before committing
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_S = 0.5
+
+_queue = queue.Queue(maxsize=MAX_PENDING)
+_worker = None
+_worker_lock = threading.Lock()
+_temp_ids = itertools.count(-1, -1)
+_id_map = {}                     # temporary id -> real id, until nothing queued refers to it
+_temp_deletes = set()            # temporary ids a queued delete still has to resolve
+_deleting = defaultdict(set)     # username -> ids of queued deletes, until they are committed
+_errors = defaultdict(list)      # username -> messages for the UI
+_pending = defaultdict(int)      # username -> ops not yet committed
+_state_lock = threading.Lock()
+_stats = {"batches": 0, "ops": 0, "retries": 0, "failed_ops": 0, "publish_errors": 0}
+
+
+class WriteOp:
+    def __init__(self, kind, user, payload, report_errors=True):
+        self.kind = kind
+        self.user = user
+        self.payload = payload
+        self.report_errors = report_errors  # False when the caller wait()s for the result
+        self.done = threading.Event()
+        self.error = None
+        self.result = None
+
+
+# --- PUBLIC API ---
+def submit_insert(user, data):
+    temp_id = next(_temp_ids)
+    op = WriteOp("insert", user, {"data": data, "temp_id": temp_id})
+    # Optimistic: the row is on screen before the database has it
+    workout_cache.add_row(user, temp_id, data)
+    _submit(op)
+    return temp_id
+
+
+def submit_delete(user, workout_id, report_errors=True):
+    op = WriteOp("delete", user, {"id": int(workout_id)}, report_errors)
+    with _state_lock:
+        _deleting[user].add(op.payload["id"])
+        if op.payload["id"] < 0:
+            _temp_deletes.add(op.payload["id"])
+    workout_cache.remove_row(user, workout_id)
+    _submit(op)
+    return op
+
+
+def submit_library_add(user, name, category, muscle_group=None, report_errors=True):
+    op = WriteOp("library_add", user, {"n": name, "c": category, "g": muscle_group, "u": user}, report_errors)
+    _submit(op)
+    return op
+
+
+def submit_library_remove(user, name, report_errors=True):
+    op = WriteOp("library_remove", user, {"n": name, "u": user}, report_errors)
+    _submit(op)
+    return op
+
+
+def wait(op, timeout=5.0):
+    # For callers that need the outcome (e.g. a duplicate library name)
+    if not op.done.wait(timeout):
+        # Nobody waits for it any more: a late failure goes to pop_errors() instead
+        with _state_lock:
+            op.report_errors = True
+        if not op.done.is_set():
+            raise TimeoutError(f"{op.kind.replace('_', ' ')} is still being saved")
+    if op.error is not None:
+        raise op.error
+    return op.result
+
+
+def pending(user):
+    with _state_lock:
+        return _pending[user]
+
+
+def pending_deletes(user):
+    # Real ids SQL still returns but the lifter already deleted
+    with _state_lock:
+        return {_id_map.get(workout_id, workout_id) for workout_id in _deleting.get(user, ())}
+
+
+def pop_errors(user):
+    with _state_lock:
+        return _errors.pop(user, [])
+
+
+def queue_stats():
+    with _state_lock:
+        stats = dict(_stats)
+        stats["queued"] = _queue.qsize()
+    return stats
+
+
+def flush(timeout=10.0, user=None):
+    # Block until everything queued so far (or just this lifter's) is committed
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with _state_lock:
+            if not (_pending[user] if user is not None else any(_pending.values())):
+                return True
+        time.sleep(0.01)
+    return False
+
+
+# --- WORKER ---
+def _submit(op):
+    _ensure_worker()
+    with _state_lock:
+        _pending[op.user] += 1
+    _queue.put(op)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="write-queue", daemon=True)
+            _worker.start()
+
+
+def _next_batch():
+    batch = [_queue.get()]
+    deadline = time.monotonic() + BATCH_WINDOW_S
+    while len(batch) < BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _apply(conn, op):
+    if op.kind == "insert":
+        new_id = data_access.insert_workout(conn, op.payload["data"])
+        # Mapped right away so a delete later in the same batch can find it
+        _id_map[op.payload["temp_id"]] = new_id
+        workout_cache.expect_row(op.user, op.payload["temp_id"], new_id)
+        return new_id
+    if op.kind == "delete":
+        workout_id = op.payload["id"]
+        if workout_id < 0:
+            workout_id = _id_map.get(workout_id)
+            if workout_id is None:
+                return 0  # its insert never made it, nothing to delete
+        return data_access.delete_workout(conn, op.user, workout_id)
+    if op.kind == "library_add":
+        conn.execute(
+            text("INSERT INTO exercise_library (name, category, muscle_group, username) VALUES (:n, :c, :g, :u)"),
+            op.payload
+        )
+        return None
+    if op.kind == "library_remove":
+        conn.execute(text("DELETE FROM exercise_library WHERE name = :n AND username = :u"), op.payload)
+        return None
+    raise ValueError(f"Unknown write: {op.kind}")
+
+
+def _commit(ops):
+    # One transaction for the whole group, and the only step _run may retry:
+    # if this returns, the ops are in and must never be applied again.
+    try:
+        with db.begin() as conn:
+            results = [_apply(conn, op) for op in ops]
+    except Exception:
+        # Rolled back: those ids may be handed out again to someone else's rows
+        for op in ops:
+            if op.kind == "insert" and op.payload["temp_id"] in _id_map:
+                workout_cache.forget_expected(op.user, _id_map[op.payload["temp_id"]])
+        raise
+    for op, result in zip(ops, results):
+        op.result = result
+
+
+def _publish(ops):
+    # After the commit. Reruns keep reading the cache meanwhile; confirm_row
+    # takes the cache lock only for each id swap.
+    for op in ops:
+        if op.kind == "insert":
+            workout_cache.confirm_row(op.user, op.payload["temp_id"], op.result)
+        elif op.kind in ("library_add", "library_remove"):
+            # Only this lifter's menus and muscle groups are re-read
+            catalog.invalidate(op.user)
+    _forget_temp_ids(ops)
+    # Other app replicas drop their copies (ours were patched in place)
+    for namespace, user in sorted({
+        ("catalog" if op.kind.startswith("library") else "workouts", op.user) for op in ops
+    }):
+        shared_cache.bump(namespace, user)
+    # Offline replica: push the new journal entries without waiting for the next tick
+    replica.request_sync()
+
+
+def _forget_temp_ids(ops):
+    # Committed: a temporary id is only kept while a queued delete still needs it
+    with _state_lock:
+        for op in ops:
+            if op.kind == "insert" and op.payload["temp_id"] not in _temp_deletes:
+                _id_map.pop(op.payload["temp_id"], None)
+            elif op.kind == "delete" and op.payload["id"] < 0:
+                _temp_deletes.discard(op.payload["id"])
+                _id_map.pop(op.payload["id"], None)
+
+
+def _finish(op, error=None):
+    op.error = error
+    with _state_lock:
+        _pending[op.user] -= 1
+        if op.kind == "delete":
+            _deleting[op.user].discard(op.payload["id"])
+            if not _deleting[op.user]:
+                del _deleting[op.user]
+        _stats["ops"] += 1
+        if error is not None:
+            _stats["failed_ops"] += 1
+            if op.report_errors:
+                _errors[op.user].append(f"Could not save {op.kind.replace('_', ' ')}: {error}")
+    if error is not None:
+        # Roll back the optimistic change
+        if op.kind == "insert":
+            with _state_lock:
+                _id_map.pop(op.payload["temp_id"], None)
+            workout_cache.remove_row(op.user, op.payload["temp_id"])
+        elif op.kind == "delete":
+            _forget_temp_ids([op])
+            workout_cache.invalidate(op.user)
+    op.done.set()
+
+
+def _run():
+    while True:
+        batch = _next_batch()
+        with _state_lock:
+            _stats["batches"] += 1
+
+        # 1. Whole batch, with retries for transient errors (dropped connection, ...)
+        committed = False
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                _commit(batch)
+                committed = True
+                break
+            except (OperationalError, InterfaceError):
+                with _state_lock:
+                    _stats["retries"] += 1
+                time.sleep(RETRY_BACKOFF_S * (2 ** attempt))
+            except Exception:
+                break  # bad data (duplicate name, ...) won't get better by retrying
+        if committed:
+            _settle(batch)
+        else:
+            # 2. Still failing: commit one by one so a single bad op doesn't sink the rest
+            for op in batch:
+                try:
+                    _commit([op])
+                except Exception as e:
+                    _finish(op, e)
+                else:
+                    _settle([op])
+
+
+def _settle(ops):
+    # Committed is final: a hiccup here is counted, the ops still count as saved
+    try:
+        _publish(ops)
+    except Exception:
+        with _state_lock:
+            _stats["publish_errors"] += 1
+        for user in {op.user for op in ops}:
+            workout_cache.invalidate(user)  # re-read from SQL rather than trust the patch
+    for op in ops:
+        _finish(op)